@@ -115,6 +115,8 @@ module LLM
     end
 
     def self.embed(text, options = {})
+      return text.collect { |t| embed(t, options.dup) } if Array === text
+
       client, region, access_key, secret_key, model = IndiferentHash.process_options options, :client, :region, :access_key, :secret_key, :model
 
       if client.nil?
@@ -1,6 +1,7 @@
 require 'scout'
 require 'securerandom'
 require_relative '../chat'
+require_relative '../stream'
 
 module LLM
   # Shared implementation for all LLM backends.
@@ -98,7 +99,31 @@ module LLM
 
         parameters = parameters.except(:previous_response_id) if FalseClass === parameters[:previous_response_id]
         parameters = parameters.except(:previous_response_id) if parameters[:previous_response] == 'false'
-        client.responses.create(parameters: parameters.except(:previous_response))
+        parameters = parameters.except(:previous_response)
+
+        return stream_query(client, parameters) if LLM.streaming?
+
+        client.responses.create(parameters: parameters)
+      end
+
+      # Same as `query` but receiving server-sent events, so the text deltas
+      # can be passed to `LLM.stream_text` as they arrive. Returns the final
+      # response object carried by the `response.completed` event.
+      def stream_query(client, parameters)
+        response = nil
+        parameters[:stream] = proc do |event|
+          case event['type']
+          when 'response.output_text.delta'
+            LLM.stream_text event['delta']
+          when 'response.completed'
+            response = event['response']
+          when 'response.failed', 'error'
+            error = event.dig('response', 'error') || event['error'] || event
+            raise error['message'] || error.to_json
+          end
+        end
+        client.responses.create(parameters: parameters)
+        response
       end
 
       #{{{ FORMAT
@@ -534,7 +559,10 @@ module LLM
         reasoning = reasoning response
 
         output = begin
-                   process_response messages, response, tools, options, &block
+                   # Tools may ask other models, which must not write to this stream
+                   LLM.with_stream(nil) do
+                     process_response messages, response, tools, options, &block
+                   end
                  rescue Exception => e
 
                    Log.debug 'Processing response error. Options: ' + "\n" + JSON.pretty_generate(options.except(:tools))
@@ -561,6 +589,8 @@ module LLM
           meta['timestamp'] = timestamp
         end
 
+        output.each { |message| LLM.stream_message message }
+
         output = chain_tools messages, output, tools, options.merge(client: client, tools: tools, log_response: log_response, current_meta: meta, relay: relay)
 
         output.unshift({role: :meta, content: Chat.serialize_meta(meta)}) if log_response && meta && meta.any?
@@ -593,6 +623,7 @@ module LLM
         parameters[:text] = text
         response = client.embeddings(parameters: parameters)
         raise response['error']['message'] if response.include? 'error'
+        return response['data'].collect { |info| info['embedding'] } if Array === text
         response.dig('data', 0, 'embedding')
       end
 
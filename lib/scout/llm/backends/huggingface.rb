@@ -13,7 +13,8 @@ module LLM
     MODEL_OPTION_KEYS = %i[
       task checkpoint dir
       chat_template chat_template_kwargs generation_kwargs
-      response_parser tool_argument
+      response_parser tool_argument prefix_cache
+      batch_size pooling normalize max_length
       tokenizer_args tokenizer_options
       training_args training_options
       trust_remote_code torch_dtype device_map device
@@ -65,7 +66,11 @@ module LLM
       parameters[:generation_kwargs] ||= IndiferentHash.pull_keys parameters, :generation_kwargs
       parameters[:chat_template] ||= IndiferentHash.pull_keys parameters, :chat_template
       parameters = parameters.keys_to_sym 
-      response = client.chat(messages, formatted_tools, parameters)
+      response = if LLM.streaming? && client.respond_to?(:chat_stream)
+                   client.chat_stream(messages, formatted_tools, parameters) { |text| LLM.stream_text text }
+                 else
+                   client.chat(messages, formatted_tools, parameters)
+                 end
       # ScoutCoder: ScoutPython.dict2hash only works on real PyCall dicts; fake
       # clients in tests replay plain Ruby Hashes (which have no #get), so only
       # convert when the object actually is a python wrapper.
@@ -199,10 +204,29 @@ module LLM
       reasoning_content
     end
 
+    # Embedding models are loaded once per process and set of options
+    EMBEDDING_MODELS = {}
+    EMBEDDING_MODELS_LOCK = Mutex.new
+
+    def embedding_model(model_options = {})
+      require 'scout/model/python/huggingface'
+      require 'scout/model/python/huggingface/embedding'
+
+      model_options = IndiferentHash.setup(model_options.dup)
+      model_name = IndiferentHash.process_options(model_options, :model)
+      dir = model_options[:dir]
+
+      key = [model_name, model_options.sort_by { |k,v| k.to_s }].inspect
+      EMBEDDING_MODELS_LOCK.synchronize do
+        EMBEDDING_MODELS[key] ||= EmbeddingModel.new model_name, dir, model_options
+      end
+    end
+
+    # Lists of texts are embedded together, in batches of :batch_size
     def embed(text, options = {})
-      model_options = self.model_options(options)
-      model_options[:task] = 'Embedding'
-      model = self.model(model_options)
+      options = IndiferentHash.setup(options.dup)
+      model = IndiferentHash.process_options(options, :client)
+      model ||= embedding_model(self.model_options(options).except(:task))
 
       (Array === text) ? model.eval_list(text) : model.eval(text)
     end
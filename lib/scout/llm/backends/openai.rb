@@ -14,13 +14,54 @@ module LLM
       parameters[:tools] = format_tool_definitions(tools) if tools && tools.any?
 
       begin
-        client.chat(parameters: parameters)
+        if LLM.streaming?
+          stream_query(client, parameters)
+        else
+          client.chat(parameters: parameters)
+        end
       rescue
-        Log.debug 'Input parameters: ' + "\n" + JSON.pretty_generate(parameters)
+        Log.debug 'Input parameters: ' + "\n" + JSON.pretty_generate(parameters.except(:stream))
         raise $!
       end
     end
 
+    # Request the completion as a stream of chunks, passing the text to
+    # `LLM.stream_text` as it arrives, and assemble a response shaped like a
+    # non-streamed one for `process_response`.
+    def stream_query(client, parameters)
+      response = {}
+      message = { 'role' => 'assistant', 'content' => String.new }
+      tool_calls = []
+
+      parameters[:stream_options] = { include_usage: true }
+      parameters[:stream] = proc do |chunk, _bytesize|
+        response['id'] ||= chunk['id']
+        response['model'] ||= chunk['model']
+        response['usage'] = chunk['usage'] if chunk['usage']
+
+        delta = chunk.dig('choices', 0, 'delta') || {}
+        if text = delta['content']
+          message['content'] << text
+          LLM.stream_text text
+        end
+
+        (delta['tool_calls'] || []).each do |call|
+          current = tool_calls[call['index'] || 0] ||= { 'id' => nil, 'type' => 'function',
+                                                         'function' => { 'name' => String.new, 'arguments' => String.new } }
+          current['id'] ||= call['id']
+          if function = call['function']
+            current['function']['name'] << function['name'] if function['name']
+            current['function']['arguments'] << function['arguments'] if function['arguments']
+          end
+        end
+      end
+
+      client.chat(parameters: parameters)
+
+      message['tool_calls'] = tool_calls.compact if tool_calls.any?
+      response.merge('choices' => [{ 'message' => message }])
+    end
+
     def format_tool_definitions(tools)
       tools.values.collect do |obj, definition|
         definition = obj if Hash === obj
@@ -0,0 +1,218 @@
+require 'json'
+require_relative 'ask'
+require_relative 'agent'
+require_relative 'stream'
+
+module LLM
+  # JSON bridge used by the Python package (python/scout_ai).
+  #
+  # Each operation mirrors one of the CLI round-trips the Python runner used to
+  # perform through files: rendering JSON messages as chat text (`llm json
+  # --json`), parsing chat text into JSON messages (`llm json --chat`), asking
+  # (`llm ask -c` / `agent ask -c`) and resolving agent paths (`agent find`).
+  #
+  # `LLM::Bridge.serve` runs these operations in a loop over length-prefixed
+  # JSON frames so a single long-lived `scout-ai llm worker` process can
+  # answer many requests without paying the interpreter boot every time.
+  module Bridge
+    # Frame header: payload length as a 32-bit unsigned big-endian integer
+    HEADER_SIZE = 4
+
+    def self.setup_messages(messages)
+      Chat.setup(messages.collect { |message| IndiferentHash.setup(message.dup) })
+    end
+
+    def self.render(messages)
+      LLM.print setup_messages(messages)
+    end
+
+    def self.parse(text = nil, file: nil)
+      if file
+        LLM.chat(file.to_s)
+      else
+        LLM.chat(Chat.parse(text.to_s))
+      end
+    end
+
+    def self.load_agent(agent)
+      case agent
+      when nil, LLM::Agent
+        agent
+      when Proc
+        agent.call
+      else
+        LLM::Agent.load_agent agent.to_s
+      end
+    end
+
+    # Ask and return the updated conversation, exactly as re-reading the chat
+    # file after `llm ask -c` / `agent ask -c` would: the answer is appended to
+    # the printed conversation and the result is parsed and processed again.
+    #
+    # With a block, stream events are yielded as `(type, data)` while asking,
+    # see LLM.with_stream. If nothing was streamed, because the answer came
+    # from the cache or the backend does not report progress, the new messages
+    # are yielded at the end instead.
+    def self.ask(messages, agent = nil, options = {}, &stream)
+      text = render(messages)
+      if stream
+        streamed = false
+        handler = proc do |type, data|
+          streamed = true
+          stream.call type, data
+        end
+        new = LLM.with_stream(handler) { ask_new(text, agent, options) }
+        new.each { |message| stream.call :message, message } unless streamed
+      else
+        new = ask_new(text, agent, options)
+      end
+      parse(text + LLM.print(new))
+    end
+
+    # Ask and return only the messages that differ from `messages`:
+    # `{start:, messages:}`, where `start` is the length of the common prefix
+    # of the original and updated conversations and `messages` the rest of the
+    # updated one. Callers keep their copy of the history instead of receiving
+    # it back on every turn.
+    def self.ask_delta(messages, agent = nil, options = {}, &stream)
+      delta(messages, ask(messages, agent, options, &stream))
+    end
+
+    def self.delta(messages, updated)
+      start = 0
+      start += 1 while start < messages.length && start < updated.length && same_message?(messages[start], updated[start])
+      { start: start, messages: updated[start..] }
+    end
+
+    def self.same_message?(message, other)
+      normalize_message(message) == normalize_message(other)
+    end
+
+    def self.normalize_message(message)
+      message.to_h.collect { |key, value| [key.to_s, key.to_s == 'role' ? value.to_s : value] }.to_h
+    end
+
+    # With the `dry_run` option nothing is asked and no messages are added, so
+    # the callers get the conversation as it would have been asked
+    def self.ask_new(text, agent = nil, options = {})
+      return [] if IndiferentHash.setup(options.dup)[:dry_run]
+      conversation = LLM.chat(Chat.parse(text))
+      convo_options = LLM.options conversation
+      options = convo_options.merge(options).merge(return_messages: true)
+
+      agent = load_agent(agent)
+      if agent
+        agent.start
+        agent.follow(Chat.setup(conversation)) if conversation.any?
+        agent.ask(agent.current_chat, options)
+      else
+        LLM.ask(conversation, options)
+      end
+    end
+
+    # Ask each conversation in `conversations` using up to `max_parallel`
+    # threads and yield `{index:, messages:}` (or `{index:, error:, class:}`)
+    # as each one finishes, so the order is not the input order. Every thread
+    # loads its own agent, since asking changes the agent's current chat;
+    # `agent` can be a Proc to customize how it is loaded.
+    def self.ask_many(conversations, agent = nil, options = {}, max_parallel: nil)
+      max_parallel ||= Scout::Config.get(:cpus, :ask_many, :bridge, env: 'SCOUT_AI_MAX_PARALLEL', default: 3)
+      max_parallel = [[max_parallel.to_i, 1].max, conversations.length].min
+
+      queue = Queue.new
+      conversations.each_with_index { |messages, index| queue << [index, messages] }
+      queue.close
+
+      mutex = Mutex.new
+      threads = max_parallel.times.collect do
+        Thread.new do
+          thread_agent = LLM::Agent === agent ? agent.dup : load_agent(agent)
+          while item = queue.pop
+            index, messages = item
+            result = begin
+                       { index: index, messages: ask(messages, thread_agent, options.dup) }
+                     rescue Exception => e
+                       raise e if Interrupt === e || SystemExit === e
+                       Log.exception e
+                       { index: index, error: e.message, class: e.class.to_s }
+                     end
+            mutex.synchronize { yield result }
+          end
+        end
+      end
+      threads.each(&:join)
+      nil
+    end
+
+    def self.find_agent(agent_name)
+      agent = LLM.load_agent agent_name
+      path = agent.path
+      path.nil? ? nil : path.to_s
+    rescue ScoutException
+      nil
+    end
+
+    def self.handle(request)
+      request = IndiferentHash.setup(request)
+      case request[:op].to_s
+      when 'ping'
+        'pong'
+      when 'render'
+        render(request[:messages] || [])
+      when 'parse'
+        parse(request[:text], file: request[:file])
+      when 'ask'
+        messages, agent, options = request[:messages] || [], request[:agent], IndiferentHash.setup(request[:options] || {})
+        request[:delta] ? ask_delta(messages, agent, options) : ask(messages, agent, options)
+      when 'find_agent'
+        find_agent(request[:agent])
+      else
+        raise ParameterException, "Unknown bridge operation: #{request[:op].inspect}"
+      end
+    end
+
+    def self.read_frame(io)
+      header = io.read(HEADER_SIZE)
+      return nil if header.nil? || header.bytesize < HEADER_SIZE
+      size = header.unpack1('N')
+      payload = size == 0 ? '' : io.read(size)
+      raise IOError, "Truncated frame: expected #{size} bytes" if payload.nil? || payload.bytesize < size
+      JSON.parse(payload.force_encoding(Encoding::UTF_8))
+    end
+
+    def self.write_frame(io, obj)
+      payload = obj.to_json.b
+      io.write([payload.bytesize].pack('N'), payload)
+      io.flush
+    end
+
+    # Run the block with STDOUT pointed at STDERR and yield an IO on the
+    # original standard output, so that tools or libraries printing to STDOUT
+    # can not corrupt the protocol stream.
+    def self.with_protected_stdout
+      output = STDOUT.dup
+      output.binmode
+      output.sync = true
+      STDOUT.reopen(STDERR)
+      yield output
+    ensure
+      output.close if output && ! output.closed?
+    end
+
+    def self.serve(input = STDIN, output = nil)
+      return with_protected_stdout { |out| serve(input, out) } if output.nil?
+
+      input.binmode if input.respond_to?(:binmode)
+      while request = read_frame(input)
+        response = begin
+                     { ok: true, result: handle(request) }
+                   rescue Exception => e
+                     raise e if Interrupt === e || SystemExit === e
+                     Log.exception e
+                     { ok: false, error: e.message, class: e.class.to_s }
+                   end
+        write_frame(output, response)
+      end
+    end
+  end
+end
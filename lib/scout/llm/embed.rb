@@ -1,4 +1,5 @@
 require 'scout'
+require_relative 'embedding_cache'
 
 module LLM
   def self.embed(text, options = {})
@@ -11,6 +12,18 @@ module LLM
     backend = IndiferentHash.process_options options, :backend
     backend ||= Scout::Config.get :backend, :embed, :llm, env: 'EMBED_BACKEND,LLM_BACKEND', default: :embed
 
+    cache = IndiferentHash.process_options options, :cache
+    # :auto only caches when the model is named, by the options or the
+    # endpoint, rather than left to the default of the backend
+    cache = options[:model] ? true : nil if cache.to_s == 'auto'
+    if cache && cache.to_s != 'false'
+      cache = embed_cache(cache, backend, options, endpoint)
+      vectors = cache.embed(Array === text ? text : [text]) do |missing|
+        LLM.embed(missing, options.merge(backend: backend))
+      end
+      return Array === text ? vectors : vectors.first
+    end
+
     case backend
     when :openai, "openai"
       require_relative 'backends/openai'
@@ -39,4 +52,26 @@ module LLM
       mod.embed(text, options)
     end
   end
+
+  # The `cache` option of LLM.embed: an EmbeddingCache, a directory, or true
+  # for the shared cache of the model (or backend) in Scout.var.cache.embeddings.
+  # Remote models are also keyed by their backend and url (or endpoint), so
+  # servers offering different models under one name do not share vectors;
+  # local Hugging Face models are keyed as in Python
+  def self.embed_cache(cache, backend, options = {}, endpoint = nil)
+    return cache if LLM::EmbeddingCache === cache
+
+    max_bytes = Scout::Config.get :max_bytes, :embed_cache, :llm, env: 'EMBED_CACHE_MAX_BYTES'
+    max_bytes = max_bytes.to_i if max_bytes
+
+    if TrueClass === cache || %w(true TRUE).include?(cache.to_s)
+      normalize = options.include?(:normalize) ? options[:normalize] : true
+      source = [backend, options[:url] || endpoint].compact * ' ' unless backend.to_s == 'huggingface'
+      LLM::EmbeddingCache.for_model(options[:model] || backend,
+                                    pooling: options[:pooling], normalize: normalize,
+                                    source: source, max_length: options[:max_length], max_bytes: max_bytes)
+    else
+      LLM::EmbeddingCache.new(cache, max_bytes: max_bytes)
+    end
+  end
 end
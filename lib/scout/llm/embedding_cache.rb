@@ -0,0 +1,226 @@
+require 'digest'
+require 'json'
+require 'fileutils'
+
+module LLM
+  # On-disk cache of the embeddings of one model, shared with
+  # `scout_ai.embedding_cache.EmbeddingCache` in Python (same files, same
+  # locking). Texts are keyed by the SHA256 of their content; vectors are
+  # float32 rows in `vectors.f32`, indexed by the `<key>\t<row>` lines of
+  # `index.tsv`. Once vectors take more than `max_bytes` the oldest rows are
+  # dropped until they fit in three quarters of it.
+  #
+  #   cache = LLM::EmbeddingCache.for_model('nomic-embed-text')
+  #   cache.embed(texts) { |missing| LLM.embed(missing, backend: :ollama) }
+  class EmbeddingCache
+    VECTORS = 'vectors.f32'
+    INDEX = 'index.tsv'
+    META = 'meta.json'
+    LOCK = 'lock'
+
+    attr_reader :path, :max_bytes, :hits, :misses
+
+    def self.default_root
+      ENV['SCOUT_AI_EMBEDDING_CACHE'] || Scout.var.cache.embeddings.find
+    end
+
+    # Directory name for the embeddings of `model`. `source` tells apart
+    # servers offering a model under the same name (backend and url or
+    # endpoint; nil for local models) and `max_length` the truncation of the
+    # texts, as both change the vectors
+    def self.model_key(model, pooling = nil, normalize = true, source: nil, max_length: nil)
+      key = model.to_s.gsub(/[^\w.-]/, '_')
+      key += '-cls' if pooling.to_s == 'cls'
+      key += '-raw' if normalize == false || normalize.to_s == 'false'
+      key += "-max#{max_length.to_i}" if max_length
+      key += '-' + Digest::SHA256.hexdigest(source.to_s)[0, 12] if source && ! source.to_s.empty?
+      key
+    end
+
+    def self.text_key(text)
+      Digest::SHA256.hexdigest(text.to_s)
+    end
+
+    INSTANCES = {}
+    INSTANCES_LOCK = Mutex.new
+
+    # Shared instance for the embeddings of `model`, so the index is only read
+    # once per process
+    def self.for_model(model, root = nil, pooling: nil, normalize: true, source: nil, max_length: nil, max_bytes: nil)
+      path = File.join(root || default_root, model_key(model, pooling, normalize, source: source, max_length: max_length))
+      INSTANCES_LOCK.synchronize do
+        INSTANCES[[path, max_bytes]] ||= new(path, max_bytes: max_bytes)
+      end
+    end
+
+    def initialize(path, max_bytes: nil)
+      @path = path.to_s
+      @max_bytes = max_bytes
+      FileUtils.mkdir_p @path
+
+      @mutex = Mutex.new
+      @rows = {}
+      @index_offset = 0
+      @generation = nil
+      @dim = nil
+      @hits = @misses = 0
+    end
+
+    def file(name)
+      File.join(@path, name)
+    end
+
+    # Cached vector of each text, nil when missing
+    def get(texts)
+      keys = texts.collect { |text| EmbeddingCache.text_key(text) }
+      @mutex.synchronize do
+        refresh
+        rows = keys.collect { |key| @rows[key] }
+        @hits += rows.compact.length
+        @misses += rows.length - rows.compact.length
+        read_rows(rows)
+      end
+    end
+
+    def put(texts, vectors)
+      raise ArgumentError, 'Expected one vector per text' unless texts.length == vectors.length
+      return if texts.empty?
+
+      @mutex.synchronize do
+        exclusive do
+          refresh
+          meta = read_meta
+          dim = meta['dim']
+          if dim.nil?
+            dim = vectors.first.length
+            write_meta 'dim' => dim, 'generation' => meta['generation'] || 0
+            @dim = dim
+          end
+          vectors.each do |vector|
+            raise ArgumentError, "Cache at #{@path} holds vectors of dimension #{dim}, not #{vector.length}" if vector.length != dim
+          end
+
+          start = File.exist?(file(VECTORS)) ? File.size(file(VECTORS)) / (4 * dim) : 0
+          File.open(file(VECTORS), 'ab') { |io| io.write vectors.flatten.pack('e*') }
+          File.open(file(INDEX), 'a') do |io|
+            io.write texts.each_with_index.collect { |text,i| "#{EmbeddingCache.text_key(text)}\t#{start + i}\n" }.join
+          end
+
+          compact(dim, meta['generation'] || 0) if @max_bytes && (start + texts.length) * 4 * dim > @max_bytes
+        end
+      end
+    end
+
+    # Vectors of all texts, yielding only the missing ones (deduplicated) to
+    # the block, which must return their vectors in the same order
+    def embed(texts)
+      texts = texts.collect(&:to_s)
+      vectors = get(texts)
+      missing = texts.zip(vectors).select { |text,vector| vector.nil? }.collect(&:first).uniq
+
+      if missing.any?
+        computed = yield missing
+        put(missing, computed)
+        by_text = Hash[missing.zip(computed)]
+        vectors = texts.zip(vectors).collect { |text,vector| vector || by_text[text] }
+      end
+
+      vectors
+    end
+
+    def size
+      @mutex.synchronize { refresh; @rows.length }
+    end
+
+    def stats
+      @mutex.synchronize do
+        refresh
+        {hits: @hits, misses: @misses, entries: @rows.length, dim: @dim,
+         bytes: File.exist?(file(VECTORS)) ? File.size(file(VECTORS)) : 0}
+      end
+    end
+
+    def clear
+      @mutex.synchronize do
+        exclusive do
+          generation = read_meta['generation'] || 0
+          [VECTORS, INDEX].each { |name| FileUtils.rm_f file(name) }
+          write_meta 'dim' => nil, 'generation' => generation + 1
+          refresh
+        end
+      end
+    end
+
+    private
+
+    def exclusive
+      File.open(file(LOCK), File::RDWR | File::CREAT) do |io|
+        io.flock(File::LOCK_EX)
+        begin
+          yield
+        ensure
+          io.flock(File::LOCK_UN)
+        end
+      end
+    end
+
+    def read_meta
+      File.exist?(file(META)) ? JSON.parse(File.read(file(META))) : {}
+    end
+
+    def write_meta(meta)
+      tmp = file(META + '.tmp')
+      File.write(tmp, meta.to_json)
+      File.rename(tmp, file(META))
+    end
+
+    def refresh
+      meta = read_meta
+      if meta['generation'] != @generation
+        @generation = meta['generation']
+        @rows = {}
+        @index_offset = 0
+      end
+      @dim = meta['dim']
+
+      return unless File.exist?(file(INDEX))
+      data = File.open(file(INDEX), 'rb') { |io| io.seek(@index_offset); io.read }
+
+      # Only complete lines; a writer may be halfway through one
+      complete = (data.rindex("\n") || -1) + 1
+      data[0, complete].force_encoding('UTF-8').each_line do |line|
+        key, row = line.chomp.split("\t")
+        @rows[key] = row.to_i
+      end
+      @index_offset += complete
+    end
+
+    def read_rows(rows)
+      return rows.collect { nil } if rows.compact.empty?
+      width = 4 * @dim
+      File.open(file(VECTORS), 'rb') do |io|
+        rows.collect do |row|
+          next nil if row.nil?
+          io.pread(width, row * width).unpack('e*')
+        end
+      end
+    end
+
+    def compact(dim, generation)
+      refresh
+      keep = (@max_bytes * 0.75).to_i / (4 * dim)
+      newest = @rows.sort_by { |key,row| -row }.first(keep).reverse
+      vectors = read_rows(newest.collect(&:last))
+
+      File.open(file(VECTORS + '.tmp'), 'wb') { |io| io.write vectors.flatten.pack('e*') }
+      File.open(file(INDEX + '.tmp'), 'w') do |io|
+        io.write newest.each_with_index.collect { |(key,_),row| "#{key}\t#{row}\n" }.join
+      end
+
+      File.rename(file(VECTORS + '.tmp'), file(VECTORS))
+      File.rename(file(INDEX + '.tmp'), file(INDEX))
+      write_meta 'dim' => dim, 'generation' => generation + 1
+      refresh
+    end
+  end
+end
@@ -1,3 +1,7 @@
+require 'set'
+require_relative 'embedding_cache'
+require_relative 'rag/index'
+
 module LLM
   class RAG
     def self.index(data)
@@ -22,13 +26,36 @@ module LLM
       u
     end
 
-    def self.top(texts, prompt, num = 10, ...)
-      data = texts.collect{|text| LLM.embed(text, ...) }
+    # The `num` texts closest to the prompt. When the embedding model is
+    # named (`model:` or the endpoint) the texts are embedded through the
+    # embedding cache (`cache: false` to avoid it, `cache: true` to also use
+    # it for the default model of the backend), so repeated queries over the
+    # same texts only embed the prompt. With `index: <dir>` their vectors
+    # are also kept in a persistent LLM::RAG::Index in that directory, which
+    # is only updated with the texts it does not have yet.
+    def self.top(texts, prompt, num = 10, options = {})
+      options = IndiferentHash.add_defaults options.dup, cache: :auto
+      path = IndiferentHash.process_options options, :index
+
+      ids = texts.collect { |text| LLM::EmbeddingCache.text_key(text) }
+      index = Index.load(path) if path && File.exist?(File.join(path.to_s, Index::DOCUMENTS))
+
+      missing = ids.each_with_index.reject { |id,i| index && index.include?(id) }.collect(&:last)
+      if missing.any?
+        vectors = LLM.embed(texts.values_at(*missing), options)
+        index ||= Index.new(vectors.first.length, space: 'l2')
+        index.add ids.values_at(*missing), vectors, texts.values_at(*missing)
+        index.save path if path
+      end
+
+      return [] if index.nil?
 
-      i = LLM::RAG.index(data)
-      pos, scores = i.search_knn LLM.embed(prompt, ...), num
+      # Other documents in a persistent index may be closer than these texts
+      wanted = ids.to_set
+      k = [num + index.size - wanted.length, index.size].min
+      found = index.query(LLM.embed(prompt, options.except(:cache)), k).select { |id,_| wanted.include?(id) }
 
-      texts.values_at *pos.reverse
+      found.first(num).collect { |id,_| index.text(id) }
     end
   end
 end
@@ -0,0 +1,227 @@
+require 'json'
+require 'fileutils'
+
+module LLM
+  class RAG
+    # Persistent vector index, shared with `scout_ai.vector_index.VectorIndex`
+    # in Python (same directory layout). Documents have string ids, an
+    # optional text and a vector; adding an existing id replaces it, deleted
+    # ids stop being returned, and the index grows as needed.
+    #
+    # The vectors live in an hnswlib graph (`hnsw.bin`) when the hnswlib gem is
+    # available, or in a flat list searched exhaustively (`vectors.f32`, float32
+    # rows by label) otherwise, which is exact and fine for small corpora.
+    # `documents.json` holds the dimension, space, backend and the id ->
+    # [label, text] map.
+    #
+    #   index = LLM::RAG::Index.new 768
+    #   index.add %w(a b), vectors, texts
+    #   index.query vector, 5   # => [[id, distance], ...]
+    #   index.save dir
+    #   LLM::RAG::Index.load(dir).delete ['a']
+    class Index
+      SPACES = %w(cosine l2 ip)
+      DOCUMENTS = 'documents.json'
+      HNSW = 'hnsw.bin'
+      VECTORS = 'vectors.f32'
+
+      attr_reader :dim, :space, :backend, :documents
+
+      def self.hnswlib?
+        return @hnswlib unless @hnswlib.nil?
+        @hnswlib = begin
+                     require 'hnswlib'
+                     true
+                   rescue LoadError
+                     false
+                   end
+      end
+
+      def initialize(dim, space: 'cosine', backend: nil, max_elements: 1024)
+        space = space.to_s
+        raise ArgumentError, "Unknown space #{space}, use one of #{SPACES * ', '}" unless SPACES.include?(space)
+        backend = (backend || (Index.hnswlib? ? 'hnsw' : 'flat')).to_s
+        raise ArgumentError, "Unknown backend #{backend}, use hnsw or flat" unless %w(hnsw flat).include?(backend)
+
+        @dim = dim
+        @space = space
+        @backend = backend
+        @documents = {}
+        @ids = {}
+        @next_label = 0
+        @capacity = [max_elements.to_i, 1].max
+
+        if @backend == 'hnsw'
+          @hnsw = Hnswlib::HierarchicalNSW.new(space: @space, dim: @dim)
+          @hnsw.init_index(max_elements: @capacity)
+        else
+          @vectors = {}
+        end
+      end
+
+      def size
+        @documents.length
+      end
+
+      def include?(id)
+        @documents.include?(id.to_s)
+      end
+
+      def text(id)
+        @documents[id.to_s]&.last
+      end
+
+      # Add documents; ids already present get their vector replaced, and
+      # their text unless the new one is nil
+      def add(ids, vectors, texts = nil)
+        ids = ids.collect(&:to_s)
+        texts ||= [nil] * ids.length
+        reserve ids.uniq.reject { |id| @documents.include?(id) }.length
+
+        ids.zip(vectors, texts).each do |id,vector,text|
+          raise ArgumentError, "Vector for #{id} has dimension #{vector.length}, not #{@dim}" if vector.length != @dim
+          if @documents.include?(id)
+            label, current = @documents[id]
+            text = current if text.nil?
+          else
+            label = new_label(id)
+          end
+          @documents[id] = [label, text]
+
+          if @backend == 'hnsw'
+            @hnsw.add_point vector, label
+          else
+            @vectors[label] = @space == 'cosine' ? Index.normalize(vector) : vector.collect(&:to_f)
+          end
+        end
+        self
+      end
+      alias upsert add
+
+      def delete(ids)
+        ids.each do |id|
+          label, _text = @documents.delete(id.to_s)
+          next if label.nil?
+          @ids.delete label
+          if @backend == 'hnsw'
+            @hnsw.mark_deleted label
+          else
+            @vectors.delete label
+          end
+        end
+        self
+      end
+
+      # The k nearest documents to each vector, as [id, distance] pairs,
+      # nearest first
+      def search(vectors, k = 10)
+        k = [k, size].min
+        return vectors.collect { [] } if k == 0
+
+        vectors.collect do |vector|
+          if @backend == 'hnsw'
+            # Deleted elements still occupy the graph; look further to return k live ones
+            @hnsw.set_ef [50, k].max
+            labels, distances = @hnsw.search_knn vector, k
+            labels.zip(distances).sort_by(&:last).collect { |label,distance| [@ids[label], distance] }
+          else
+            flat_search(vector, k)
+          end
+        end
+      end
+
+      def query(vector, k = 10)
+        search([vector], k).first
+      end
+
+      def save(path)
+        path = path.to_s
+        FileUtils.mkdir_p path
+
+        if @backend == 'hnsw'
+          @hnsw.save_index File.join(path, HNSW)
+        else
+          zeros = [0.0] * @dim
+          File.open(File.join(path, VECTORS + '.tmp'), 'wb') do |io|
+            @next_label.times { |label| io.write (@vectors[label] || zeros).pack('e*') }
+          end
+          File.rename File.join(path, VECTORS + '.tmp'), File.join(path, VECTORS)
+        end
+
+        info = {dim: @dim, space: @space, backend: @backend, next_label: @next_label, documents: @documents}
+        File.write File.join(path, DOCUMENTS + '.tmp'), info.to_json
+        File.rename File.join(path, DOCUMENTS + '.tmp'), File.join(path, DOCUMENTS)
+        path
+      end
+
+      def self.load(path)
+        path = path.to_s
+        info = JSON.parse(File.read(File.join(path, DOCUMENTS)))
+
+        raise LoadError, "The index at #{path} was built with hnswlib, which is not installed" if info['backend'] == 'hnsw' && ! hnswlib?
+
+        index = allocate
+        index.send(:restore, path, info)
+        index
+      end
+
+      def self.normalize(vector)
+        norm = Math.sqrt(vector.inject(0.0) { |acc,v| acc + v * v })
+        norm = 1e-12 if norm < 1e-12
+        vector.collect { |v| v / norm }
+      end
+
+      private
+
+      def restore(path, info)
+        @dim = info['dim']
+        @space = info['space']
+        @backend = info['backend']
+        @documents = info['documents']
+        @ids = {}
+        @documents.each { |id,(label,_text)| @ids[label] = id }
+        @next_label = info['next_label']
+        @capacity = [@next_label, 1].max
+
+        if @backend == 'hnsw'
+          @hnsw = Hnswlib::HierarchicalNSW.new(space: @space, dim: @dim)
+          @hnsw.load_index File.join(path, HNSW)
+        else
+          @vectors = {}
+          width = 4 * @dim
+          File.open(File.join(path, VECTORS), 'rb') do |io|
+            @ids.each_key { |label| @vectors[label] = io.pread(width, label * width).unpack('e*') }
+          end
+        end
+      end
+
+      def new_label(id)
+        label = @next_label
+        @next_label += 1
+        @ids[label] = id
+        label
+      end
+
+      def reserve(count)
+        needed = @next_label + count
+        return if needed <= @capacity
+        @capacity = [needed, @capacity * 2].max
+        @hnsw.resize_index @capacity if @backend == 'hnsw'
+      end
+
+      def flat_search(vector, k)
+        vector = Index.normalize(vector) if @space == 'cosine'
+        distances = @vectors.collect do |label,other|
+          distance = case @space
+                     when 'l2'
+                       vector.zip(other).inject(0.0) { |acc,(a,b)| acc + (a - b) ** 2 }
+                     else
+                       1.0 - vector.zip(other).inject(0.0) { |acc,(a,b)| acc + a * b }
+                     end
+          [@ids[label], distance]
+        end
+        distances.min_by(k, &:last)
+      end
+    end
+  end
+end
@@ -0,0 +1,44 @@
+module LLM
+  # Incremental output while asking.
+  #
+  # A stream handler is a Proc called with `(type, data)`; it is installed for
+  # the current thread with `LLM.with_stream`. Backends that support it call
+  # `LLM.stream_text` with each chunk of assistant text as the provider sends
+  # it, and every backend reports the messages of each round (assistant
+  # answers, function calls and their outputs) with `LLM.stream_message` once
+  # they are complete.
+  #
+  #   LLM.with_stream(proc { |type, data| print data if type == :delta }) do
+  #     LLM.ask "Tell me a story", backend: :openai
+  #   end
+  def self.stream_handler
+    Thread.current[:llm_stream_handler]
+  end
+
+  def self.streaming?
+    ! stream_handler.nil?
+  end
+
+  # Run the block with `handler` as the stream handler of the current thread.
+  # Use `nil` to stop streaming inside the block, for instance while running
+  # tools that may ask other models.
+  def self.with_stream(handler)
+    previous = Thread.current[:llm_stream_handler]
+    Thread.current[:llm_stream_handler] = handler
+    yield
+  ensure
+    Thread.current[:llm_stream_handler] = previous
+  end
+
+  def self.stream_text(text)
+    handler = stream_handler
+    return if handler.nil? || text.nil? || text.empty?
+    handler.call :delta, text
+  end
+
+  def self.stream_message(message)
+    handler = stream_handler
+    return if handler.nil? || message.nil?
+    handler.call :message, message
+  end
+end
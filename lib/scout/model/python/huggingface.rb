@@ -35,7 +35,8 @@ class HuggingfaceModel < TorchModel
                                          :training_args, :tokenizer_args, 
                                          :task, :checkpoint, :class_labels, 
                                          :model_options, :return_logits, :chat_template,
-                                         :chat_template_kwargs, :generation_kwargs
+                                         :chat_template_kwargs, :generation_kwargs, :batch_size, :top_k,
+                                         :prefix_cache, :pooling, :normalize, :max_length
                                        ))))
 
       tokenizer_checkpoint = self.options[:tokenizer_args][:checkpoint] || checkpoint
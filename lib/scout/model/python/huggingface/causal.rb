@@ -6,14 +6,27 @@ class CausalModel < HuggingfaceModel
 
     self.eval do |messages,list|
       model, tokenizer = @state
-      ScoutPython.call_method(
-        "scout_ai.huggingface.eval", :eval_causal_lm_chat,
-        model, tokenizer, messages,
-        options[:chat_template],
-        options[:chat_template_kwargs],
-        options[:generation_kwargs],
-        options[:tool_argument]
-      )
+      if list
+        ScoutPython.call_method(
+          "scout_ai.huggingface.eval", :eval_causal_lm_chats,
+          model, tokenizer, list,
+          options[:chat_template],
+          options[:chat_template_kwargs],
+          options[:generation_kwargs],
+          options[:tool_argument],
+          options[:batch_size]
+        )
+      else
+        ScoutPython.call_method(
+          "scout_ai.huggingface.eval", :eval_causal_lm_chat,
+          model, tokenizer, messages,
+          options[:chat_template],
+          options[:chat_template_kwargs],
+          options[:generation_kwargs],
+          options[:tool_argument],
+          options[:prefix_cache]
+        )
+      end
     end
 
     train do |pairs,labels|
@@ -41,7 +54,68 @@ class CausalModel < HuggingfaceModel
       runtime_options[:chat_template_kwargs] || options[:chat_template_kwargs],
       runtime_options[:generation_kwargs] || options[:generation_kwargs],
       runtime_options[:tool_argument] || options[:tool_argument],
-      runtime_options[:response_parser] || options[:response_parser]
+      runtime_options[:response_parser] || options[:response_parser],
+      runtime_options.include?(:prefix_cache) ? runtime_options[:prefix_cache] : options[:prefix_cache]
+    )
+  end
+
+  # Like #chat, but yields the text of the answer as it is generated.
+  # Tool call blocks are not yielded; they are part of the returned message.
+  def chat_stream(messages, tools = nil, runtime_options = {})
+    init unless @state
+    model, tokenizer = @state
+
+    runtime_options = IndiferentHash.setup(runtime_options)
+
+    events = ScoutPython.call_method(
+      "scout_ai.huggingface.eval", :stream_causal_lm_response,
+      model, tokenizer, messages, tools,
+      runtime_options[:chat_template] || options[:chat_template],
+      runtime_options[:chat_template_kwargs] || options[:chat_template_kwargs],
+      runtime_options[:generation_kwargs] || options[:generation_kwargs],
+      runtime_options[:tool_argument] || options[:tool_argument],
+      runtime_options[:response_parser] || options[:response_parser],
+      runtime_options.include?(:prefix_cache) ? runtime_options[:prefix_cache] : options[:prefix_cache]
+    )
+
+    message = nil
+    ScoutPython.iterate(events) do |event|
+      case event["type"]
+      when "delta"
+        yield event["text"] if block_given?
+      when "message"
+        message = event["message"]
+      end
+    end
+    message
+  end
+
+  # Hits, misses and size of the KV cache that :prefix_cache reuses across
+  # turns of the same conversation.
+  def prefix_cache_stats
+    init unless @state
+    model, _tokenizer = @state
+    ScoutPython.dict2hash ScoutPython.call_method("scout_ai.huggingface.prefix_cache", :prefix_cache_stats, model)
+  end
+
+  # Like #chat for many conversations at once: they are left-padded into a
+  # single batch (or batches of :batch_size) and generated together. Returns
+  # one response message per conversation.
+  def chat_batch(conversations, tools = nil, runtime_options = {})
+    init unless @state
+    model, tokenizer = @state
+
+    runtime_options = IndiferentHash.setup(runtime_options)
+
+    ScoutPython.call_method(
+      "scout_ai.huggingface.eval", :eval_causal_lm_responses,
+      model, tokenizer, conversations, tools,
+      runtime_options[:chat_template] || options[:chat_template],
+      runtime_options[:chat_template_kwargs] || options[:chat_template_kwargs],
+      runtime_options[:generation_kwargs] || options[:generation_kwargs],
+      runtime_options[:tool_argument] || options[:tool_argument],
+      runtime_options[:response_parser] || options[:response_parser],
+      runtime_options[:batch_size] || options[:batch_size]
     )
   end
 end
@@ -1,5 +1,8 @@
 require_relative '../causal'
 
+# Fine-tunes with scout_ai.huggingface.train.next_token.train_next_token; its
+# arguments are given as training_* options, e.g. training_packing: true to
+# pack the texts into max_seq_length blocks
 class NextTokenModel < CausalModel
   def initialize(...)
     super(...)
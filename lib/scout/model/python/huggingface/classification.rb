@@ -7,21 +7,27 @@ class SequenceClassificationModel < HuggingfaceModel
     self.eval do |features,list|
       model, tokenizer = @state
       texts = list ? list : [features]
-      res = ScoutPython.call_method("scout_ai.huggingface.eval", :eval_model, model, tokenizer, texts, options[:locate_tokens])
-      list ? res : res[0]
+      # One (texts x labels) array of logits, run in length-sorted chunks
+      ScoutPython.call_method("scout_ai.huggingface.eval", :eval_model, model, tokenizer, texts, true, options[:batch_size])
     end
 
+    # Each result is the best label; with :top_k, the list of the best
+    # [label, probability] pairs instead. Softmax, argmax and top-k run in
+    # NumPy over all rows at once.
     post_process do |result,list|
-      model, tokenizer = @state
-
-      logit_list = list ? list.logits : result
-
-      res = ScoutPython.collect(logit_list) do |logits|
-        logits = ScoutPython.numpy2ruby logits
-        best_class = logits.index logits.max
-        best_class = options[:class_labels][best_class] if options[:class_labels]
-        best_class
-      end
+      logits = list ? list : result
+
+      classes = IndiferentHash.setup ScoutPython.dict2hash(ScoutPython.call_method("scout_ai.huggingface.eval", :classify_logits, logits, options[:top_k]))
+      labels = options[:class_labels]
+      label = labels ? proc { |index| labels[index] } : proc { |index| index }
+
+      res = if options[:top_k]
+              classes["top_k"].zip(classes["top_k_scores"]).collect do |indices,scores|
+                indices.collect(&label).zip(scores)
+              end
+            else
+              classes["predictions"].collect(&label)
+            end
 
       list ? res : res[0]
     end
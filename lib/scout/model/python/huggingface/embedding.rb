@@ -0,0 +1,27 @@
+require_relative '../huggingface'
+
+class EmbeddingModel < HuggingfaceModel
+  def initialize(...)
+    super("Embedding", ...)
+
+    # Options :batch_size (32), :pooling ('mean' or 'cls'), :normalize (true)
+    # and :max_length. Lists are embedded in length-sorted batches
+    self.eval do |features,list|
+      model, tokenizer = @state
+      texts = list ? list : [features]
+      normalize = options.include?(:normalize) ? options[:normalize] : true
+
+      embeddings = ScoutPython.call_method(
+        "scout_ai.huggingface.embed", :embed_texts,
+        model, tokenizer, texts,
+        options[:batch_size] || 32,
+        options[:pooling] || 'mean',
+        normalize,
+        options[:max_length]
+      )
+
+      res = ScoutPython.numpy2ruby embeddings
+      list ? res : res[0]
+    end
+  end
+end
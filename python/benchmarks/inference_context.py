@@ -0,0 +1,91 @@
+"""Latency and memory of ``eval_model`` with and without ``inference_context``.
+
+Runs a small randomly initialized BERT classifier (no download needed) over
+batches of texts in three modes, each in its own process so that the peak
+resident memory of one does not hide the others:
+
+* ``grad``: the model called directly, building autograd graphs, as
+  ``eval_model`` did before
+* ``inference``: ``eval_model`` under ``torch.inference_mode``
+* ``bf16``: the same with bfloat16 autocast on the CPU
+
+    PYTHONPATH=python python python/benchmarks/inference_context.py [batches] [batch_size]
+"""
+
+from __future__ import annotations
+
+import json
+import resource
+import subprocess
+import sys
+import time
+
+MODES = ("grad", "inference", "bf16")
+
+
+def build_model():
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    config = BertConfig(
+        vocab_size=30522, hidden_size=256, num_hidden_layers=4,
+        num_attention_heads=4, intermediate_size=1024, num_labels=2,
+    )
+    model = BertForSequenceClassification(config)
+    model.eval()
+
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + [f"word{i}" for i in range(30517)]
+    with open("/tmp/scout_ai_bench_vocab.txt", "w") as handle:
+        handle.write("\n".join(vocab))
+    tokenizer = BertTokenizerFast(vocab_file="/tmp/scout_ai_bench_vocab.txt")
+    return model, tokenizer
+
+
+def run(mode: str, batches: int, batch_size: int) -> dict:
+    from scout_ai.huggingface.eval import TIMINGS, configure_inference, eval_model, get_logits
+
+    model, tokenizer = build_model()
+    texts = [" ".join(f"word{(i * 7 + j) % 30000}" for j in range(128)) for i in range(batch_size)]
+
+    if mode == "bf16":
+        configure_inference(autocast="bf16")
+
+    # Warm up
+    eval_model(model, tokenizer, texts[:2])
+    TIMINGS.clear()
+
+    start = time.perf_counter()
+    for _ in range(batches):
+        if mode == "grad":
+            features = tokenizer(texts, return_tensors="pt", truncation=True)
+            predictions = model(**features)
+            get_logits(predictions)
+        else:
+            eval_model(model, tokenizer, texts)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "ms_per_batch": elapsed / batches * 1000,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main(batches: int = 20, batch_size: int = 32) -> None:
+    print(f"{batches} batches of {batch_size} texts, 128 tokens each")
+    print(f"{'mode':<12} {'ms/batch':>10} {'peak RSS MB':>12}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, str(batches), str(batch_size)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<12} {result['ms_per_batch']:>10.1f} {result['max_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--mode"]:
+        mode, batches, batch_size = args[1], int(args[2]), int(args[3])
+        print(json.dumps(run(mode, batches, batch_size)))
+    else:
+        main(*(int(arg) for arg in args))
@@ -0,0 +1,79 @@
+"""Memory and construction cost of ``scout_ai.Message``.
+
+Compares the slotted ``Message`` against the plain dataclass it replaced,
+building messages from JSON-like dictionaries as loading an archive does.
+
+    PYTHONPATH=python python python/benchmarks/message_memory.py [count]
+"""
+
+from __future__ import annotations
+
+import gc
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping
+
+from scout_ai import Message
+
+
+@dataclass
+class DataclassMessage:
+    """``Message`` as it was before: dataclass with an always allocated extra dict."""
+
+    role: str
+    content: Any = ""
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_data(cls, data: Mapping[str, Any]) -> "DataclassMessage":
+        role = str(data.get("role", ""))
+        content = data.get("content", "")
+        extra = {k: v for k, v in data.items() if k not in ("role", "content")}
+        return cls(role=role, content=content, extra=extra)
+
+
+def sample(count: int):
+    roles = ["system", "user", "assistant", "function_call", "function_call_output"]
+    data = []
+    for i in range(count):
+        # Roles as separate string objects, as json.loads produces them
+        message = {"role": "".join(roles[i % len(roles)]), "content": f"message {i}"}
+        if i % 10 == 0:
+            message["id"] = f"call_{i}"
+        data.append(message)
+    return data
+
+
+def memory_per_message(cls, data) -> float:
+    gc.collect()
+    tracemalloc.start()
+    messages = [cls.from_data(message) for message in data]
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del messages
+    return size / len(data)
+
+
+def time_per_message(cls, data) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    messages = [cls.from_data(message) for message in data]
+    elapsed = time.perf_counter() - start
+    del messages
+    return elapsed / len(data) * 1e9
+
+
+def main(count: int = 200_000) -> None:
+    data = sample(count)
+    print(f"{count} messages (10% with extra keys); content strings are shared and not counted")
+    print(f"{'implementation':<20} {'bytes/message':>14} {'ns/message':>12}")
+    for cls in (DataclassMessage, Message):
+        size = memory_per_message(cls, data)
+        elapsed = time_per_message(cls, data)
+        print(f"{cls.__name__:<20} {size:>14.1f} {elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -1,14 +1,18 @@
 from .agent import Agent, load_agent
-from .chat import Chat
-from .message import Message
+from .chat import Chat, ChatStream
+from .message import FrozenMessage, Message
 from .runner import CommandError, ScoutRunner
+from .worker import ScoutWorker
 
 __all__ = [
     "Agent",
     "Chat",
+    "ChatStream",
     "CommandError",
+    "FrozenMessage",
     "Message",
     "ScoutRunner",
+    "ScoutWorker",
     "load_agent",
 ]
 
@@ -20,8 +24,32 @@ except Exception:
     pass
 
 try:
-    from .data import TSVDataset, data_dir, tsv, tsv_dataset, tsv_loader
+    from .data import (
+        JSONLStream,
+        MemmapTSVDataset,
+        TSVDataset,
+        TSVStream,
+        data_dir,
+        jsonl_loader,
+        memmap_dataset,
+        tsv,
+        tsv_dataset,
+        tsv_loader,
+        tsv_to_memmap,
+    )
 
-    __all__ += ["TSVDataset", "data_dir", "tsv", "tsv_dataset", "tsv_loader"]
+    __all__ += [
+        "JSONLStream",
+        "MemmapTSVDataset",
+        "TSVDataset",
+        "TSVStream",
+        "data_dir",
+        "jsonl_loader",
+        "memmap_dataset",
+        "tsv",
+        "tsv_dataset",
+        "tsv_loader",
+        "tsv_to_memmap",
+    ]
 except Exception:
     pass
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Optional
+from typing import Any, Iterable, List, Optional
 
-from .chat import Chat
-from .runner import ScoutRunner
+from .chat import Chat, ChatStream
+from .runner import ScoutRunner, StderrCallback
 
 
 class Agent:
@@ -66,6 +66,42 @@ class Agent:
         self.current_chat.extend(delta)
         return delta.last_message()
 
+    def stream(self) -> ChatStream:
+        return self.current_chat.stream(agent_name=self.name)
+
+    def ask_batch(
+        self, prompts: Iterable[Any], max_parallel: Optional[int] = None, return_exceptions: bool = False
+    ) -> List[Chat]:
+        """Ask each prompt on its own branch of ``current_chat``.
+
+        A prompt is a user message string or a list of messages (or a
+        :class:`Chat`) to append. Returns the deltas in prompt order, see
+        :meth:`Chat.ask_batch`; ``current_chat`` is not modified.
+        """
+        chats = []
+        for prompt in prompts:
+            chat = self.current_chat.branch()
+            if isinstance(prompt, str):
+                chat.user(prompt)
+            else:
+                chat.extend(prompt)
+            chats.append(chat)
+        return Chat.ask_batch(
+            chats,
+            agent_name=self.name,
+            max_parallel=max_parallel,
+            return_exceptions=return_exceptions,
+            runner=self.runner,
+        )
+
+    async def ask_async(self, on_stderr: Optional[StderrCallback] = None) -> Chat:
+        return await self.current_chat.ask_async(agent_name=self.name, on_stderr=on_stderr)
+
+    async def chat_async(self, on_stderr: Optional[StderrCallback] = None):
+        delta = await self.ask_async(on_stderr=on_stderr)
+        self.current_chat.extend(delta)
+        return delta.last_message()
+
     def save(self, path, output_format: str = "chat"):
         return self.current_chat.save(path, output_format=output_format)
 
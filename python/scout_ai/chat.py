@@ -3,10 +3,54 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 
-from .message import Message
-from .runner import ScoutRunner
+from .message import Message, MessageList
+from .runner import ScoutRunner, StderrCallback
 
 _RESERVED_MESSAGE_ROLES = {"previous_response_id"}
+_TOOL_ROLES = {"function_call", "function_call_output"}
+
+
+class ChatStream:
+    """Iterator over the progress of an ask, returned by :meth:`Chat.stream`.
+
+    Yields ``str`` chunks of assistant text as the model produces them and a
+    :class:`Message` for each tool call and tool output. Backends that can not
+    stream produce each answer as a single chunk. Once exhausted, ``delta``
+    holds the new messages, as :meth:`Chat.ask` would have returned them.
+    """
+
+    def __init__(self, chat: "Chat", agent_name: Optional[str] = None):
+        self.chat = chat
+        self.agent_name = agent_name
+        self.delta: Optional[Chat] = None
+        self._events = chat.runner.stream_messages(chat.to_dicts(), agent_name=agent_name)
+
+    def __iter__(self) -> Iterator[str | Message]:
+        streamed_text = False
+        for event in self._events:
+            kind = event.get("type")
+            if kind == "delta":
+                streamed_text = True
+                yield event["text"]
+            elif kind == "message":
+                message = Message.from_data(event["message"])
+                if message.role in _TOOL_ROLES:
+                    yield message
+                elif message.role == "assistant" and not streamed_text and message.content:
+                    yield str(message)
+                streamed_text = False
+            elif kind == "done":
+                if "start" in event:
+                    self.delta = Chat(event["messages"], runner=self.chat.runner)
+                else:
+                    self.delta = self.chat._delta_from_updated_messages(event["messages"])
+
+    def text(self) -> str:
+        """Consume the stream and return the assistant text."""
+        return "".join(item for item in self if isinstance(item, str))
+
+    def close(self) -> None:
+        self._events.close()
 
 
 class Chat:
@@ -19,7 +63,7 @@ class Chat:
 
     def __init__(self, messages: Optional[Iterable[dict | Message]] = None, runner: Optional[ScoutRunner] = None):
         self.runner = runner or ScoutRunner()
-        self.messages: List[Message] = [Message.from_data(message) for message in (messages or [])]
+        self.messages: MessageList = MessageList(Message.from_data(message) for message in (messages or []))
 
     @classmethod
     def load(cls, path: str | Path, input_format: str = "chat", runner: Optional[ScoutRunner] = None) -> "Chat":
@@ -34,10 +78,16 @@ class Chat:
         return cls(messages, runner=runner)
 
     def branch(self) -> "Chat":
+        """New chat sharing the current messages with this one, see :class:`MessageList`."""
+        if not isinstance(self.messages, MessageList):
+            self.messages = MessageList(self.messages)
+        chat = Chat(runner=self.runner)
+        chat.messages = self.messages.branch()
+        return chat
+
+    def copy(self) -> "Chat":
         return Chat([message.to_dict() for message in self.messages], runner=self.runner)
 
-    copy = branch
-
     def to_dicts(self) -> List[Dict[str, Any]]:
         return [message.to_dict() for message in self.messages]
 
@@ -57,7 +107,7 @@ class Chat:
         return self.save(path, output_format="chat")
 
     def message(self, role: str, content: Any = "", **extra: Any) -> "Chat":
-        self.messages.append(Message(str(role), content, dict(extra)))
+        self.messages.append(Message(role, content, extra))
         return self
 
     def extend(self, messages: Iterable[dict | Message | "Chat"] | dict | Message | "Chat") -> "Chat":
@@ -187,12 +237,11 @@ class Chat:
         return None
 
     def _delta_from_updated_messages(self, updated_messages: Iterable[dict | Message]) -> "Chat":
-        old = self.to_dicts()
-        updated = [Message.from_data(message).to_dict() for message in updated_messages]
+        updated = list(updated_messages)
 
         prefix_len = 0
-        for current, new in zip(old, updated):
-            if current == new:
+        for current, new in zip(self.messages, updated):
+            if current.matches(new):
                 prefix_len += 1
             else:
                 break
@@ -200,14 +249,77 @@ class Chat:
         return Chat(updated[prefix_len:], runner=self.runner)
 
     def ask(self, agent_name: Optional[str] = None) -> "Chat":
-        updated_messages = self.runner.ask_messages(self.to_dicts(), agent_name=agent_name)
-        return self._delta_from_updated_messages(updated_messages)
+        ask_delta = getattr(self.runner, "ask_delta", None)
+        if ask_delta is None:
+            updated_messages = self.runner.ask_messages(self.to_dicts(), agent_name=agent_name)
+            return self._delta_from_updated_messages(updated_messages)
+        _start, new_messages = ask_delta(self.to_dicts(), agent_name=agent_name)
+        return Chat(new_messages, runner=self.runner)
 
     def chat(self, agent_name: Optional[str] = None) -> Optional[Message]:
         delta = self.ask(agent_name=agent_name)
         self.extend(delta)
         return delta.last_message()
 
+    @classmethod
+    def ask_batch(
+        cls,
+        chats: Iterable["Chat"],
+        agent_name: Optional[str] = None,
+        max_parallel: Optional[int] = None,
+        return_exceptions: bool = False,
+        runner: Optional[ScoutRunner] = None,
+    ) -> List["Chat"]:
+        """Ask several chats in one runner invocation and return their deltas.
+
+        Deltas are returned in the order of ``chats``. A failed chat raises its
+        :class:`CommandError` (stopping the batch) unless ``return_exceptions``
+        is set, in which case the error takes its place in the result.
+        """
+        chats = list(chats)
+        if not chats:
+            return []
+        runner = runner or chats[0].runner
+
+        deltas: List[Any] = []
+        results = runner.ask_many(
+            [chat.to_dicts() for chat in chats], agent_name=agent_name, max_parallel=max_parallel, ordered=True
+        )
+        for index, updated_messages in results:
+            if isinstance(updated_messages, Exception):
+                if not return_exceptions:
+                    results.close()
+                    raise updated_messages
+                deltas.append(updated_messages)
+            else:
+                deltas.append(chats[index]._delta_from_updated_messages(updated_messages))
+        return deltas
+
+    def stream(self, agent_name: Optional[str] = None) -> ChatStream:
+        """Ask and iterate over the answer while it is produced, see :class:`ChatStream`.
+
+        Like :meth:`ask`, the chat is not modified; extend it with the
+        stream's ``delta`` to continue the conversation.
+        """
+        return ChatStream(self, agent_name=agent_name)
+
+    async def ask_async(self, agent_name: Optional[str] = None, on_stderr: Optional[StderrCallback] = None) -> "Chat":
+        ask_delta_async = getattr(self.runner, "ask_delta_async", None)
+        if ask_delta_async is None:
+            updated_messages = await self.runner.ask_messages_async(
+                self.to_dicts(), agent_name=agent_name, on_stderr=on_stderr
+            )
+            return self._delta_from_updated_messages(updated_messages)
+        _start, new_messages = await ask_delta_async(self.to_dicts(), agent_name=agent_name, on_stderr=on_stderr)
+        return Chat(new_messages, runner=self.runner)
+
+    async def chat_async(
+        self, agent_name: Optional[str] = None, on_stderr: Optional[StderrCallback] = None
+    ) -> Optional[Message]:
+        delta = await self.ask_async(agent_name=agent_name, on_stderr=on_stderr)
+        self.extend(delta)
+        return delta.last_message()
+
     def __len__(self) -> int:
         return len(self.messages)
 
@@ -0,0 +1,263 @@
+"""Pure-Python implementation of the Scout ``.chat`` text format.
+
+This is a line-by-line port of ``Chat.parse`` and ``Chat.print`` from
+``lib/scout/llm/chat/parse.rb``, plus the side-effect free part of
+``LLM.chat`` (``Chat.clear`` and ``Chat.clean``). Ruby remains the reference
+implementation: the golden files under ``test/fixtures/chat_format`` are
+checked against both, and chats using roles that need the Scout runtime
+(imports, files, tasks, jobs, ...) must still be processed by Ruby, see
+:func:`needs_ruby`.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+# Ruby's String#strip and regexp \s are ASCII-only, unlike Python's defaults
+_RUBY_STRIP = " \t\n\v\f\r\x00"
+_RUBY_SPACE = " \t\n\v\f\r"
+
+_CMD_OPEN = re.compile(r"^[^%s]*:-- .* \{\{\{" % _RUBY_SPACE)
+_CMD_OPEN_SUB = re.compile(r"^[^%s]*:-- (.*) \{\{\{.*" % _RUBY_SPACE)
+_CMD_CLOSE = re.compile(r"^.*:--.* \}\}\}")
+_CMD_CLOSE_SUB = re.compile(r"^.*:-- .* \}\}\}.*")
+_XML_CLOSE = re.compile(r"</(\w+)>", re.ASCII)
+_XML_OPEN = re.compile(r"^<(\w+)(\s+[^>]*)?>", re.ASCII)
+_HEADER = re.compile(r"^([a-z0-9_]+):(.*)$")
+_ESCAPED_HEADER = re.compile(r"^\\([a-z0-9_]+):(.*)$")
+_PRINT_ESCAPE = re.compile(r"^([a-z]+:)([%s])" % _RUBY_SPACE, re.MULTILINE)
+
+_INLINE_ROLES = {"option", "previous_response_id", "function_call", "function_call_output", "meta"}
+
+# Roles that ``LLM.chat`` resolves with the Scout runtime (files, workflows,
+# jobs, configuration). Chats containing them are delegated to Ruby.
+RUBY_ROLES = frozenset(
+    {
+        "import", "continue", "last",
+        "config",
+        "task", "inline_task", "exec_task",
+        "job", "inline_job",
+        "file", "directory", "pdf", "image", "step",
+        "allow_path", "allow_read_path",
+    }
+)
+
+
+def _strip(text: str) -> str:
+    return text.strip(_RUBY_STRIP)
+
+
+def _split_lines(text: str) -> List[str]:
+    # Ruby's String#split drops trailing empty fields
+    lines = text.split("\n")
+    while lines and lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def parse(text: str, role: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Parse chat text into messages, like ``Chat.parse``."""
+    messages: List[Dict[str, Any]] = []
+    current_role = role or "user"
+    current_content = ""
+    in_protected_block = False
+    protected_block_type: Optional[str] = None
+    protected_stack: List[str] = []
+
+    for line in _split_lines(text):
+        stripped = _strip(line)
+
+        if stripped.startswith("```"):
+            if in_protected_block:
+                if protected_block_type == "ticks":
+                    in_protected_block = False
+                    protected_block_type = None
+                    current_content += "\n" + line
+            else:
+                in_protected_block = True
+                protected_block_type = "ticks"
+                current_content += "\n" + line
+            continue
+        elif stripped.endswith("]]") and in_protected_block and protected_block_type == "square":
+            in_protected_block = False
+            protected_block_type = None
+            line = line.replace("]]", "", 1)
+            if _strip(line):
+                current_content += "\n" + line
+            continue
+        elif stripped.startswith("[["):
+            in_protected_block = True
+            protected_block_type = "square"
+            line = line.replace("[[", "", 1)
+            if _strip(line):
+                current_content += "\n" + line
+            continue
+        elif _CMD_OPEN.search(stripped):
+            in_protected_block = True
+            protected_block_type = "square"
+            line = _CMD_OPEN_SUB.sub(r'<cmd_output cmd="\1">', line, count=1)
+            if _strip(line):
+                current_content += "\n" + line
+            continue
+        elif _CMD_CLOSE.search(stripped) and in_protected_block and protected_block_type == "square":
+            in_protected_block = False
+            protected_block_type = None
+            line = _CMD_CLOSE_SUB.sub("</cmd_output>", line, count=1)
+            if _strip(line):
+                current_content += "\n" + line
+            continue
+        elif in_protected_block:
+            if protected_block_type == "xml":
+                match = _XML_CLOSE.search(stripped)
+                if match:
+                    if protected_stack and protected_stack[-1] == match.group(1):
+                        protected_stack.pop()
+                    if not protected_stack:
+                        in_protected_block = False
+                        protected_block_type = None
+            current_content += "\n" + line
+            continue
+
+        match = _XML_OPEN.search(stripped)
+        if match and f"</{match.group(1)}>" in text:
+            protected_stack.append(match.group(1))
+            in_protected_block = True
+            current_content += "\n" + line
+            protected_block_type = "xml"
+            continue
+
+        header = _HEADER.search(line)
+        if header:
+            role = header.group(1)
+            inline_content = _strip(header.group(2))
+
+            current_content = _strip(current_content)
+            if current_content:
+                messages.append({"role": current_role, "content": current_content})
+            elif not messages:
+                messages.append({"role": current_role, "content": ""})
+
+            if not inline_content:
+                current_role = role
+            else:
+                messages.append({"role": role, "content": inline_content})
+                if role in ("previous_response_id", "agent"):
+                    current_role = "user"
+            current_content = ""
+        elif _ESCAPED_HEADER.search(line):
+            current_content += "\n" + line[1:]
+        else:
+            current_content += "\n" + line
+
+    if current_content:
+        messages.append({"role": current_role, "content": _strip(current_content)})
+
+    return messages
+
+
+def _ruby_float(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    text = repr(value)
+    if "e" in text:
+        mantissa, exponent = text.split("e")
+        if "." not in mantissa:
+            mantissa += ".0"
+        text = mantissa + "e" + exponent
+    return text
+
+
+def _to_s(value: Any) -> str:
+    """Ruby ``to_s`` for the JSON-compatible values messages carry."""
+    if value is None:
+        return ""
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, float):
+        return _ruby_float(value)
+    return str(value)
+
+
+def _to_json(value: Any) -> str:
+    """Ruby ``to_json``: compact, UTF-8, with Ruby float formatting."""
+    if isinstance(value, Mapping):
+        items = (json.dumps(str(key), ensure_ascii=False) + ":" + _to_json(item) for key, item in value.items())
+        return "{" + ",".join(items) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_to_json(item) for item in value) + "]"
+    if isinstance(value, float) and math.isfinite(value):
+        return _ruby_float(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _render_message(message: Mapping[str, Any]) -> str:
+    role = _to_s(message.get("role"))
+    content = message.get("content")
+
+    if isinstance(content, (Mapping, list, tuple)):
+        return role + ":\n\n" + _to_json(content)
+    if content is None or content == "":
+        return role + ":"
+    if role in _INLINE_ROLES:
+        return role + ": " + _to_s(content)
+    return role + ":\n\n" + _PRINT_ESCAPE.sub(r"\\\1\2", _to_s(content))
+
+
+def render(messages: Iterable[Mapping[str, Any]] | str) -> str:
+    """Render messages as chat text, like ``Chat.print``."""
+    if isinstance(messages, str):
+        return messages
+    return "\n" + "\n\n".join(_render_message(message) for message in messages)
+
+
+def clean(messages: Iterable[Dict[str, Any]], role: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Drop messages with empty text content (and ``role``), like ``Chat.clean``."""
+    return [
+        message
+        for message in messages
+        if not (isinstance(message.get("content"), str) and message["content"] == "")
+        and not (role is not None and _to_s(message.get("role")) == role)
+    ]
+
+
+def clear(messages: Iterable[Dict[str, Any]], role: str = "clear") -> List[Dict[str, Any]]:
+    """Apply ``clear``, ``clear_tools`` and ``clean_role`` messages, like ``Chat.clear``."""
+    new: List[Dict[str, Any]] = []
+    clear_tools = False
+    clean_roles: List[str] = []
+
+    for message in reversed(list(messages)):
+        message_role = _to_s(message.get("role"))
+        if message_role == role:
+            break
+        elif message_role == "clear_tools":
+            clear_tools = _to_s(message.get("content")) != "false"
+        elif message_role in ("function_call", "function_call_output"):
+            if not clear_tools:
+                new.append(message)
+        elif message_role in ("clean_role", "clear_role"):
+            clean_roles.append(_strip(_to_s(message.get("content"))))
+        else:
+            new.append(message)
+
+    new.reverse()
+    for clean_role in clean_roles:
+        new = clean(new, clean_role)
+    return new
+
+
+def needs_ruby(messages: Iterable[Mapping[str, Any]]) -> bool:
+    """Whether ``LLM.chat`` would need the Scout runtime to process these messages."""
+    return any(_to_s(message.get("role")) in RUBY_ROLES for message in messages)
+
+
+def process(messages: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The part of ``LLM.chat`` that does not need the Scout runtime."""
+    return clean(clear(messages))
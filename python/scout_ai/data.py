@@ -1,25 +1,387 @@
+import abc
+import gzip
+import itertools
+import json
+import os
+import random
+
+import numpy as np
 import scout
 import torch
 
 
+def _column_array(frame, integers=False):
+    """Contiguous float32 array for a frame (or series) of numbers, int64 when
+    integers is set and they are all integers, or an object array when it
+    holds something else"""
+    values = frame.to_numpy()
+    if integers and values.dtype.kind in "biu":
+        return np.ascontiguousarray(values, dtype=np.int64)
+    if values.dtype.kind in "biuf":
+        return np.ascontiguousarray(values, dtype=np.float32)
+    try:
+        return np.ascontiguousarray(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        return values
+
+
+def _as_tensor(values):
+    return torch.from_numpy(values) if values.dtype != object else values
+
+
 class TSVDataset(torch.utils.data.Dataset):
+    """
+    Dataset over a TSV frame whose last column is the label. The frame is
+    converted once into a float32 features matrix and a label vector (int64
+    or float32; tensors when numeric, as with MemmapTSVDataset and
+    TSVStream), so fetching samples is array indexing instead of pandas row
+    lookups. Samples are addressed by position or by the key of the row.
+
+    A list of positions or keys returns the whole batch at once, as a
+    (features, labels) pair; __getitems__ serves DataLoader batches from a
+    single gather.
+    """
+
     def __init__(self, tsv):
         self.tsv = tsv
+        self.keys = list(tsv.index)
+        self.key_index = {key: position for position, key in enumerate(self.keys)}
+        self.features = _as_tensor(_column_array(tsv.iloc[:, :-1]))
+        self.labels = _as_tensor(_column_array(tsv.iloc[:, -1], integers=True))
+
+    def _position(self, key):
+        if isinstance(key, (int, np.integer)):
+            return int(key)
+        return self.key_index[key]
+
+    def _positions(self, keys):
+        if isinstance(keys, torch.Tensor):
+            keys = keys.tolist()
+        return np.fromiter((self._position(key) for key in keys), dtype=np.int64, count=len(keys))
+
+    def _rows(self, positions):
+        return self.features[positions], self.labels[positions]
 
     def __getitem__(self, key):
-        if type(key) == int:
-            row = self.tsv.iloc[key]
-        else:
-            row = self.tsv.loc[key]
+        if isinstance(key, (list, tuple, np.ndarray, torch.Tensor)):
+            return self._rows(self._positions(key))
+        return self._rows(self._position(key))
+
+    def __getitems__(self, keys):
+        features, labels = self[list(keys)]
+        return list(zip(features, labels))
+
+    def __len__(self):
+        return len(self.keys)
+
+
+HEADER = "header.json"
+KEYS = "keys.txt"
+FEATURES = "features.npy"
+LABELS = "labels.npy"
+
+
+def _open_text(filename):
+    filename = str(filename)
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt", encoding="utf-8")
+    return open(filename, encoding="utf-8")
+
+
+def _tsv_rows(filename):
+    """Header fields and a generator of rows of a Scout TSV, read line by line"""
+    handle = _open_text(filename)
+    header = None
+    for line in handle:
+        line = line.rstrip("\n")
+        if line.startswith("#:"):
+            continue
+        if line.startswith("#"):
+            header = line[1:].split("\t")
+            break
+        header = [f"Field{i}" for i in range(len(line.split("\t")))]
+        handle.seek(0)
+        break
+
+    def rows():
+        with handle:
+            for line in handle:
+                line = line.rstrip("\n")
+                if line and not line.startswith("#"):
+                    yield line.split("\t")
+
+    return header, rows()
+
+
+def _value_kind(value, kind):
+    """Narrowest of int, float and str that holds value and the previous kind"""
+    if kind == "str":
+        return kind
+    if value == "":
+        return "float"
+    if kind == "int":
+        try:
+            int(value)
+            return kind
+        except ValueError:
+            pass
+    try:
+        float(value)
+        return "float"
+    except ValueError:
+        return "str"
+
+
+def tsv_to_memmap(filename, path):
+    """
+    Convert a Scout TSV into a directory that MemmapTSVDataset reads lazily:
+    features.npy (float32 rows x fields), labels.npy (the last column, int64
+    or float32), keys.txt (one row key per line) and header.json with the
+    field names, dtypes and the categories of text columns, which are stored
+    as integer codes. The file is streamed twice, never loaded whole.
+    """
+    fields, rows = _tsv_rows(filename)
+    key_field, fields = fields[0], fields[1:]
+    kinds = ["int"] * len(fields)
+    count = 0
+    for row in rows:
+        for i, value in enumerate(row[1:]):
+            kinds[i] = _value_kind(value, kinds[i])
+        count += 1
+
+    os.makedirs(path, exist_ok=True)
+    label_dtype = np.int64 if kinds[-1] in ("int", "str") else np.float32
+    features = np.lib.format.open_memmap(
+        os.path.join(path, FEATURES), mode="w+", dtype=np.float32, shape=(count, len(fields) - 1)
+    )
+    labels = np.lib.format.open_memmap(os.path.join(path, LABELS), mode="w+", dtype=label_dtype, shape=(count,))
+
+    # Codes are assigned once the kinds are final, so values read while a
+    # column still looked numeric get one too
+    categories = [{} for _ in fields]
+
+    def convert(value, i):
+        if kinds[i] == "str":
+            return categories[i].setdefault(value, len(categories[i]))
+        return float(value) if value != "" else np.nan
+
+    _, rows = _tsv_rows(filename)
+    with open(os.path.join(path, KEYS), "w", encoding="utf-8") as keys:
+        for position, row in enumerate(rows):
+            keys.write(row[0] + "\n")
+            values = row[1:]
+            features[position] = [convert(value, i) for i, value in enumerate(values[:-1])]
+            labels[position] = convert(values[-1], len(fields) - 1)
+
+    features.flush()
+    labels.flush()
+    del features, labels
+
+    header = {
+        "key_field": key_field,
+        "fields": fields,
+        "dtypes": ["float32"] * (len(fields) - 1) + [np.dtype(label_dtype).name],
+        "kinds": kinds,
+        "categories": {field: list(codes) for field, codes, kind in zip(fields, categories, kinds) if kind == "str"},
+        "rows": count,
+    }
+    with open(os.path.join(path, HEADER), "w", encoding="utf-8") as handle:
+        json.dump(header, handle)
+    return path
+
+
+class MemmapTSVDataset(TSVDataset):
+    """
+    TSVDataset over a directory written by tsv_to_memmap. Features and labels
+    are memory mapped read only, so DataLoader workers share the pages of the
+    files instead of each holding a copy of the table; the maps are opened
+    again in each worker rather than pickled. Row keys are only read the
+    first time a sample is fetched by key.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(os.path.join(self.path, HEADER), encoding="utf-8") as handle:
+            self.header = json.load(handle)
+        self._features = self._labels = None
+        self._keys = self._key_index = None
 
-        row = row.to_numpy()
-        features = row[:-1]
-        label = row[-1]
+    @property
+    def features(self):
+        if self._features is None:
+            self._features = np.load(os.path.join(self.path, FEATURES), mmap_mode="r")
+        return self._features
 
-        return features, label
+    @property
+    def labels(self):
+        if self._labels is None:
+            self._labels = np.load(os.path.join(self.path, LABELS), mmap_mode="r")
+        return self._labels
+
+    @property
+    def keys(self):
+        if self._keys is None:
+            with open(os.path.join(self.path, KEYS), encoding="utf-8") as handle:
+                self._keys = handle.read().splitlines()
+        return self._keys
+
+    @property
+    def key_index(self):
+        if self._key_index is None:
+            self._key_index = {key: position for position, key in enumerate(self.keys)}
+        return self._key_index
+
+    def _rows(self, positions):
+        return torch.from_numpy(np.array(self.features[positions])), torch.from_numpy(np.array(self.labels[positions]))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_features"] = state["_labels"] = None
+        return state
 
     def __len__(self):
-        return len(self.tsv)
+        return self.header["rows"]
+
+
+def memmap_dataset(filename, path, *, rebuild=False):
+    """MemmapTSVDataset for a Scout TSV, converting it into path first unless done"""
+    if rebuild or not os.path.exists(os.path.join(str(path), HEADER)):
+        tsv_to_memmap(filename, path)
+    return MemmapTSVDataset(path)
+
+
+def _shard():
+    """Index and count of the shards the stream is split into: one per
+    DataLoader worker of each distributed rank"""
+    rank, world_size = 0, 1
+    if torch.distributed.is_available() and torch.distributed.is_initialized():
+        rank, world_size = torch.distributed.get_rank(), torch.distributed.get_world_size()
+    else:
+        rank, world_size = int(os.environ.get("RANK", 0)), int(os.environ.get("WORLD_SIZE", 1))
+
+    info = torch.utils.data.get_worker_info()
+    worker, workers = (info.id, info.num_workers) if info is not None else (0, 1)
+    return rank * workers + worker, world_size * workers
+
+
+class _StreamDataset(torch.utils.data.IterableDataset, abc.ABC):
+    """
+    Records of a file read in chunks of lines. Each DataLoader worker of each
+    rank takes every n-th record, so together they see the file once per
+    epoch, and a shuffle buffer of shuffle_buffer records randomizes the
+    order with constant memory. Call set_epoch to shuffle differently in each
+    epoch.
+    """
+
+    def __init__(self, filename, shuffle_buffer=0, seed=None, chunk_size=1024):
+        self.filename = str(filename)
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    @abc.abstractmethod
+    def _lines(self):
+        """The records of the file, one string (or split row) each"""
+
+    @abc.abstractmethod
+    def _convert(self, lines):
+        """Samples for a chunk of records"""
+
+    def _records(self):
+        shard, shards = _shard()
+        lines = itertools.islice(self._lines(), shard, None, shards)
+        while True:
+            chunk = list(itertools.islice(lines, self.chunk_size))
+            if not chunk:
+                return
+            yield from self._convert(chunk)
+
+    def __iter__(self):
+        records = self._records()
+        if not self.shuffle_buffer:
+            yield from records
+            return
+
+        shard, _ = _shard()
+        rng = random.Random(None if self.seed is None else f"{self.seed}:{self.epoch}:{shard}")
+        buffer = []
+        for record in records:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(record)
+                continue
+            position = rng.randrange(len(buffer))
+            yield buffer[position]
+            buffer[position] = record
+        rng.shuffle(buffer)
+        yield from buffer
+
+
+class TSVStream(_StreamDataset):
+    """
+    Streaming counterpart of TSVDataset: (features, label) samples of a Scout
+    TSV, last column as label, read a chunk at a time. Features must be
+    numeric. Unless label_dtype is given, the label type is chosen from the
+    first chunk_size rows of the file, the same for every worker: int64 when
+    they all parse as integers, float32 when they parse as numbers, and
+    strings otherwise. Later labels are cast to it, and a ValueError is
+    raised for one that does not fit.
+    """
+
+    def __init__(self, filename, shuffle_buffer=0, seed=None, chunk_size=1024, label_dtype=None):
+        super().__init__(filename, shuffle_buffer=shuffle_buffer, seed=seed, chunk_size=chunk_size)
+        self.label_dtype = label_dtype
+
+    def _lines(self):
+        _, rows = _tsv_rows(self.filename)
+        return rows
+
+    def _infer_label_dtype(self):
+        values = [row[-1] for row in itertools.islice(self._lines(), self.chunk_size)]
+        for dtype in (np.int64, np.float32):
+            try:
+                np.asarray(values, dtype=dtype)
+                return dtype
+            except ValueError:
+                pass
+        return str
+
+    def _records(self):
+        self._label_dtype = self.label_dtype if self.label_dtype is not None else self._infer_label_dtype()
+        return super()._records()
+
+    def _labels(self, values):
+        if self._label_dtype is str:
+            return values
+        try:
+            return torch.from_numpy(np.asarray(values, dtype=self._label_dtype))
+        except ValueError as error:
+            raise ValueError(
+                f"Labels in {self.filename} do not fit the {np.dtype(self._label_dtype).name} type of the first rows; "
+                "pass label_dtype"
+            ) from error
+
+    def _convert(self, rows):
+        features = np.array(
+            [[float(value) if value != "" else np.nan for value in row[1:-1]] for row in rows], dtype=np.float32
+        )
+        return zip(torch.from_numpy(features), self._labels([row[-1] for row in rows]))
+
+
+class JSONLStream(_StreamDataset):
+    """Streaming dataset of the records of a JSON lines file, as dicts"""
+
+    def _lines(self):
+        with _open_text(self.filename) as handle:
+            for line in handle:
+                if line.strip():
+                    yield line
+
+    def _convert(self, lines):
+        return [json.loads(line) for line in lines]
 
 
 def tsv_dataset(filename, *args, **kwargs):
@@ -30,9 +392,25 @@ def tsv(*args, **kwargs):
     return tsv_dataset(*args, **kwargs)
 
 
-def tsv_loader(*args, **kwargs):
-    dataset = tsv(*args, kwargs)
-    return torch.utils.data.DataLoader(dataset, batch_size=2, shuffle=True)
+def tsv_loader(*args, batch_size=2, shuffle=True, stream=False, shuffle_buffer=10_000, seed=None, num_workers=0, **kwargs):
+    """
+    DataLoader over a Scout TSV. With stream=True the file is read through a
+    TSVStream, in constant memory, shuffled through a buffer of
+    shuffle_buffer samples; the remaining keyword arguments go to TSVStream
+    instead of scout.tsv.
+    """
+    if not stream:
+        dataset = tsv(*args, **kwargs)
+        return torch.utils.data.DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers)
+
+    dataset = TSVStream(*args, shuffle_buffer=shuffle_buffer if shuffle else 0, seed=seed, **kwargs)
+    return torch.utils.data.DataLoader(dataset, batch_size=batch_size, num_workers=num_workers)
+
+
+def jsonl_loader(filename, batch_size=2, shuffle=True, shuffle_buffer=10_000, seed=None, num_workers=0, collate_fn=None, **kwargs):
+    """DataLoader streaming the records of a JSON lines file through a JSONLStream"""
+    dataset = JSONLStream(filename, shuffle_buffer=shuffle_buffer if shuffle else 0, seed=seed, **kwargs)
+    return torch.utils.data.DataLoader(dataset, batch_size=batch_size, num_workers=num_workers, collate_fn=collate_fn)
 
 
 def data_dir():
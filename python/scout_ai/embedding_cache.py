@@ -0,0 +1,256 @@
+"""On-disk cache of text embeddings shared by Python and Ruby.
+
+A cache is a directory holding the vectors of one embedding model:
+
+* ``vectors.f32``: a float32 little-endian matrix, one row per text, read
+  through ``numpy.memmap``
+* ``index.tsv``: ``<sha256 of the text>\\t<row>`` lines, appended as rows are
+* ``meta.json``: the dimension and a ``generation`` bumped on every compaction
+
+Texts are identified by content, so the same text is only embedded once per
+model no matter where it comes from. Writers take an exclusive ``flock`` on
+``lock``, append rows before their index lines, and readers pick up appended
+lines (or a new generation) on their next lookup. When the vectors take more
+than ``max_bytes`` the oldest rows are dropped until they fit in three
+quarters of it. ``LLM::EmbeddingCache`` in Ruby reads and writes the same
+format.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+VECTORS = "vectors.f32"
+INDEX = "index.tsv"
+META = "meta.json"
+LOCK = "lock"
+
+
+def default_root() -> str:
+    return os.environ.get("SCOUT_AI_EMBEDDING_CACHE") or os.path.expanduser("~/.scout/var/cache/embeddings")
+
+
+def model_key(
+    model: str,
+    pooling: Optional[str] = None,
+    normalize: bool = True,
+    source: Optional[str] = None,
+    max_length: Optional[int] = None,
+) -> str:
+    """Directory name for the embeddings of ``model``; same as ``LLM::EmbeddingCache.model_key``.
+
+    ``source`` tells apart servers offering a model under the same name (None
+    for local models) and ``max_length`` the truncation of the texts.
+    """
+    key = re.sub(r"[^\w.-]", "_", str(model))
+    if pooling == "cls":
+        key += "-cls"
+    if not normalize:
+        key += "-raw"
+    if max_length:
+        key += f"-max{int(max_length)}"
+    if source:
+        key += "-" + hashlib.sha256(str(source).encode("utf-8")).hexdigest()[:12]
+    return key
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed embeddings of one model, memory mapped from ``path``."""
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._index_offset = 0
+        self._generation = None
+        self._dim: Optional[int] = None
+        self._matrix = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_model(
+        cls, model: str, root: Optional[str] = None, pooling=None, normalize=True, source=None, max_length=None, **kwargs
+    ) -> "EmbeddingCache":
+        key = model_key(model, pooling, normalize, source=source, max_length=max_length)
+        return cls(os.path.join(root or default_root(), key), **kwargs)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _exclusive(self):
+        with open(self._file(LOCK), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_meta(self):
+        try:
+            with open(self._file(META)) as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return {}
+
+    def _write_meta(self, meta):
+        tmp = self._file(META + ".tmp")
+        with open(tmp, "w") as handle:
+            json.dump(meta, handle)
+        os.replace(tmp, self._file(META))
+
+    def _refresh(self):
+        """Catch up with rows written by other processes or cache instances."""
+        meta = self._read_meta()
+        if meta.get("generation") != self._generation:
+            self._generation = meta.get("generation")
+            self._rows = {}
+            self._index_offset = 0
+            self._matrix = None
+        self._dim = meta.get("dim")
+
+        try:
+            with open(self._file(INDEX), "rb") as handle:
+                handle.seek(self._index_offset)
+                data = handle.read()
+        except FileNotFoundError:
+            return
+
+        # Only complete lines; a writer may be halfway through one
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].decode("utf-8").splitlines():
+            key, row = line.split("\t")
+            self._rows[key] = int(row)
+        self._index_offset += complete
+
+    def _vectors(self):
+        import numpy as np
+
+        rows = max(self._rows.values(), default=-1) + 1
+        if self._matrix is None or self._matrix.shape[0] < rows:
+            self._matrix = np.memmap(self._file(VECTORS), dtype="<f4", mode="r", shape=(rows, self._dim))
+        return self._matrix
+
+    def get(self, texts: Sequence[str]) -> List[Optional[Any]]:
+        """Cached vector of each text (a float32 array), or ``None`` when missing."""
+        keys = [text_key(text) for text in texts]
+        with self._lock:
+            self._refresh()
+            found = [self._rows.get(key) for key in keys]
+            matrix = self._vectors() if any(row is not None for row in found) else None
+            vectors = [None if row is None else matrix[row] for row in found]
+            hits = sum(row is not None for row in found)
+            self.hits += hits
+            self.misses += len(found) - hits
+        return vectors
+
+    def put(self, texts: Sequence[str], vectors) -> None:
+        import numpy as np
+
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        if vectors.ndim != 2 or vectors.shape[0] != len(texts):
+            raise ValueError("Expected one vector per text")
+        if len(texts) == 0:
+            return
+
+        with self._lock, self._exclusive():
+            self._refresh()
+            meta = self._read_meta()
+            dim = meta.get("dim")
+            if dim is None:
+                dim = vectors.shape[1]
+                self._write_meta({"dim": dim, "generation": meta.get("generation", 0)})
+                self._dim = dim
+            elif dim != vectors.shape[1]:
+                raise ValueError(f"Cache at {self.path} holds vectors of dimension {dim}, not {vectors.shape[1]}")
+
+            with open(self._file(VECTORS), "ab") as handle:
+                start = handle.tell() // (4 * dim)
+                handle.write(vectors.tobytes())
+            with open(self._file(INDEX), "a", encoding="utf-8") as handle:
+                handle.write("".join(f"{text_key(text)}\t{start + i}\n" for i, text in enumerate(texts)))
+
+            if self.max_bytes and (start + len(texts)) * 4 * dim > self.max_bytes:
+                self._compact(dim, meta.get("generation", 0))
+
+    def _compact(self, dim, generation):
+        """Keep the newest rows that fit in three quarters of ``max_bytes``."""
+        import numpy as np
+
+        self._refresh()
+        keep = int(self.max_bytes * 0.75) // (4 * dim)
+        newest = sorted(self._rows.items(), key=lambda item: item[1], reverse=True)[:keep]
+        newest.reverse()
+
+        matrix = self._vectors()
+        kept = np.ascontiguousarray(matrix[[row for _, row in newest]], dtype="<f4") if newest else np.empty((0, dim), "<f4")
+
+        with open(self._file(VECTORS + ".tmp"), "wb") as handle:
+            handle.write(kept.tobytes())
+        with open(self._file(INDEX + ".tmp"), "w", encoding="utf-8") as handle:
+            handle.write("".join(f"{key}\t{row}\n" for row, (key, _) in enumerate(newest)))
+
+        os.replace(self._file(VECTORS + ".tmp"), self._file(VECTORS))
+        os.replace(self._file(INDEX + ".tmp"), self._file(INDEX))
+        self._write_meta({"dim": dim, "generation": generation + 1})
+        self._matrix = None
+        self._refresh()
+
+    def embed(self, texts: Sequence[str], embed_fn: Callable[[List[str]], Any]):
+        """Vectors of ``texts`` as a float32 matrix, calling ``embed_fn`` only for the missing ones."""
+        import numpy as np
+
+        texts = [str(text) for text in texts]
+        vectors = self.get(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            computed = np.asarray(embed_fn(missing), dtype=np.float32)
+            self.put(missing, computed)
+            by_text = dict(zip(missing, computed))
+            vectors = [by_text[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+
+        if not vectors:
+            return np.empty((0, self._dim or 0), dtype=np.float32)
+        return np.array(vectors, dtype=np.float32)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._rows),
+                "dim": self._dim,
+                "bytes": os.path.getsize(self._file(VECTORS)) if os.path.exists(self._file(VECTORS)) else 0,
+            }
+
+    def clear(self) -> None:
+        with self._lock, self._exclusive():
+            generation = self._read_meta().get("generation", 0)
+            for name in (VECTORS, INDEX):
+                try:
+                    os.remove(self._file(name))
+                except FileNotFoundError:
+                    pass
+            self._write_meta({"dim": None, "generation": generation + 1})
+            self._refresh()
@@ -10,13 +10,38 @@ def load_tsv(tsv_file):
     d["train"] = ds
     return d
 
-def load_json(json_file):
-    return datasets.load_dataset('json', data_files=[json_file])
+def load_json(json_file, streaming=False, shuffle_buffer=0, seed=None):
+    """
+    Load a JSON (lines) file. With streaming=True the splits are
+    IterableDatasets read lazily, split between distributed ranks and, with
+    shuffle_buffer, shuffled through a buffer of that many records
+    """
+    dataset = datasets.load_dataset('json', data_files=[json_file], streaming=streaming)
+    if not streaming:
+        return dataset
+
+    import torch
+    from datasets.distributed import split_dataset_by_node
+
+    for split in dataset:
+        if torch.distributed.is_available() and torch.distributed.is_initialized():
+            dataset[split] = split_dataset_by_node(
+                dataset[split], rank=torch.distributed.get_rank(), world_size=torch.distributed.get_world_size()
+            )
+        if shuffle_buffer:
+            dataset[split] = dataset[split].shuffle(buffer_size=shuffle_buffer, seed=seed)
+    return dataset
 
-def tokenize_dataset(tokenizer, dataset, max_length=32):
+def tokenize_dataset(tokenizer, dataset, max_length=None, padding=False):
+    """
+    Tokenize the "text" column. Examples are not padded, so batches can be
+    padded to their own longest example by PaddingCollator (or the default
+    collator of Trainer); they are truncated to max_length, or to the model
+    maximum when not given. Pass padding="max_length" for fixed-size rows.
+    """
     def preprocess_function(examples):
-        return tokenizer(examples["text"], truncation=True, padding="max_length", max_length=max_length)
-    if isinstance(dataset, datasets.DatasetDict):
+        return tokenizer(examples["text"], truncation=True, padding=padding, max_length=max_length)
+    if isinstance(dataset, (datasets.DatasetDict, datasets.IterableDatasetDict)):
         for split in dataset:
             dataset[split] = dataset[split].map(preprocess_function, batched=True)
         return dataset
@@ -27,18 +52,18 @@ def tsv_dataset(tokenizer, tsv_file):
     dataset = load_tsv(tsv_file)
     return tokenize_dataset(tokenizer, dataset)
 
-def json_dataset(tokenizer, json_file):
-    dataset = load_json(json_file)
+def json_dataset(tokenizer, json_file, **kwargs):
+    dataset = load_json(json_file, **kwargs)
     return tokenize_dataset(tokenizer, dataset)
 
-def list_dataset(tokenizer, texts, labels=None, max_length=32):
+def list_dataset(tokenizer, texts, labels=None, max_length=None, padding=False):
     data_dict = {"text": texts}
     if labels is not None:
         data_dict["label"] = labels
     ds = datasets.Dataset.from_dict(data_dict)
 
     def preprocess_function(examples):
-        output = tokenizer(examples["text"], truncation=True, padding="max_length", max_length=max_length)
+        output = tokenizer(examples["text"], truncation=True, padding=padding, max_length=max_length)
         if "label" in examples:
             output["label"] = examples["label"]
         return output
@@ -46,3 +71,107 @@ def list_dataset(tokenizer, texts, labels=None, max_length=32):
     tokenized_ds = ds.map(preprocess_function, batched=True)
     return tokenized_ds
 
+
+class PaddingCollator:
+    """
+    Collate tokenized examples of different lengths by padding them to the
+    longest one in the batch (rounded up to pad_to_multiple_of), on the
+    tokenizer's padding side. input_ids are padded with the pad token,
+    attention_mask with 0 and labels with label_pad_id; with causal_lm=True,
+    examples without labels get their input_ids as labels, masked where the
+    attention mask is 0 (so an eos token doubling as pad is still learned).
+    Other sequence fields (token_type_ids) are padded with 0, numbers
+    (class labels) are stacked and strings are dropped.
+    """
+
+    def __init__(self, tokenizer, pad_to_multiple_of=None, label_pad_id=-100, causal_lm=False):
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.padding_side = getattr(tokenizer, "padding_side", "right")
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.label_pad_id = label_pad_id
+        self.causal_lm = causal_lm
+
+    def _pad(self, sequences, length, value):
+        if self.padding_side == "left":
+            return [[value] * (length - len(sequence)) + list(sequence) for sequence in sequences]
+        return [list(sequence) + [value] * (length - len(sequence)) for sequence in sequences]
+
+    def __call__(self, examples):
+        import torch
+
+        length = max(len(example["input_ids"]) for example in examples)
+        if self.pad_to_multiple_of:
+            length = -(-length // self.pad_to_multiple_of) * self.pad_to_multiple_of
+
+        input_ids = [example["input_ids"] for example in examples]
+        attention_mask = [example.get("attention_mask", [1] * len(example["input_ids"])) for example in examples]
+
+        batch = {
+            "input_ids": torch.tensor(self._pad(input_ids, length, self.pad_token_id)),
+            "attention_mask": torch.tensor(self._pad(attention_mask, length, 0)),
+        }
+
+        if "labels" in examples[0] and not isinstance(examples[0]["labels"], (int, float)):
+            batch["labels"] = torch.tensor(self._pad([example["labels"] for example in examples], length, self.label_pad_id))
+        elif self.causal_lm:
+            labels = batch["input_ids"].clone()
+            labels[batch["attention_mask"] == 0] = self.label_pad_id
+            batch["labels"] = labels
+
+        for key in examples[0]:
+            values = [example[key] for example in examples]
+            if key in batch or isinstance(values[0], str):
+                continue
+            if isinstance(values[0], (list, tuple)):
+                values = self._pad(values, length, 0)
+            batch[key] = torch.tensor(values)
+        return batch
+
+
+def length_grouped_indices(lengths, batch_size, generator=None, mega_batch_mult=50):
+    """
+    Random permutation of the indices of lengths where each run of
+    batch_size indices has similar lengths: the shuffled indices are cut into
+    mega batches of mega_batch_mult batches, each sorted by decreasing
+    length, and the batch with the longest example goes first so memory
+    problems show up at the start
+    """
+    import torch
+
+    indices = torch.randperm(len(lengths), generator=generator).tolist()
+    size = batch_size * mega_batch_mult
+    mega_batches = [sorted(indices[i : i + size], key=lambda i: -lengths[i]) for i in range(0, len(indices), size)]
+    batches = [mega[i : i + batch_size] for mega in mega_batches for i in range(0, len(mega), batch_size)]
+
+    if batches:
+        longest = max(range(len(batches)), key=lambda b: lengths[batches[b][0]])
+        batches[0], batches[longest] = batches[longest], batches[0]
+    return [index for batch in batches for index in batch]
+
+
+class LengthGroupedSampler:
+    """
+    Sampler yielding length_grouped_indices of lengths, so that dynamically
+    padded batches waste few pad tokens while keeping the order random. Call
+    set_epoch to reshuffle differently in each epoch.
+    """
+
+    def __init__(self, lengths, batch_size, seed=0, mega_batch_mult=50):
+        self.lengths = list(lengths)
+        self.batch_size = batch_size
+        self.seed = seed
+        self.mega_batch_mult = mega_batch_mult
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __iter__(self):
+        import torch
+
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        return iter(length_grouped_indices(self.lengths, self.batch_size, generator, self.mega_batch_mult))
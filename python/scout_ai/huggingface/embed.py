@@ -0,0 +1,82 @@
+"""Sentence embeddings with Hugging Face encoder models.
+
+The model is a plain ``AutoModel`` (``load_model("embedding", checkpoint)``);
+token states are pooled into one vector per text, either averaging the tokens
+(``mean``, ignoring padding) or taking the first one (``cls``).
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+from ..embedding_cache import EmbeddingCache
+from .eval import _batches, _move_to_device, inference_context
+
+POOLINGS = ("mean", "cls")
+
+
+def pool(hidden_states, attention_mask, pooling: str = "mean"):
+    """One vector per row of ``hidden_states`` (batch x tokens x dim)."""
+    if pooling == "cls":
+        return hidden_states[:, 0]
+    if pooling == "mean":
+        mask = attention_mask.unsqueeze(-1).to(hidden_states.dtype)
+        return (hidden_states * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+    raise ValueError(f"Unknown pooling {pooling!r}, use one of {', '.join(POOLINGS)}")
+
+
+def embed_texts(
+    model, tokenizer, texts: Sequence[str],
+    batch_size: Optional[int] = 32,
+    pooling: str = "mean",
+    normalize: bool = True,
+    max_length: Optional[int] = None,
+    cache=None,
+):
+    """Embeddings of ``texts`` as a ``(len(texts), dim)`` float32 NumPy array, in input order.
+
+    Texts are sorted by token length and embedded ``batch_size`` at a time, so
+    each batch is padded only to its own longest text. With ``normalize`` the
+    vectors have unit L2 norm, making dot products cosine similarities.
+
+    ``cache`` is an :class:`~scout_ai.embedding_cache.EmbeddingCache`, or
+    ``True`` for the shared on-disk cache of this model; only texts missing
+    from it are embedded.
+    """
+    import numpy as np
+
+    texts = [str(text) for text in texts]
+    if cache:
+        if cache is True:
+            cache = EmbeddingCache.for_model(
+                model.config._name_or_path, pooling=pooling, normalize=normalize, max_length=max_length
+            )
+        return cache.embed(texts, lambda missing: embed_texts(
+            model, tokenizer, missing,
+            batch_size=batch_size, pooling=pooling, normalize=normalize, max_length=max_length,
+        ))
+    if not texts:
+        return np.empty((0, model.config.hidden_size), dtype=np.float32)
+
+    encoded = tokenizer(texts, truncation=True, max_length=max_length)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+    model.eval()
+    embeddings = None
+    for chunk in _batches(order, batch_size):
+        features = tokenizer.pad(
+            {key: [encoded[key][index] for index in chunk] for key in encoded.keys()},
+            return_tensors="pt",
+        )
+        features = _move_to_device(features, model.device)
+        with inference_context("embed", model):
+            hidden_states = model(**features).last_hidden_state
+            vectors = pool(hidden_states, features["attention_mask"], pooling).float()
+            if normalize:
+                vectors = vectors / vectors.norm(dim=-1, keepdim=True).clamp(min=1e-12)
+        vectors = vectors.cpu().numpy()
+        if embeddings is None:
+            embeddings = np.empty((len(texts), vectors.shape[-1]), dtype=np.float32)
+        embeddings[chunk] = vectors
+    return embeddings
@@ -1,5 +1,97 @@
 import json
+import os
 import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from .prefix_cache import generate_with_prefix_cache, prefix_cache_for
+
+
+class InferenceTimings:
+    """Wall time of the calls made under :func:`inference_context`, by name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            calls, total, _last = self._calls.get(name, (0, 0.0, 0.0))
+            self._calls[name] = (calls + 1, total + seconds, seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {"calls": calls, "total": total, "mean": total / calls, "last": last}
+                for name, (calls, total, last) in self._calls.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._calls.clear()
+
+
+TIMINGS = InferenceTimings()
+
+# Defaults for inference_context, from SCOUT_AI_NUM_THREADS,
+# SCOUT_AI_INTEROP_THREADS and SCOUT_AI_AUTOCAST (``bf16`` or ``bfloat16``)
+INFERENCE_OPTIONS = {
+    "num_threads": int(os.environ["SCOUT_AI_NUM_THREADS"]) if os.environ.get("SCOUT_AI_NUM_THREADS") else None,
+    "interop_threads": int(os.environ["SCOUT_AI_INTEROP_THREADS"]) if os.environ.get("SCOUT_AI_INTEROP_THREADS") else None,
+    "autocast": os.environ.get("SCOUT_AI_AUTOCAST") or None,
+}
+
+
+def configure_inference(**options):
+    """Change the defaults of :func:`inference_context` for the whole process."""
+    unknown = set(options) - set(INFERENCE_OPTIONS)
+    if unknown:
+        raise TypeError(f"Unknown inference options: {', '.join(sorted(unknown))}")
+    INFERENCE_OPTIONS.update(options)
+
+
+def _set_threads(torch, num_threads, interop_threads):
+    if num_threads and torch.get_num_threads() != num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Only allowed before the first inter-op parallel work starts
+            pass
+
+
+@contextmanager
+def inference_context(name, model=None, num_threads=None, interop_threads=None, autocast=None):
+    """Run model calls without autograd and record their time in :data:`TIMINGS`.
+
+    Applies ``torch.inference_mode``, the intra- and inter-op thread counts, and
+    bfloat16 autocast when ``autocast`` is ``bf16`` and ``model`` is on the CPU.
+    Unset options take their value from :data:`INFERENCE_OPTIONS`.
+    """
+    num_threads = num_threads or INFERENCE_OPTIONS["num_threads"]
+    interop_threads = interop_threads or INFERENCE_OPTIONS["interop_threads"]
+    autocast = autocast or INFERENCE_OPTIONS["autocast"]
+
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        try:
+            import torch
+        except ImportError:
+            torch = None
+
+        if torch is not None:
+            _set_threads(torch, num_threads, interop_threads)
+            stack.enter_context(torch.inference_mode())
+            device = getattr(getattr(model, "device", None), "type", None)
+            if autocast in ("bf16", "bfloat16") and device == "cpu":
+                stack.enter_context(torch.autocast("cpu", dtype=torch.bfloat16))
+
+        try:
+            yield
+        finally:
+            TIMINGS.record(name, time.perf_counter() - start)
 
 
 def forward(model, features):
@@ -11,13 +103,82 @@ def get_logits(predictions):
     return [v.detach().cpu().numpy() for v in logits]
 
 
-def eval_model(model, tokenizer, texts, return_logits=True):
-    features = tokenizer(texts, return_tensors='pt', truncation=True).to(model.device)
+def eval_model(model, tokenizer, texts, return_logits=True, batch_size=None):
+    """Logits for ``texts`` as one ``(len(texts), ...)`` NumPy array, in input order.
+
+    Texts are sorted by token length and run ``batch_size`` at a time (all at
+    once by default), so each chunk is padded only to its own longest text and
+    memory stays bounded. Without ``return_logits`` the raw model output of a
+    single pass over all texts is returned instead.
+    """
     model.eval()
-    predictions = forward(model, features)
-    if return_logits:
-        return get_logits(predictions)
-    return predictions
+    if not return_logits:
+        features = tokenizer(texts, return_tensors='pt', truncation=True, padding=True).to(model.device)
+        with inference_context("eval_model", model):
+            return forward(model, features)
+
+    import numpy as np
+
+    texts = list(texts)
+    if not texts:
+        num_labels = getattr(getattr(model, "config", None), "num_labels", 0)
+        return np.empty((0, num_labels), dtype=np.float32)
+
+    encoded = tokenizer(texts, truncation=True)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+    logits = None
+    for chunk in _batches(order, batch_size):
+        features = tokenizer.pad(
+            {key: [encoded[key][index] for index in chunk] for key in encoded.keys()},
+            return_tensors='pt',
+        )
+        features = _move_to_device(features, model.device)
+        with inference_context("eval_model", model):
+            chunk_logits = forward(model, features)["logits"].float().cpu().numpy()
+        if logits is None:
+            logits = np.empty((len(texts),) + chunk_logits.shape[1:], dtype=chunk_logits.dtype)
+        logits[chunk] = chunk_logits
+    return logits
+
+
+def classify_logits(logits, top_k=None, return_probabilities=False):
+    """Predicted classes of every row of ``logits``, computed in one pass.
+
+    Returns plain lists, so callers across a language bridge convert them in a
+    single step: ``predictions`` (class index per row), ``scores`` (softmax
+    probability of that class), ``top_k`` and ``top_k_scores`` (the ``top_k``
+    best classes per row, best first) when ``top_k`` is given, and the full
+    softmax ``probabilities`` with ``return_probabilities``.
+    """
+    import numpy as np
+
+    logits = np.asarray(logits, dtype=np.float32)
+    if logits.ndim == 1:
+        logits = logits[None, :]
+
+    probabilities = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    probabilities /= probabilities.sum(axis=-1, keepdims=True)
+
+    predictions = probabilities.argmax(axis=-1)
+    result = {
+        "predictions": predictions.tolist(),
+        "scores": np.take_along_axis(probabilities, predictions[:, None], axis=-1)[:, 0].tolist(),
+    }
+
+    if top_k:
+        top_k = min(int(top_k), probabilities.shape[-1])
+        best = np.argpartition(-probabilities, top_k - 1, axis=-1)[:, :top_k]
+        best_scores = np.take_along_axis(probabilities, best, axis=-1)
+        order = np.argsort(-best_scores, axis=-1)
+        result["top_k"] = np.take_along_axis(best, order, axis=-1).tolist()
+        result["top_k_scores"] = np.take_along_axis(best_scores, order, axis=-1).tolist()
+
+    if return_probabilities:
+        result["probabilities"] = probabilities.tolist()
+
+    return result
 
 
 def _move_to_device(inputs, device):
@@ -94,6 +255,96 @@ def _prepare_chat_inputs(
     return _move_to_device(inputs, model.device)
 
 
+def _tokenize_chat(
+    tokenizer, messages,
+    tools=None,
+    chat_template=None,
+    chat_template_kwargs=None,
+    tool_argument=None,
+):
+    """Token ids (a list of ints) for one conversation, without padding or tensors."""
+    chat_template_kwargs = dict(chat_template_kwargs or {})
+    tool_argument = tool_argument or "tools"
+
+    if hasattr(tokenizer, "apply_chat_template"):
+        kwargs = dict(add_generation_prompt=True, tokenize=True, return_dict=True)
+        kwargs.update(chat_template_kwargs)
+        kwargs.pop("return_tensors", None)
+
+        if chat_template is not None:
+            kwargs["chat_template"] = chat_template
+
+        prepared_tools = _prepare_tools(tools, tool_argument)
+        if prepared_tools:
+            kwargs[tool_argument] = prepared_tools
+
+        rendered = tokenizer.apply_chat_template(messages, **kwargs)
+
+        if isinstance(rendered, str):
+            return tokenizer(rendered)["input_ids"]
+        return list(rendered["input_ids"])
+
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    return tokenizer(prompt)["input_ids"]
+
+
+def _prepare_batch_inputs(model, tokenizer, conversations, **kwargs):
+    """Tokenize every conversation and left-pad them into one batch.
+
+    Left padding keeps the last prompt token of every row in the same column,
+    so ``generate`` continues all of them from there.
+    """
+    input_ids = [_tokenize_chat(tokenizer, messages, **kwargs) for messages in conversations]
+
+    padding_side = getattr(tokenizer, "padding_side", "right")
+    pad_token = getattr(tokenizer, "pad_token", None)
+    try:
+        tokenizer.padding_side = "left"
+        if pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        inputs = tokenizer.pad({"input_ids": input_ids}, padding=True, return_tensors="pt")
+    finally:
+        tokenizer.padding_side = padding_side
+        if pad_token is None:
+            tokenizer.pad_token = pad_token
+
+    pad_token_id = tokenizer.pad_token_id
+    if pad_token_id is None:
+        pad_token_id = tokenizer.eos_token_id
+    return _move_to_device(inputs, model.device), pad_token_id
+
+
+def _batches(items, batch_size=None):
+    if not batch_size:
+        yield items
+        return
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def _generate_batch(model, tokenizer, conversations, generation_kwargs=None, **kwargs):
+    generation_kwargs = dict(generation_kwargs or {})
+
+    inputs, pad_token_id = _prepare_batch_inputs(model, tokenizer, conversations, **kwargs)
+    generation_kwargs.setdefault("pad_token_id", pad_token_id)
+
+    model.eval()
+    with inference_context("generate_batch", model):
+        output_ids = model.generate(**inputs, **generation_kwargs)
+
+    prompt_length = inputs["input_ids"].shape[1]
+    return tokenizer.batch_decode(output_ids[:, prompt_length:], skip_special_tokens=True)
+
+
+def _generate(model, inputs, generation_kwargs, prefix_cache=None):
+    model.eval()
+    prefix_cache = prefix_cache_for(model, prefix_cache)
+    with inference_context("generate", model):
+        if prefix_cache is None:
+            return model.generate(**inputs, **generation_kwargs)
+        return generate_with_prefix_cache(model, inputs, generation_kwargs, prefix_cache)
+
+
 def _decode_generated_text(tokenizer, inputs, output_ids):
     input_ids = inputs["input_ids"]
     return tokenizer.decode(
@@ -230,7 +481,13 @@ def eval_causal_lm_chat(
     chat_template_kwargs=None,
     generation_kwargs=None,
     tool_argument=None,
+    prefix_cache=None,
 ):
+    """Generated text for one conversation.
+
+    With ``prefix_cache`` (see :func:`scout_ai.huggingface.prefix_cache.prefix_cache_for`)
+    the KV states of earlier turns are reused, so only new tokens are prefilled.
+    """
     generation_kwargs = dict(generation_kwargs or {})
 
     inputs = _prepare_chat_inputs(
@@ -240,8 +497,7 @@ def eval_causal_lm_chat(
         tool_argument=tool_argument,
     )
 
-    model.eval()
-    output_ids = model.generate(**inputs, **generation_kwargs)
+    output_ids = _generate(model, inputs, generation_kwargs, prefix_cache)
     return _decode_generated_text(tokenizer, inputs, output_ids)
 
 
@@ -253,6 +509,7 @@ def eval_causal_lm_response(
     generation_kwargs=None,
     tool_argument=None,
     response_parser=None,
+    prefix_cache=None,
 ):
     generation_kwargs = dict(generation_kwargs or {})
 
@@ -265,7 +522,216 @@ def eval_causal_lm_response(
         tool_argument=tool_argument,
     )
 
-    model.eval()
-    output_ids = model.generate(**inputs, **generation_kwargs)
+    output_ids = _generate(model, inputs, generation_kwargs, prefix_cache)
     output_text = _decode_generated_text(tokenizer, inputs, output_ids)
     return parse_causal_lm_response(tokenizer, output_text, response_parser=response_parser)
+
+
+def eval_causal_lm_chats(
+    model, tokenizer, conversations,
+    chat_template=None,
+    chat_template_kwargs=None,
+    generation_kwargs=None,
+    tool_argument=None,
+    batch_size=None,
+):
+    """Batched :func:`eval_causal_lm_chat`: one generated text per conversation.
+
+    Conversations are left-padded together and generated with a single
+    ``model.generate`` call per ``batch_size`` conversations (all at once by
+    default).
+    """
+    conversations = list(conversations)
+    texts = []
+    for batch in _batches(conversations, batch_size):
+        texts.extend(_generate_batch(
+            model, tokenizer, batch,
+            generation_kwargs=generation_kwargs,
+            chat_template=chat_template,
+            chat_template_kwargs=chat_template_kwargs,
+            tool_argument=tool_argument,
+        ))
+    return texts
+
+
+def eval_causal_lm_responses(
+    model, tokenizer, conversations,
+    tools=None,
+    chat_template=None,
+    chat_template_kwargs=None,
+    generation_kwargs=None,
+    tool_argument=None,
+    response_parser=None,
+    batch_size=None,
+):
+    """Batched :func:`eval_causal_lm_response`: one parsed message per conversation.
+
+    ``tools`` are offered to every conversation. See :func:`eval_causal_lm_chats`
+    for batching.
+    """
+    conversations = list(conversations)
+    responses = []
+    for batch in _batches(conversations, batch_size):
+        texts = _generate_batch(
+            model, tokenizer, batch,
+            generation_kwargs=generation_kwargs,
+            tools=tools,
+            chat_template=None,
+            chat_template_kwargs=chat_template_kwargs,
+            tool_argument=tool_argument,
+        )
+        responses.extend(
+            parse_causal_lm_response(tokenizer, text, response_parser=response_parser)
+            for text in texts
+        )
+    return responses
+
+
+class ToolCallTextFilter:
+    """Split streamed model text into plain text and ``<tool_call>`` blocks.
+
+    :meth:`feed` returns the text outside tool call blocks that is safe to show
+    (a trailing partial ``<tool_call>`` tag is held back), and collects every
+    completed block, parsed like :func:`parse_causal_lm_response` would, in
+    ``tool_calls``.
+    """
+
+    OPEN = "<tool_call>"
+    CLOSE = "</tool_call>"
+
+    def __init__(self):
+        self.buffer = ""
+        self.in_call = False
+        self.tool_calls = []
+
+    def _held_back(self):
+        for length in range(min(len(self.OPEN) - 1, len(self.buffer)), 0, -1):
+            if self.buffer.endswith(self.OPEN[:length]):
+                return length
+        return 0
+
+    def feed(self, text):
+        """Visible text in ``text``; new tool calls are appended to ``tool_calls``."""
+        self.buffer += text
+        visible = []
+        while True:
+            if self.in_call:
+                end = self.buffer.find(self.CLOSE)
+                if end < 0:
+                    break
+                block = self.OPEN + self.buffer[:end] + self.CLOSE
+                self.buffer = self.buffer[end + len(self.CLOSE):]
+                self.in_call = False
+                parsed = _parse_tool_call_blocks(block)
+                if parsed is not None:
+                    for tool_call in parsed["tool_calls"]:
+                        tool_call["id"] = f"call_{len(self.tool_calls)}"
+                        self.tool_calls.append(tool_call)
+            else:
+                start = self.buffer.find(self.OPEN)
+                if start >= 0:
+                    visible.append(self.buffer[:start])
+                    self.buffer = self.buffer[start + len(self.OPEN):]
+                    self.in_call = True
+                    continue
+                held = self._held_back()
+                visible.append(self.buffer[:len(self.buffer) - held])
+                self.buffer = self.buffer[len(self.buffer) - held:]
+                break
+        return "".join(visible)
+
+    def flush(self):
+        """Text held back at the end of the generation."""
+        text = "" if self.in_call else self.buffer
+        self.buffer = ""
+        return text
+
+
+class _EventStoppingCriteria:
+    """Stopping criteria that ends every sequence once ``event`` is set."""
+
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+def stream_causal_lm_response(
+    model, tokenizer, messages,
+    tools=None,
+    chat_template=None,
+    chat_template_kwargs=None,
+    generation_kwargs=None,
+    tool_argument=None,
+    response_parser=None,
+    prefix_cache=None,
+):
+    """Streaming :func:`eval_causal_lm_response`.
+
+    Generates in a background thread and yields events as the text is decoded:
+    ``{"type": "delta", "text": ...}`` for text outside tool call blocks,
+    ``{"type": "tool_call", "tool_call": ...}`` as soon as each
+    ``<tool_call>`` block is complete, and finally
+    ``{"type": "message", "message": ...}`` with the whole parsed response.
+    """
+    import threading
+
+    from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+    generation_kwargs = dict(generation_kwargs or {})
+
+    inputs = _prepare_chat_inputs(
+        model, tokenizer, messages,
+        tools=tools,
+        chat_template=None,
+        chat_template_kwargs=chat_template_kwargs,
+        tool_argument=tool_argument,
+    )
+
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    generation_kwargs["streamer"] = streamer
+    # Set when the consumer stops iterating, so generation does not run on
+    # to max_new_tokens for nobody
+    cancelled = threading.Event()
+    generation_kwargs["stopping_criteria"] = StoppingCriteriaList(
+        list(generation_kwargs.get("stopping_criteria") or []) + [_EventStoppingCriteria(cancelled)]
+    )
+    errors = []
+
+    def generate():
+        try:
+            _generate(model, inputs, generation_kwargs, prefix_cache)
+        except Exception as error:
+            errors.append(error)
+            streamer.end()
+
+    thread = threading.Thread(target=generate, daemon=True)
+    thread.start()
+
+    text_filter = ToolCallTextFilter()
+    output = []
+    try:
+        for chunk in streamer:
+            output.append(chunk)
+            reported = len(text_filter.tool_calls)
+            visible = text_filter.feed(chunk)
+            if visible:
+                yield {"type": "delta", "text": visible}
+            for tool_call in text_filter.tool_calls[reported:]:
+                yield {"type": "tool_call", "tool_call": tool_call}
+    finally:
+        cancelled.set()
+
+    thread.join()
+    if errors:
+        raise errors[0]
+
+    visible = text_filter.flush()
+    if visible:
+        yield {"type": "delta", "text": visible}
+
+    message = parse_causal_lm_response(tokenizer, "".join(output), response_parser=response_parser)
+    yield {"type": "message", "message": message}
@@ -0,0 +1,198 @@
+"""Reuse the KV cache of earlier turns when generating with a causal LM.
+
+Agent conversations grow one message at a time: every turn sends the same
+system prompt and previous turns again, followed by a new user or tool
+message. :class:`PrefixCache` keeps the ``past_key_values`` left by previous
+generations, keyed by the token ids they cover, and hands back the one sharing
+the longest prefix with a new prompt so that only the remaining tokens are
+prefilled.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def _cache_tensors(cache):
+    if hasattr(cache, "layers"):
+        for layer in cache.layers:
+            for tensor in (getattr(layer, "keys", None), getattr(layer, "values", None)):
+                if tensor is not None:
+                    yield tensor
+    elif hasattr(cache, "key_cache"):
+        yield from cache.key_cache
+        yield from cache.value_cache
+    elif isinstance(cache, (tuple, list)):
+        for layer in cache:
+            yield from layer
+
+
+def cache_nbytes(cache) -> int:
+    return sum(tensor.numel() * tensor.element_size() for tensor in _cache_tensors(cache))
+
+
+def cache_length(cache) -> int:
+    if hasattr(cache, "get_seq_length"):
+        return int(cache.get_seq_length())
+    return int(cache[0][0].shape[-2])
+
+
+def crop_cache(cache, length: int):
+    """``cache`` keeping only its first ``length`` positions."""
+    if hasattr(cache, "crop"):
+        cache.crop(length)
+        return cache
+    return tuple(tuple(tensor[..., :length, :] for tensor in layer) for layer in cache)
+
+
+def _common_prefix(a: Sequence[int], b: Sequence[int]) -> int:
+    length = min(len(a), len(b))
+    if a[:length] == b[:length]:
+        return length
+    for index in range(length):
+        if a[index] != b[index]:
+            return index
+    return length
+
+
+class PrefixCache:
+    """LRU cache of KV states keyed by the token prefix they were computed for.
+
+    Entries are evicted, least recently used first, once they take more than
+    ``max_bytes``. Prefixes shorter than ``min_length`` tokens are not worth a
+    copy of the cache and count as misses.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, min_length: int = 16):
+        self.max_bytes = max_bytes
+        self.min_length = min_length
+        self._entries: "OrderedDict[Tuple[int, ...], Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reused_tokens = 0
+        self.prompt_tokens = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, ids: Sequence[int]) -> Tuple[int, Optional[Any]]:
+        """``(length, past_key_values)`` for the longest cached prefix of ``ids``.
+
+        The returned cache is a copy covering exactly ``length`` tokens, and at
+        least one token of ``ids`` is always left for the model to process.
+        ``(0, None)`` on a miss.
+        """
+        ids = tuple(ids)
+        with self._lock:
+            self.prompt_tokens += len(ids)
+
+            best_key, best = None, 0
+            for key in self._entries:
+                length = _common_prefix(key, ids)
+                if length > best:
+                    best_key, best = key, length
+
+            best = min(best, len(ids) - 1)
+            if best_key is None or best < self.min_length:
+                self.misses += 1
+                return 0, None
+
+            self._entries.move_to_end(best_key)
+            cache = copy.deepcopy(self._entries[best_key][0])
+            self.hits += 1
+            self.reused_tokens += best
+
+        if cache_length(cache) > best:
+            cache = crop_cache(cache, best)
+        return best, cache
+
+    def store(self, ids: Sequence[int], cache) -> None:
+        """Keep ``cache``, which holds the KV states of the first tokens of ``ids``."""
+        ids = tuple(ids)[:cache_length(cache)]
+        nbytes = cache_nbytes(cache)
+        if len(ids) < self.min_length or nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            # The new entry extends any entry that is a prefix of it
+            for key in [key for key in self._entries if ids[:len(key)] == key]:
+                self._bytes -= self._entries.pop(key)[1]
+
+            self._entries[ids] = (cache, nbytes)
+            self._bytes += nbytes
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "reused_tokens": self.reused_tokens,
+                "prompt_tokens": self.prompt_tokens,
+            }
+
+
+_MODEL_CACHES: "weakref.WeakKeyDictionary[Any, PrefixCache]" = weakref.WeakKeyDictionary()
+
+
+def prefix_cache_for(model, prefix_cache=True) -> Optional[PrefixCache]:
+    """The :class:`PrefixCache` to use with ``model``.
+
+    ``prefix_cache`` can be a :class:`PrefixCache`, ``True`` for the cache
+    shared by every call with this model, or a number of bytes to bound that
+    shared cache when it is first created. Falsy values disable caching.
+    """
+    if not prefix_cache:
+        return None
+    if isinstance(prefix_cache, PrefixCache):
+        return prefix_cache
+
+    cache = _MODEL_CACHES.get(model)
+    if cache is None:
+        max_bytes = DEFAULT_MAX_BYTES if prefix_cache is True else int(prefix_cache)
+        cache = _MODEL_CACHES[model] = PrefixCache(max_bytes=max_bytes)
+    return cache
+
+
+def prefix_cache_stats(model) -> Dict[str, Any]:
+    cache = _MODEL_CACHES.get(model)
+    return cache.stats() if cache is not None else PrefixCache().stats()
+
+
+def generate_with_prefix_cache(model, inputs, generation_kwargs, prefix_cache):
+    """``model.generate`` for a single conversation, reusing and refilling ``prefix_cache``."""
+    generation_kwargs = dict(generation_kwargs)
+    prompt_ids = inputs["input_ids"][0].tolist()
+
+    _, past_key_values = prefix_cache.lookup(prompt_ids)
+    if past_key_values is not None:
+        generation_kwargs["past_key_values"] = past_key_values
+
+    kwargs = dict(generation_kwargs, return_dict_in_generate=True, use_cache=True)
+    outputs = model.generate(**inputs, **kwargs)
+    if getattr(outputs, "past_key_values", None) is not None:
+        prefix_cache.store(outputs.sequences[0].tolist(), outputs.past_key_values)
+    return outputs.sequences
@@ -0,0 +1,776 @@
+"""Local OpenAI-compatible server for Hugging Face causal language models.
+
+:class:`ContinuousBatcher` runs a single generation loop over all pending
+requests. New requests join the running batch between decoding steps and
+finished ones leave it, so the model always works on as many sequences as
+there are requests (up to ``max_batch_size``) instead of one at a time.
+
+Joining prefills only the new prompts, in a left-padded batch of their own,
+and concatenates their KV cache to the running one after padding both to the
+same length; the running sequences keep decoding in the same step. Caches
+that can not be concatenated (anything but the legacy tuples and caches
+convertible from and to them) fall back to prefilling the whole batch again.
+Leaving only drops rows from the cache.
+
+:meth:`ContinuousBatcher.stream` yields the text of an answer as its tokens
+are generated.
+
+:func:`make_server` exposes a batcher over HTTP with the ``/v1/chat/completions``
+and ``/v1/responses`` endpoints, so the ``openai``, ``responses`` and ``vllm``
+backends can use it by pointing their ``url`` at ``http://<host>:<port>/v1``::
+
+    python -m scout_ai.huggingface.serve Qwen/Qwen2.5-0.5B-Instruct --port 8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .eval import _tokenize_chat, inference_context, parse_causal_lm_response
+
+
+@dataclass
+class GenerationResult:
+    token_ids: List[int]
+    text: str
+    message: Dict[str, Any]
+    prompt_tokens: int
+    finish_reason: str
+
+
+@dataclass
+class _Sequence:
+    prompt_ids: List[int]
+    max_new_tokens: int
+    temperature: float
+    top_p: float
+    response_parser: Any
+    future: Future
+    on_token: Optional[Callable[[int], None]] = None
+    generated: List[int] = field(default_factory=list)
+    finish_reason: Optional[str] = None
+
+
+class TextStream:
+    """Iterator over the text of an answer as it is generated, see :meth:`ContinuousBatcher.stream`.
+
+    Yields the raw decoded text in chunks; once exhausted ``result`` holds the
+    :class:`GenerationResult`. Iterating raises the error of a failed request.
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.result: Optional[GenerationResult] = None
+        self._future: Optional[Future] = None
+        self._tokens: "queue.Queue[Optional[int]]" = queue.Queue()
+
+    def put(self, token_id: int) -> None:
+        self._tokens.put(token_id)
+
+    def finish(self, future: Future) -> None:
+        self._future = future
+        self._tokens.put(None)
+
+    def __iter__(self) -> Iterator[str]:
+        ids: List[int] = []
+        sent = ""
+        while True:
+            token_id = self._tokens.get()
+            if token_id is None:
+                break
+            ids.append(token_id)
+            text = self.tokenizer.decode(ids, skip_special_tokens=True)
+            # Wait for the rest of a multi-byte character
+            if len(text) > len(sent) and text.startswith(sent) and not text.endswith("\ufffd"):
+                yield text[len(sent):]
+                sent = text
+
+        assert self._future is not None
+        self.result = self._future.result()
+        if len(self.result.text) > len(sent) and self.result.text.startswith(sent):
+            yield self.result.text[len(sent):]
+
+
+class ContinuousBatcher:
+    """Generate for many chat requests at once, merging them at token granularity.
+
+    ``generation_kwargs`` are the defaults for every request; only
+    ``max_new_tokens``, ``temperature``, ``top_p`` and ``do_sample`` are
+    understood. Sampling is greedy unless ``do_sample`` is set.
+    """
+
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        max_batch_size: int = 8,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        chat_template_kwargs: Optional[Dict[str, Any]] = None,
+        tool_argument: Optional[str] = None,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.generation_kwargs = dict(generation_kwargs or {})
+        self.chat_template_kwargs = chat_template_kwargs
+        self.tool_argument = tool_argument
+
+        self.stop_ids = _stop_token_ids(model, tokenizer)
+        pad_token_id = getattr(tokenizer, "pad_token_id", None)
+        self.pad_token_id = pad_token_id if pad_token_id is not None else min(self.stop_ids, default=0)
+
+        self._queue: "queue.Queue[_Sequence]" = queue.Queue()
+        self._active: List[_Sequence] = []
+        self._cache = None
+        self._attention_mask = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+        self.steps = 0
+        self.prefills = 0
+
+    #{{{ Requests
+
+    def submit(self, messages, tools=None, generation_kwargs=None, response_parser=None, on_token=None) -> Future:
+        """Queue a conversation; the future resolves to a :class:`GenerationResult`.
+
+        ``on_token`` is called from the generation loop with each generated token id.
+        """
+        prompt_ids = _tokenize_chat(
+            self.tokenizer, messages,
+            tools=tools,
+            chat_template_kwargs=self.chat_template_kwargs,
+            tool_argument=self.tool_argument,
+        )
+        return self.submit_ids(
+            prompt_ids, generation_kwargs=generation_kwargs, response_parser=response_parser, on_token=on_token
+        )
+
+    def submit_ids(self, prompt_ids, generation_kwargs=None, response_parser=None, on_token=None) -> Future:
+        options = dict(self.generation_kwargs)
+        options.update({k: v for k, v in (generation_kwargs or {}).items() if v is not None})
+
+        do_sample = options.get("do_sample", False)
+        sequence = _Sequence(
+            prompt_ids=list(prompt_ids),
+            max_new_tokens=int(options.get("max_new_tokens") or 512),
+            temperature=float(options.get("temperature", 1.0)) if do_sample else 0.0,
+            top_p=float(options.get("top_p", 1.0)),
+            response_parser=response_parser,
+            future=Future(),
+            on_token=on_token,
+        )
+        self._queue.put(sequence)
+        self.start()
+        return sequence.future
+
+    def stream(self, messages, tools=None, generation_kwargs=None, response_parser=None) -> TextStream:
+        """Queue a conversation like :meth:`submit`, returning a :class:`TextStream` over its answer."""
+        stream = TextStream(self.tokenizer)
+        future = self.submit(
+            messages, tools=tools, generation_kwargs=generation_kwargs, response_parser=response_parser, on_token=stream.put
+        )
+        future.add_done_callback(stream.finish)
+        return stream
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._loop, name="scout-ai-batcher", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def active(self) -> int:
+        return len(self._active)
+
+    #{{{ Generation loop
+
+    def _loop(self) -> None:
+        while not self._stopped.is_set():
+            self._step()
+
+    def _step(self, timeout: float = 0.1) -> None:
+        """Decode one token for the running sequences, admit queued requests, then retire finished ones."""
+        joined = []
+        try:
+            if not self._active:
+                joined.append(self._queue.get(timeout=timeout))
+            while len(self._active) + len(joined) < self.max_batch_size:
+                joined.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if not self._active and not joined:
+            return
+
+        try:
+            if self._active:
+                self._decode()
+                self._retire()
+            if joined:
+                self._admit(joined)
+                self._retire()
+        except Exception as error:
+            for sequence in self._active + joined:
+                if not sequence.future.done():
+                    sequence.future.set_exception(error)
+            self._reset()
+
+    def _reset(self) -> None:
+        self._active = []
+        self._cache = None
+        self._attention_mask = None
+
+    def _forward(self, input_ids, attention_mask, past_key_values=None):
+        """Logits for the last position of each row, and the updated cache."""
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        position_ids = position_ids[:, -input_ids.shape[1]:]
+        with inference_context("serve_step", self.model):
+            outputs = self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=past_key_values,
+                use_cache=True,
+            )
+        return outputs.logits[:, -1, :], outputs.past_key_values
+
+    def _prefill(self, sequences: List[_Sequence]):
+        """Run ``sequences`` (prompt and tokens generated so far) from scratch; returns their cache and attention mask."""
+        import torch
+
+        self.prefills += 1
+        rows = [sequence.prompt_ids + sequence.generated for sequence in sequences]
+        width = max(len(row) for row in rows)
+        input_ids = torch.tensor(
+            [[self.pad_token_id] * (width - len(row)) + row for row in rows], device=self.model.device
+        )
+        attention_mask = torch.tensor(
+            [[0] * (width - len(row)) + [1] * len(row) for row in rows], device=self.model.device
+        )
+        logits, cache = self._forward(input_ids, attention_mask)
+        self._sample(sequences, logits)
+        return cache, attention_mask
+
+    def _admit(self, joined: List[_Sequence]) -> None:
+        import torch
+
+        if self._active and not _can_concat_caches(self._cache):
+            sequences = self._active + joined
+            self._cache, self._attention_mask = self._prefill(sequences)
+            self._active = sequences
+            return
+
+        cache, attention_mask = self._prefill(joined)
+        if self._active:
+            width = max(self._attention_mask.shape[1], attention_mask.shape[1])
+            cache = _concat_caches(self._cache, cache, width)
+            attention_mask = torch.cat(
+                [_left_pad(self._attention_mask, width, dim=-1), _left_pad(attention_mask, width, dim=-1)]
+            )
+        self._active = self._active + joined
+        self._cache, self._attention_mask = cache, attention_mask
+
+    def _decode(self) -> None:
+        import torch
+
+        if self._cache is None:
+            # The cache rows of finished sequences could not be dropped
+            self._cache, self._attention_mask = self._prefill(self._active)
+            return
+
+        self.steps += 1
+        input_ids = torch.tensor([[sequence.generated[-1]] for sequence in self._active], device=self.model.device)
+        ones = torch.ones((len(self._active), 1), dtype=self._attention_mask.dtype, device=self.model.device)
+        attention_mask = torch.cat([self._attention_mask, ones], dim=1)
+        logits, self._cache = self._forward(input_ids, attention_mask, self._cache)
+        self._attention_mask = attention_mask
+        self._sample(self._active, logits)
+
+    def _sample(self, sequences: List[_Sequence], logits) -> None:
+        import torch
+
+        next_tokens = logits.argmax(dim=-1).tolist()
+        for index, sequence in enumerate(sequences):
+            if sequence.temperature > 0:
+                probs = torch.softmax(logits[index].float() / sequence.temperature, dim=-1)
+                if sequence.top_p < 1.0:
+                    sorted_probs, sorted_ids = probs.sort(descending=True)
+                    keep = sorted_probs.cumsum(-1) - sorted_probs < sequence.top_p
+                    probs = torch.zeros_like(probs).scatter(0, sorted_ids[keep], sorted_probs[keep])
+                next_tokens[index] = int(torch.multinomial(probs, 1))
+
+            token = next_tokens[index]
+            if token in self.stop_ids:
+                sequence.finish_reason = "stop"
+            else:
+                sequence.generated.append(token)
+                if sequence.on_token is not None:
+                    sequence.on_token(token)
+                if len(sequence.generated) >= sequence.max_new_tokens:
+                    sequence.finish_reason = "length"
+
+    def _retire(self) -> None:
+        keep = [index for index, sequence in enumerate(self._active) if sequence.finish_reason is None]
+        if len(keep) == len(self._active):
+            return
+
+        for sequence in self._active:
+            if sequence.finish_reason is not None:
+                self._finish(sequence)
+
+        if not keep:
+            self._reset()
+            return
+
+        self._active = [self._active[index] for index in keep]
+        self._attention_mask = self._attention_mask[keep]
+        self._cache = _select_cache_rows(self._cache, keep)
+
+    def _finish(self, sequence: _Sequence) -> None:
+        text = self.tokenizer.decode(sequence.generated, skip_special_tokens=True)
+        message = parse_causal_lm_response(self.tokenizer, text, response_parser=sequence.response_parser)
+        sequence.future.set_result(GenerationResult(
+            token_ids=sequence.generated,
+            text=text,
+            message=message,
+            prompt_tokens=len(sequence.prompt_ids),
+            finish_reason=sequence.finish_reason,
+        ))
+
+
+def _stop_token_ids(model, tokenizer) -> set:
+    ids = set()
+    candidates = [getattr(tokenizer, "eos_token_id", None)]
+    generation_config = getattr(model, "generation_config", None)
+    if generation_config is not None:
+        candidates.append(getattr(generation_config, "eos_token_id", None))
+    for candidate in candidates:
+        if isinstance(candidate, (list, tuple, set)):
+            ids.update(candidate)
+        elif candidate is not None:
+            ids.add(candidate)
+    return ids
+
+
+def _select_cache_rows(cache, rows):
+    """Keep only ``rows`` (batch indices) of a KV cache, or ``None`` to force a prefill."""
+    if cache is None:
+        return None
+    if hasattr(cache, "batch_select_indices"):
+        import torch
+
+        cache.batch_select_indices(torch.tensor(rows))
+        return cache
+    if isinstance(cache, tuple):
+        return tuple(tuple(tensor[rows] for tensor in layer) for layer in cache)
+    return None
+
+
+def _left_pad(tensor, width, dim=-2):
+    """``tensor`` with zeros prepended along ``dim`` up to ``width``."""
+    import torch
+
+    missing = width - tensor.shape[dim]
+    if missing <= 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = missing
+    return torch.cat([tensor.new_zeros(shape), tensor], dim=dim)
+
+
+def _can_concat_caches(cache) -> bool:
+    return isinstance(cache, tuple) or (
+        hasattr(cache, "to_legacy_cache") and hasattr(type(cache), "from_legacy_cache")
+    )
+
+
+def _concat_caches(first, second, width):
+    """One KV cache with the rows of ``first`` then ``second``, left padded to ``width`` positions."""
+    import torch
+
+    cache_class = type(first)
+    if not isinstance(first, tuple):
+        first, second = first.to_legacy_cache(), second.to_legacy_cache()
+    layers = tuple(
+        tuple(torch.cat([_left_pad(a, width), _left_pad(b, width)]) for a, b in zip(first_layer, second_layer))
+        for first_layer, second_layer in zip(first, second)
+    )
+    return layers if cache_class is tuple else cache_class.from_legacy_cache(layers)
+
+
+#{{{ OpenAI formats
+
+def _arguments_object(arguments):
+    if isinstance(arguments, str):
+        try:
+            return json.loads(arguments)
+        except ValueError:
+            return arguments
+    return arguments
+
+
+def _arguments_string(arguments):
+    return arguments if isinstance(arguments, str) else json.dumps(arguments)
+
+
+def _text_content(content):
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return "" if content is None else content
+
+
+def chat_completion_messages(messages):
+    """Chat Completions ``messages`` as chat template messages."""
+    converted = []
+    for message in messages:
+        message = dict(message)
+        message["content"] = _text_content(message.get("content"))
+        if message.get("tool_calls"):
+            message["tool_calls"] = [
+                dict(call, function=dict(call.get("function", {}), arguments=_arguments_object(call.get("function", {}).get("arguments", {}))))
+                for call in message["tool_calls"]
+            ]
+        converted.append(message)
+    return converted
+
+
+def responses_messages(body):
+    """Responses API ``instructions`` and ``input`` as chat template messages."""
+    messages = []
+    if body.get("instructions"):
+        messages.append({"role": "system", "content": body["instructions"]})
+
+    items = body.get("input") or []
+    if isinstance(items, str):
+        items = [{"role": "user", "content": items}]
+
+    for item in items:
+        kind = item.get("type", "message")
+        if kind == "function_call":
+            messages.append({
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [{
+                    "id": item.get("call_id") or item.get("id"),
+                    "type": "function",
+                    "function": {"name": item.get("name"), "arguments": _arguments_object(item.get("arguments", {}))},
+                }],
+            })
+        elif kind == "function_call_output":
+            messages.append({"role": "tool", "tool_call_id": item.get("call_id"), "content": _text_content(item.get("output"))})
+        elif kind == "message":
+            role = item.get("role", "user")
+            messages.append({"role": "system" if role == "developer" else role, "content": _text_content(item.get("content"))})
+    return messages
+
+
+def responses_tools(tools):
+    """Responses API function tools in the nested Chat Completions form chat templates expect."""
+    converted = []
+    for tool in tools or []:
+        if tool.get("type") == "function" and "function" not in tool:
+            tool = {"type": "function", "function": {key: value for key, value in tool.items() if key != "type"}}
+        converted.append(tool)
+    return converted
+
+
+def _generation_kwargs(body, max_tokens_key):
+    kwargs = {"max_new_tokens": body.get(max_tokens_key), "top_p": body.get("top_p")}
+    temperature = body.get("temperature")
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+        kwargs["do_sample"] = temperature > 0
+    return kwargs
+
+
+def _usage(result):
+    return result.prompt_tokens, len(result.token_ids)
+
+
+def chat_completion(result: GenerationResult, model_name: str) -> Dict[str, Any]:
+    message = {"role": "assistant", "content": result.message.get("content", "")}
+    tool_calls = result.message.get("tool_calls")
+    if tool_calls:
+        message["tool_calls"] = [
+            dict(call, function=dict(call["function"], arguments=_arguments_string(call["function"].get("arguments", {}))))
+            for call in tool_calls
+        ]
+    prompt_tokens, completion_tokens = _usage(result)
+    return {
+        "id": "chatcmpl-" + uuid.uuid4().hex,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model_name,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if tool_calls else result.finish_reason,
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def chat_completion_chunks(completion: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """A complete answer as the chunks of a streamed chat completion.
+
+    Used when tools are offered: whether the answer is text or tool calls is
+    only known once it is complete.
+    """
+    choice = completion["choices"][0]
+    delta = {"role": "assistant", "content": choice["message"].get("content", "")}
+    if choice["message"].get("tool_calls"):
+        delta["tool_calls"] = [dict(call, index=index) for index, call in enumerate(choice["message"]["tool_calls"])]
+    base = {key: completion[key] for key in ("id", "created", "model")}
+    return [
+        dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": delta, "finish_reason": None}]),
+        dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": {}, "finish_reason": choice["finish_reason"]}]),
+        dict(base, object="chat.completion.chunk", choices=[], usage=completion["usage"]),
+    ]
+
+
+def chat_completion_stream(stream: TextStream, model_name: str) -> Iterator[Dict[str, Any]]:
+    """Chunks of a streamed chat completion, yielded as ``stream`` produces the text."""
+    base = {"id": "chatcmpl-" + uuid.uuid4().hex, "object": "chat.completion.chunk", "created": int(time.time()), "model": model_name}
+    yield dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+    try:
+        for text in stream:
+            yield dict(base, choices=[{"index": 0, "delta": {"content": text}, "finish_reason": None}])
+    except Exception as error:
+        yield {"error": {"message": str(error), "type": type(error).__name__}}
+        return
+    completion = chat_completion(stream.result, model_name)
+    yield dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": completion["choices"][0]["finish_reason"]}])
+    yield dict(base, choices=[], usage=completion["usage"])
+
+
+def response_object(result: GenerationResult, model_name: str) -> Dict[str, Any]:
+    output = []
+    content = result.message.get("content", "")
+    if content:
+        output.append({
+            "type": "message",
+            "id": "msg_" + uuid.uuid4().hex,
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": content, "annotations": []}],
+        })
+    for call in result.message.get("tool_calls") or []:
+        output.append({
+            "type": "function_call",
+            "id": "fc_" + uuid.uuid4().hex,
+            "call_id": call.get("id"),
+            "name": call["function"].get("name"),
+            "arguments": _arguments_string(call["function"].get("arguments", {})),
+            "status": "completed",
+        })
+    if not output:
+        output.append({
+            "type": "message",
+            "id": "msg_" + uuid.uuid4().hex,
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": "", "annotations": []}],
+        })
+    prompt_tokens, completion_tokens = _usage(result)
+    return {
+        "id": "resp_" + uuid.uuid4().hex,
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model_name,
+        "status": "completed",
+        "output": output,
+        "usage": {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def response_events(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """A complete response as the events of a streamed one, see :func:`chat_completion_chunks`."""
+    events = [{"type": "response.created", "response": dict(response, status="in_progress", output=[])}]
+    for index, item in enumerate(response["output"]):
+        if item["type"] == "message":
+            text = item["content"][0]["text"]
+            events.append({"type": "response.output_text.delta", "output_index": index, "content_index": 0, "delta": text})
+            events.append({"type": "response.output_text.done", "output_index": index, "content_index": 0, "text": text})
+        events.append({"type": "response.output_item.done", "output_index": index, "item": item})
+    events.append({"type": "response.completed", "response": response})
+    return events
+
+
+def response_stream(stream: TextStream, model_name: str) -> Iterator[Dict[str, Any]]:
+    """Events of a streamed response, yielded as ``stream`` produces the text."""
+    response_id = "resp_" + uuid.uuid4().hex
+    yield {
+        "type": "response.created",
+        "response": {
+            "id": response_id, "object": "response", "created_at": int(time.time()),
+            "model": model_name, "status": "in_progress", "output": [],
+        },
+    }
+    try:
+        for text in stream:
+            yield {"type": "response.output_text.delta", "output_index": 0, "content_index": 0, "delta": text}
+    except Exception as error:
+        yield {"type": "error", "code": type(error).__name__, "message": str(error)}
+        return
+    response = dict(response_object(stream.result, model_name), id=response_id)
+    for index, item in enumerate(response["output"]):
+        if item["type"] == "message":
+            text = item["content"][0]["text"]
+            yield {"type": "response.output_text.done", "output_index": index, "content_index": 0, "text": text}
+        yield {"type": "response.output_item.done", "output_index": index, "item": item}
+    yield {"type": "response.completed", "response": response}
+
+
+#{{{ HTTP
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "scout-ai"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_events(self, events, done_marker):
+        """Send ``events`` as server-sent events, each as soon as it is produced."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for event in events:
+            if "type" in event:
+                self.wfile.write(f"event: {event['type']}\n".encode("utf-8"))
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        if done_marker:
+            self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _error(self, status, message):
+        self._send_json(status, {"error": {"message": message, "type": "invalid_request_error"}})
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": self.server.model_name, "object": "model", "owned_by": "scout-ai"}]})
+        else:
+            self._error(404, f"Unknown path {self.path}")
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as error:
+            return self._error(400, f"Invalid JSON body: {error}")
+
+        if path == "/v1/chat/completions":
+            messages = chat_completion_messages(body.get("messages") or [])
+            tools = body.get("tools")
+            kwargs = _generation_kwargs(body, "max_completion_tokens" if "max_completion_tokens" in body else "max_tokens")
+        elif path == "/v1/responses":
+            messages = responses_messages(body)
+            tools = responses_tools(body.get("tools"))
+            kwargs = _generation_kwargs(body, "max_output_tokens")
+        else:
+            return self._error(404, f"Unknown path {self.path}")
+
+        if body.get("stream") and not tools:
+            stream = self.server.batcher.stream(messages, generation_kwargs=kwargs)
+            if path == "/v1/chat/completions":
+                return self._send_events(chat_completion_stream(stream, self.server.model_name), done_marker=True)
+            return self._send_events(response_stream(stream, self.server.model_name), done_marker=False)
+
+        try:
+            result = self.server.batcher.submit(messages, tools=tools or None, generation_kwargs=kwargs).result()
+        except Exception as error:
+            return self._send_json(500, {"error": {"message": str(error), "type": type(error).__name__}})
+
+        if path == "/v1/chat/completions":
+            completion = chat_completion(result, self.server.model_name)
+            if body.get("stream"):
+                return self._send_events(chat_completion_chunks(completion), done_marker=True)
+            return self._send_json(200, completion)
+
+        response = response_object(result, self.server.model_name)
+        if body.get("stream"):
+            return self._send_events(response_events(response), done_marker=False)
+        return self._send_json(200, response)
+
+
+def make_server(batcher: ContinuousBatcher, host: str = "127.0.0.1", port: int = 8000, model_name: str = "scout-ai", verbose: bool = False) -> ThreadingHTTPServer:
+    """HTTP server answering OpenAI chat completion and response requests with ``batcher``."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.batcher = batcher
+    server.model_name = model_name
+    server.verbose = verbose
+    return server
+
+
+def serve(checkpoint: str, host: str = "127.0.0.1", port: int = 8000, max_batch_size: int = 8,
+          generation_kwargs: Optional[Dict[str, Any]] = None, verbose: bool = False, **model_kwargs) -> None:
+    from .model import load_model, load_tokenizer
+
+    model = load_model("CausalLM", checkpoint, **model_kwargs)
+    tokenizer = load_tokenizer(checkpoint)
+    batcher = ContinuousBatcher(model, tokenizer, max_batch_size=max_batch_size, generation_kwargs=generation_kwargs)
+    server = make_server(batcher, host, port, model_name=checkpoint, verbose=verbose)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        batcher.stop()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a Hugging Face causal LM with an OpenAI-compatible API")
+    parser.add_argument("checkpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-new-tokens", type=int, default=512)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    serve(
+        args.checkpoint, host=args.host, port=args.port, max_batch_size=args.max_batch_size,
+        generation_kwargs={"max_new_tokens": args.max_new_tokens}, verbose=args.verbose,
+    )
+
+
+if __name__ == "__main__":
+    main()
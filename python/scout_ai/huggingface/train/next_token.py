@@ -1,5 +1,6 @@
 import os
 import math
+import itertools
 import time
 import shutil
 import random
@@ -14,11 +15,12 @@ from transformers import (
     PreTrainedModel, 
     PreTrainedTokenizer, 
     get_scheduler, 
-    DataCollatorForLanguageModeling
 )
 from torch.optim import AdamW
 from transformers.utils import logging
 
+from ..data import LengthGroupedSampler, PaddingCollator
+
 logger = logging.get_logger(__name__)
 
 def set_seed(seed: int):
@@ -38,20 +40,19 @@ class TrainingState:
 
 def tokenize_function(examples, tokenizer, max_seq_length):
     # examples: dict with key 'text' or single texts
-    # Always output input_ids and attention_mask
+    # Always output input_ids and attention_mask, unpadded: PaddingCollator
+    # pads each batch to its longest example and builds the labels
     output = tokenizer(
         examples["text"] if "text" in examples else examples,
         truncation=True,
-        padding="max_length",
         max_length=max_seq_length,
         return_attention_mask=True,
     )
-    output["labels"] = output["input_ids"].copy()
     return output
 
 def group_texts(examples, block_size):
     # For paragraph-based datasets: simply return; for huge files, use this.
-    concatenated = {k: sum(examples[k], []) for k in examples.keys()}
+    concatenated = {k: list(itertools.chain.from_iterable(examples[k])) for k in examples.keys()}
     total_length = len(concatenated[list(examples.keys())[0]])
     # Drop the small remainder
     total_length = (total_length // block_size) * block_size
@@ -61,6 +62,30 @@ def group_texts(examples, block_size):
     }
     return result
 
+def pack_texts(examples, block_size, eos_token_id, position_ids=False):
+    # Concatenate the tokenized texts, each followed by eos, and cut the
+    # stream into blocks of block_size tokens; the last, shorter block is
+    # kept and padded by the collator. With position_ids, positions restart
+    # at 0 after each eos so every document starts where it would alone
+    # (attention implementations that read document boundaries from
+    # position_ids, like flash attention 2, then also mask across them)
+    tokens = []
+    positions = []
+    for ids in examples["input_ids"]:
+        if not ids or ids[-1] != eos_token_id:
+            ids = ids + [eos_token_id]
+        tokens.extend(ids)
+        if position_ids:
+            positions.extend(range(len(ids)))
+
+    result = {
+        "input_ids": [tokens[i : i + block_size] for i in range(0, len(tokens), block_size)],
+    }
+    result["attention_mask"] = [[1] * len(block) for block in result["input_ids"]]
+    if position_ids:
+        result["position_ids"] = [positions[i : i + block_size] for i in range(0, len(positions), block_size)]
+    return result
+
 def train_next_token(
     model: PreTrainedModel,
     tokenizer: PreTrainedTokenizer,
@@ -92,10 +117,17 @@ def train_next_token(
     device_map: str = "auto",
     dataloader_num_workers: int = 4,
     group_by_length: bool = False,
+    packing: bool = False,
+    packing_position_ids: bool = False,
     description: str = "",
 ):
     """
     Fine-tunes a causal LM for next-token prediction.
+
+    With packing=True the texts are concatenated, separated by eos, into
+    blocks of max_seq_length tokens instead of being trained one per row,
+    so no step is spent on padding; packing_position_ids restarts the
+    position ids at each document (see pack_texts).
     """
     #assert isinstance(model, PreTrainedModel), "Model must be a HuggingFace PreTrainedModel"
     #assert isinstance(tokenizer, PreTrainedTokenizer), "Tokenizer must be a HuggingFace PreTrainedTokenizer"
@@ -126,20 +158,34 @@ def train_next_token(
         eval_dataset = Dataset.from_dict({"text": eval_dataset})
 
     # Tokenization and formatting
-    def preprocess(examples):
-        return tokenize_function(examples, tokenizer, max_seq_length)
+    if packing:
+        if tokenizer.eos_token_id is None:
+            raise ValueError("Packing needs a tokenizer with an eos token to separate the texts")
+
+        def preprocess(examples):
+            # Texts are not truncated: long ones continue in the next block
+            tokenized = tokenizer(examples["text"] if "text" in examples else examples, return_attention_mask=False)
+            return pack_texts(tokenized, max_seq_length, tokenizer.eos_token_id, packing_position_ids)
+    else:
+        def preprocess(examples):
+            return tokenize_function(examples, tokenizer, max_seq_length)
 
     dataset = dataset.map(preprocess, batched=True, remove_columns=list(dataset.column_names))
     if eval_dataset is not None:
         eval_dataset = eval_dataset.map(preprocess, batched=True, remove_columns=list(eval_dataset.column_names))
 
     # 2. Loader & Collator
-    data_collator = DataCollatorForLanguageModeling(tokenizer, mlm=False)
+    data_collator = PaddingCollator(tokenizer, pad_to_multiple_of=8 if (fp16 or bf16) else None, causal_lm=True)
+
+    train_sampler = None
+    if group_by_length and not packing:
+        train_sampler = LengthGroupedSampler([len(ids) for ids in dataset["input_ids"]], batch_size, seed=seed)
 
     train_loader = DataLoader(
         dataset,
         batch_size=batch_size,
-        shuffle=True,
+        shuffle=train_sampler is None,
+        sampler=train_sampler,
         collate_fn=data_collator,
         num_workers=dataloader_num_workers,
         drop_last=True,
@@ -198,6 +244,8 @@ def train_next_token(
     start_time = time.time()
     for epoch in range(num_train_epochs):
         logger.info(f"Epoch {epoch+1}/{num_train_epochs}")
+        if train_sampler is not None:
+            train_sampler.set_epoch(epoch)
         for step, batch in enumerate(train_loader):
             true_step = state.global_step + 1
             batch = {k: v.to(device) for k, v in batch.items()}
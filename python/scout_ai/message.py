@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Any, Dict, Mapping
+import sys
+from collections.abc import MutableSequence
+from dataclasses import FrozenInstanceError
+from itertools import chain
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 
 
-@dataclass
 class Message:
     """Small wrapper around a Scout chat message.
 
@@ -12,46 +15,204 @@ class Message:
     dictionaries, but this wrapper makes the Python API easier to work with and
     gives ``chat()`` a useful return value whose string representation is the
     message content.
+
+    Messages are slotted and their role strings interned, and the ``extra``
+    dictionary for keys other than role and content is only allocated when a
+    message has (or is given) any. :class:`FrozenMessage` is an immutable
+    variant, see :meth:`freeze`.
     """
 
-    role: str
-    content: Any = ""
-    extra: Dict[str, Any] = field(default_factory=dict)
+    __slots__ = ("role", "content", "_extra")
+
+    def __init__(self, role: str, content: Any = "", extra: Optional[Dict[str, Any]] = None):
+        self.role = sys.intern(str(role))
+        self.content = content
+        self._extra = extra or None
+
+    @property
+    def extra(self) -> Dict[str, Any]:
+        if self._extra is None:
+            self._extra = {}
+        return self._extra
+
+    @extra.setter
+    def extra(self, value: Dict[str, Any]) -> None:
+        self._extra = value or None
 
     @classmethod
     def from_data(cls, data: Any) -> "Message":
-        if isinstance(data, cls):
-            return cls(data.role, data.content, dict(data.extra))
+        if isinstance(data, Message):
+            return cls(data.role, data.content, dict(data._extra) if data._extra else None)
 
         if isinstance(data, Mapping):
-            role = str(data.get("role", ""))
+            role = data.get("role", "")
             content = data.get("content", "")
-            extra = {k: v for k, v in data.items() if k not in ("role", "content")}
-            return cls(role=role, content=content, extra=extra)
+            extra = None
+            if len(data) > ("role" in data) + ("content" in data):
+                extra = {k: v for k, v in data.items() if k != "role" and k != "content"}
+            return cls(role, content, extra)
 
         raise TypeError(f"Unsupported message type: {type(data)!r}")
 
     def to_dict(self) -> Dict[str, Any]:
         data = {"role": self.role, "content": self.content}
-        data.update(self.extra)
+        if self._extra:
+            data.update(self._extra)
         return data
 
+    def matches(self, data: Any) -> bool:
+        """Whether ``self.to_dict() == Message.from_data(data).to_dict()``, without building either."""
+        extra = self._extra or {}
+        if isinstance(data, Message):
+            return self.role == data.role and self.content == data.content and extra == (data._extra or {})
+        if self.role != str(data.get("role", "")) or self.content != data.get("content", ""):
+            return False
+        if len(data) - ("role" in data) - ("content" in data) != len(extra):
+            return False
+        return all(key in data and data[key] == value for key, value in extra.items())
+
+    def freeze(self) -> "FrozenMessage":
+        if isinstance(self, FrozenMessage):
+            return self
+        return FrozenMessage(self.role, self.content, dict(self._extra) if self._extra else None)
+
     def get(self, key: str, default: Any = None) -> Any:
         if key == "role":
             return self.role
         if key == "content":
             return self.content
-        return self.extra.get(key, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
 
     def __getitem__(self, key: str) -> Any:
         if key == "role":
             return self.role
         if key == "content":
             return self.content
-        return self.extra[key]
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Message):
+            return NotImplemented
+        return self.role == other.role and self.content == other.content and (self._extra or {}) == (other._extra or {})
+
+    __hash__ = None  # type: ignore[assignment]
 
     def __str__(self) -> str:
         return "" if self.content is None else str(self.content)
 
     def __repr__(self) -> str:
         return f"Message(role={self.role!r}, content={self.content!r})"
+
+
+class FrozenMessage(Message):
+    """Immutable :class:`Message`; ``extra`` is a read-only mapping."""
+
+    __slots__ = ()
+
+    def __init__(self, role: str, content: Any = "", extra: Optional[Dict[str, Any]] = None):
+        object.__setattr__(self, "role", sys.intern(str(role)))
+        object.__setattr__(self, "content", content)
+        object.__setattr__(self, "_extra", extra or None)
+
+    @property
+    def extra(self) -> Mapping[str, Any]:
+        return MappingProxyType(self._extra or {})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def __reduce__(self):
+        # The default slot state restore would go through __setattr__
+        return (FrozenMessage, (self.role, self.content, dict(self._extra) if self._extra else None))
+
+    def __repr__(self) -> str:
+        return f"FrozenMessage(role={self.role!r}, content={self.content!r})"
+
+
+class MessageList(MutableSequence):
+    """List of messages that can be branched without copying.
+
+    Messages live in a shared, immutable prefix followed by a private tail.
+    :meth:`branch` freezes the tail into the prefix and returns a new list
+    over the same prefix, so branching an unchanged list is O(1) and branches
+    only store the messages appended to them. Indexing, changing or removing
+    a message of the shared prefix moves it, and the ones after it, to the
+    tail as mutable copies first; iterating yields the prefix messages as
+    :class:`FrozenMessage`.
+    """
+
+    __slots__ = ("_prefix", "_tail")
+
+    def __init__(self, messages: Iterable[Message] = ()):
+        self._prefix: Tuple[Message, ...] = ()
+        self._tail: List[Message] = list(messages)
+
+    def branch(self) -> "MessageList":
+        if self._tail:
+            self._prefix = self._prefix + tuple(message.freeze() for message in self._tail)
+            self._tail = []
+        branch = MessageList()
+        branch._prefix = self._prefix
+        return branch
+
+    def _materialize(self, start: int = 0) -> None:
+        """Move the prefix from ``start`` on to the tail, as mutable copies."""
+        if start < len(self._prefix):
+            thawed = [Message.from_data(message) for message in self._prefix[start:]]
+            self._tail = thawed + self._tail
+            self._prefix = self._prefix[:start]
+
+    def __len__(self) -> int:
+        return len(self._prefix) + len(self._tail)
+
+    def __iter__(self) -> Iterator[Message]:
+        return chain(self._prefix, self._tail)
+
+    def __reversed__(self) -> Iterator[Message]:
+        return chain(reversed(self._tail), reversed(self._prefix))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("message index out of range")
+        if index < len(self._prefix):
+            # The caller may modify the message in place
+            self._materialize(index)
+        return self._tail[index - len(self._prefix)]
+
+    def __setitem__(self, index, value) -> None:
+        self._materialize()
+        self._tail[index] = value
+
+    def __delitem__(self, index) -> None:
+        self._materialize()
+        del self._tail[index]
+
+    def insert(self, index: int, value: Message) -> None:
+        if index >= len(self):
+            self._tail.append(value)
+        else:
+            self._materialize()
+            self._tail.insert(index, value)
+
+    def append(self, value: Message) -> None:
+        self._tail.append(value)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (MessageList, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
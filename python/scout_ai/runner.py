@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
 import json
 import os
 import shlex
@@ -8,7 +10,9 @@ import sys
 import tempfile
 import threading
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence, TextIO
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+from . import chat_format
 
 
 class CommandError(RuntimeError):
@@ -21,12 +25,115 @@ class CommandError(RuntimeError):
         super().__init__(message)
 
 
+StderrCallback = Callable[[str], Union[None, Awaitable[None]]]
+
+
+def _on_loop(on_stderr: Optional[StderrCallback]) -> Optional[Callable[[str], None]]:
+    """Wrap ``on_stderr`` to be called from another thread, running it on the current event loop."""
+    if on_stderr is None:
+        return None
+    loop = asyncio.get_running_loop()
+
+    def call(chunk: str) -> None:
+        result = on_stderr(chunk)
+        if inspect.isawaitable(result):
+            asyncio.ensure_future(result)
+
+    return lambda chunk: loop.call_soon_threadsafe(call, chunk)
+
+
+class AgentCache:
+    """Process-wide cache of agent paths and parsed start chats.
+
+    Agent paths are kept while they exist on disk and start chats while the
+    file keeps the same mtime and size. Files imported by a start chat are not
+    tracked; call :func:`clear_cache` after changing them. Entries are keyed
+    by the runner command, so runners for different installations do not mix.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._paths: Dict[Tuple[Any, ...], Path] = {}
+        self._chats: Dict[Tuple[Any, ...], Tuple[int, int, List[dict]]] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._paths.clear()
+            self._chats.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def agent_path(self, key: Tuple[Any, ...], find: Callable[[], Optional[Path]]) -> Optional[Path]:
+        with self._lock:
+            path = self._paths.get(key)
+            hit = path is not None and path.exists()
+            self._count(hit)
+        if hit:
+            return path
+        path = find()
+        if path is not None:
+            with self._lock:
+                self._paths[key] = path
+        return path
+
+    def start_chat(self, key: Tuple[Any, ...], path: Path, load: Callable[[], List[dict]]) -> List[dict]:
+        stat = path.stat()
+        with self._lock:
+            entry = self._chats.get(key)
+            hit = entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size)
+            self._count(hit)
+        if hit:
+            messages = entry[2]
+        else:
+            messages = load()
+            with self._lock:
+                self._chats[key] = (stat.st_mtime_ns, stat.st_size, messages)
+        return [dict(message) for message in messages]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "paths": len(self._paths), "chats": len(self._chats)}
+
+
+AGENT_CACHE = AgentCache()
+
+
+def clear_cache() -> None:
+    """Forget every cached agent path and start chat."""
+    AGENT_CACHE.clear()
+
+
 class ScoutRunner:
     """Run Scout-AI CLI commands.
 
     The Python package deliberately keeps Ruby as the source of truth for chat
     parsing/printing and LLM execution. This runner is the bridge to those CLI
     commands.
+
+    With ``persistent=True`` (or ``SCOUT_AI_WORKER=true`` in the environment)
+    the runner keeps a single ``scout-ai llm worker`` process alive and sends
+    every operation to it instead of starting a new process each time.
+
+    Chat text is printed and parsed in Python (:mod:`scout_ai.chat_format`)
+    unless ``native=False`` or ``SCOUT_AI_NATIVE_FORMAT=false``. Chats that
+    need the Scout runtime to be processed (imports, files, tasks, ...) are
+    still parsed by Ruby.
+
+    The ``*_async`` methods run commands with :mod:`asyncio` subprocesses. At
+    most ``max_concurrency`` of them (``SCOUT_AI_MAX_CONCURRENCY``, 8 by
+    default) run at the same time; cancelling the awaiting task kills the
+    child process, or the worker when ``persistent``.
+
+    Agent paths and start chats are cached for the whole process, see
+    :class:`AgentCache`; pass ``cache=False`` to always ask Scout.
     """
 
     def __init__(
@@ -34,9 +141,21 @@ class ScoutRunner:
         command: Optional[Sequence[str] | str] = None,
         show_stderr: bool = True,
         stderr: Optional[TextIO] = None,
+        persistent: Optional[bool] = None,
+        native: Optional[bool] = None,
+        max_concurrency: Optional[int] = None,
+        cache: bool = True,
     ):
         if command is None:
             command = os.environ.get("SCOUT_AI_COMMAND", "scout-ai")
+        if persistent is None:
+            persistent = os.environ.get("SCOUT_AI_WORKER", "").lower() in ("1", "true", "yes")
+        if native is None:
+            native = os.environ.get("SCOUT_AI_NATIVE_FORMAT", "").lower() not in ("0", "false", "no")
+        if max_concurrency is None:
+            max_concurrency = int(os.environ.get("SCOUT_AI_MAX_CONCURRENCY", "8"))
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
 
         if isinstance(command, str):
             self.command = shlex.split(command)
@@ -48,19 +167,37 @@ class ScoutRunner:
 
         self.show_stderr = show_stderr
         self.stderr = stderr
-
-    def _run(self, *args: str, stream_stderr: bool = False) -> str:
-        cmd = self.command + [str(arg) for arg in args]
-
+        self.persistent = persistent
+        self.native = native
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self._worker = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def worker(self):
+        if self._worker is None:
+            from .worker import ScoutWorker
+
+            self._worker = ScoutWorker(self.command, show_stderr=self.show_stderr, stderr=self.stderr)
+        return self._worker
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.close()
+            self._worker = None
+
+    def _popen(self, cmd: List[str], stream_stderr: bool, input: Optional[str]) -> Tuple[subprocess.Popen, threading.Thread]:
         proc = subprocess.Popen(
             cmd,
+            stdin=subprocess.PIPE if input is not None else None,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
             bufsize=1,
         )
 
-        stdout_chunks: List[str] = []
         should_stream = stream_stderr and self.show_stderr
         stderr_target = self.stderr if self.stderr is not None else sys.stderr
 
@@ -77,20 +214,147 @@ class ScoutRunner:
         stderr_thread = threading.Thread(target=forward_stderr, daemon=True)
         stderr_thread.start()
 
+        if input is not None:
+            def write_stdin() -> None:
+                assert proc.stdin is not None
+                try:
+                    proc.stdin.write(input)
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+
+            threading.Thread(target=write_stdin, daemon=True).start()
+
+        return proc, stderr_thread
+
+    def _run(self, *args: str, stream_stderr: bool = False, input: Optional[str] = None) -> str:
+        cmd = self.command + [str(arg) for arg in args]
+        proc, stderr_thread = self._popen(cmd, stream_stderr, input)
+
         assert proc.stdout is not None
-        stdout_chunks.append(proc.stdout.read())
+        stdout = proc.stdout.read()
         proc.stdout.close()
 
         stderr_thread.join()
         returncode = proc.wait()
 
-        stdout = "".join(stdout_chunks)
+        if returncode != 0:
+            raise CommandError(cmd, stdout, "", returncode)
+        return stdout
+
+    def _run_lines(self, *args: str, stream_stderr: bool = False, input: Optional[str] = None) -> Iterator[str]:
+        """Like :meth:`_run` but yield stdout line by line as it is written.
+
+        Closing the generator early kills the command.
+        """
+        cmd = self.command + [str(arg) for arg in args]
+        proc, stderr_thread = self._popen(cmd, stream_stderr, input)
+
+        try:
+            assert proc.stdout is not None
+            for line in proc.stdout:
+                yield line
+            stderr_thread.join()
+            returncode = proc.wait()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+        if returncode != 0:
+            raise CommandError(cmd, "", "", returncode)
+
+    def _concurrency(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _run_async(
+        self,
+        *args: str,
+        stream_stderr: bool = False,
+        input: Optional[str] = None,
+        on_stderr: Optional[StderrCallback] = None,
+    ) -> str:
+        cmd = self.command + [str(arg) for arg in args]
+        should_stream = stream_stderr and self.show_stderr
+        stderr_target = self.stderr if self.stderr is not None else sys.stderr
+
+        async with self._concurrency():
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE if input is not None else None,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+
+            async def write_stdin() -> None:
+                assert proc.stdin is not None
+                try:
+                    proc.stdin.write(input.encode("utf-8"))
+                    await proc.stdin.drain()
+                    proc.stdin.close()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            async def forward_stderr() -> None:
+                assert proc.stderr is not None
+                async for line in proc.stderr:
+                    chunk = line.decode("utf-8", errors="replace")
+                    if on_stderr is not None:
+                        result = on_stderr(chunk)
+                        if inspect.isawaitable(result):
+                            await result
+                    elif should_stream:
+                        stderr_target.write(chunk)
+                        stderr_target.flush()
+
+            tasks = [asyncio.ensure_future(forward_stderr())]
+            if input is not None:
+                tasks.append(asyncio.ensure_future(write_stdin()))
+
+            try:
+                assert proc.stdout is not None
+                stdout = (await proc.stdout.read()).decode("utf-8")
+                await asyncio.gather(*tasks)
+                returncode = await proc.wait()
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                raise
 
         if returncode != 0:
             raise CommandError(cmd, stdout, "", returncode)
         return stdout
 
+    async def _request_async(self, op: str, on_stderr: Optional[StderrCallback] = None, **payload: Any) -> Any:
+        """Send a request to the worker from a thread, keeping the event loop free."""
+        async with self._concurrency():
+            future = asyncio.ensure_future(
+                asyncio.to_thread(self.worker.request, op, stream_stderr=True, on_stderr=_on_loop(on_stderr), **payload)
+            )
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The thread keeps waiting for the answer, holding the worker,
+                # until the worker dies
+                if not future.done():
+                    self.worker.kill()
+                    await asyncio.wait([future])
+                raise
+
     def json_to_chat_file(self, messages: Iterable[dict], chat_file: Path) -> Path:
+        if self.native:
+            Path(chat_file).write_text(chat_format.render(list(messages)), encoding="utf-8")
+            return chat_file
+        if self.persistent:
+            Path(chat_file).write_text(self.worker.request("render", messages=list(messages)), encoding="utf-8")
+            return chat_file
         with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False, encoding="utf-8") as handle:
             json.dump(list(messages), handle, ensure_ascii=False, indent=2)
             json_file = Path(handle.name)
@@ -101,6 +365,12 @@ class ScoutRunner:
         return chat_file
 
     def chat_file_to_messages(self, chat_file: Path) -> List[dict]:
+        if self.native:
+            messages = chat_format.parse(Path(chat_file).read_text(encoding="utf-8"))
+            if not chat_format.needs_ruby(messages):
+                return chat_format.process(messages)
+        if self.persistent:
+            return self.worker.request("parse", file=str(Path(chat_file).absolute()))
         with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False, encoding="utf-8") as handle:
             json_file = Path(handle.name)
         try:
@@ -113,6 +383,10 @@ class ScoutRunner:
             json_file.unlink(missing_ok=True)
 
     def render_chat(self, messages: Iterable[dict]) -> str:
+        if self.native:
+            return chat_format.render(list(messages))
+        if self.persistent:
+            return self.worker.request("render", messages=list(messages))
         with tempfile.NamedTemporaryFile(mode="w", suffix=".chat", delete=False, encoding="utf-8") as handle:
             chat_file = Path(handle.name)
         try:
@@ -122,6 +396,12 @@ class ScoutRunner:
             chat_file.unlink(missing_ok=True)
 
     def parse_chat_text(self, text: str) -> List[dict]:
+        if self.native:
+            messages = chat_format.parse(text)
+            if not chat_format.needs_ruby(messages):
+                return chat_format.process(messages)
+        if self.persistent:
+            return self.worker.request("parse", text=text)
         with tempfile.NamedTemporaryFile(mode="w", suffix=".chat", delete=False, encoding="utf-8") as handle:
             handle.write(text)
             chat_file = Path(handle.name)
@@ -149,29 +429,154 @@ class ScoutRunner:
         self.json_to_chat_file(messages, path)
         return path
 
+    @staticmethod
+    def _ask_args(agent_name: Optional[str]) -> List[str]:
+        if agent_name:
+            return ["agent", "ask", str(agent_name), "--json"]
+        return ["llm", "ask", "--json"]
+
     def ask_messages(self, messages: Iterable[dict], agent_name: Optional[str] = None) -> List[dict]:
         messages = list(messages)
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".chat", delete=False, encoding="utf-8") as handle:
-            chat_file = Path(handle.name)
-        try:
-            self.json_to_chat_file(messages, chat_file)
-            if agent_name:
-                self._run("agent", "ask", str(agent_name), "--chat", str(chat_file), stream_stderr=True)
+        if self.persistent:
+            return self.worker.request("ask", stream_stderr=True, messages=messages, agent=agent_name)
+        output = self._run(*self._ask_args(agent_name), stream_stderr=True, input=json.dumps(messages))
+        return [] if output.strip() == "" else json.loads(output)
+
+    def ask_delta(self, messages: Iterable[dict], agent_name: Optional[str] = None) -> Tuple[int, List[dict]]:
+        """Ask and return ``(start, new_messages)`` instead of the whole conversation.
+
+        ``start`` is the length of the prefix the updated conversation shares
+        with ``messages``; ``new_messages`` replaces everything after it.
+        """
+        messages = list(messages)
+        if self.persistent:
+            result = self.worker.request("ask", stream_stderr=True, messages=messages, agent=agent_name, delta=True)
+        else:
+            output = self._run(*self._ask_args(agent_name), "--delta", stream_stderr=True, input=json.dumps(messages))
+            result = json.loads(output)
+        return result["start"], result["messages"]
+
+    async def ask_messages_async(
+        self,
+        messages: Iterable[dict],
+        agent_name: Optional[str] = None,
+        on_stderr: Optional[StderrCallback] = None,
+    ) -> List[dict]:
+        """Async :meth:`ask_messages`.
+
+        ``on_stderr`` receives each line the command writes to stderr (progress
+        and log output) and may be a plain function or a coroutine function.
+        Without it, stderr is forwarded like in :meth:`ask_messages`.
+        """
+        messages = list(messages)
+        if self.persistent:
+            return await self._request_async("ask", on_stderr, messages=messages, agent=agent_name)
+        output = await self._run_async(
+            *self._ask_args(agent_name), stream_stderr=True, input=json.dumps(messages), on_stderr=on_stderr
+        )
+        return [] if output.strip() == "" else json.loads(output)
+
+    async def ask_delta_async(
+        self,
+        messages: Iterable[dict],
+        agent_name: Optional[str] = None,
+        on_stderr: Optional[StderrCallback] = None,
+    ) -> Tuple[int, List[dict]]:
+        """Async :meth:`ask_delta`, see :meth:`ask_messages_async`."""
+        messages = list(messages)
+        if self.persistent:
+            result = await self._request_async("ask", on_stderr, messages=messages, agent=agent_name, delta=True)
+            return result["start"], result["messages"]
+        output = await self._run_async(
+            *self._ask_args(agent_name), "--delta", stream_stderr=True, input=json.dumps(messages), on_stderr=on_stderr
+        )
+        result = json.loads(output)
+        return result["start"], result["messages"]
+
+    def stream_messages(self, messages: Iterable[dict], agent_name: Optional[str] = None) -> Iterator[dict]:
+        """Ask like :meth:`ask_messages`, yielding progress events as they come.
+
+        Events are ``{"type": "delta", "text": ...}`` for chunks of assistant
+        text, ``{"type": "message", "message": ...}`` for each complete message
+        and a last ``{"type": "done", "start": ..., "messages": ...}`` with the
+        new messages, as returned by :meth:`ask_delta`. Streaming always uses a
+        dedicated ``scout-ai`` process.
+        """
+        args = self._ask_args(agent_name) + ["--stream", "--delta"]
+        for line in self._run_lines(*args, stream_stderr=True, input=json.dumps(list(messages))):
+            if line.strip() != "":
+                yield json.loads(line)
+
+    def ask_many(
+        self,
+        conversations: Iterable[Iterable[dict]],
+        agent_name: Optional[str] = None,
+        max_parallel: Optional[int] = None,
+        ordered: bool = False,
+    ) -> Iterator[Tuple[int, List[dict] | CommandError]]:
+        """Ask many independent conversations with a single ``scout-ai`` process.
+
+        Yields ``(index, updated_messages)`` pairs as conversations finish, or
+        in input order with ``ordered=True``. A conversation that fails yields a
+        :class:`CommandError` in place of its messages so the rest of the batch
+        keeps going. Up to ``max_parallel`` conversations are asked at the same
+        time (Scout's ``SCOUT_AI_MAX_PARALLEL`` or 3 by default).
+        """
+        conversations = [list(messages) for messages in conversations]
+        if not conversations:
+            return
+
+        args = self._ask_args(agent_name)
+        args[-1] = "--json_batch"
+        if max_parallel is not None:
+            args += ["--max_parallel", str(max_parallel)]
+
+        pending: Dict[int, List[dict] | CommandError] = {}
+        next_index = 0
+        for line in self._run_lines(*args, stream_stderr=True, input=json.dumps(conversations)):
+            if line.strip() == "":
+                continue
+            result = json.loads(line)
+            index = result["index"]
+            if "error" in result:
+                cmd = self.command + args + [str(index)]
+                value: List[dict] | CommandError = CommandError(cmd, "", str(result["error"]), 1)
             else:
-                self._run("llm", "ask", "--chat", str(chat_file), stream_stderr=True)
-            return self.chat_file_to_messages(chat_file)
-        finally:
-            chat_file.unlink(missing_ok=True)
+                value = result["messages"]
+
+            if not ordered:
+                yield index, value
+                continue
+
+            pending[index] = value
+            while next_index in pending:
+                yield next_index, pending.pop(next_index)
+                next_index += 1
 
     def find_agent_path(self, agent_name: str) -> Optional[Path]:
+        if self.cache:
+            key = (tuple(self.command), str(agent_name))
+            return AGENT_CACHE.agent_path(key, lambda: self._find_agent_path(agent_name))
+        return self._find_agent_path(agent_name)
+
+    def _find_agent_path(self, agent_name: str) -> Optional[Path]:
         try:
-            output = self._run("agent", "find", str(agent_name)).strip()
+            if self.persistent:
+                output = (self.worker.request("find_agent", agent=str(agent_name)) or "").strip()
+            else:
+                output = self._run("agent", "find", str(agent_name)).strip()
         except CommandError:
             return None
         if not output:
             return None
         return Path(output)
 
+    def _load_start_chat(self, path: Path) -> List[dict]:
+        if self.cache:
+            key = (tuple(self.command), str(path.absolute()))
+            return AGENT_CACHE.start_chat(key, path, lambda: self.load_messages(path, input_format="chat"))
+        return self.load_messages(path, input_format="chat")
+
     def load_agent_start_chat(self, agent_name: str) -> List[dict]:
         path = self.find_agent_path(agent_name)
         if path is None:
@@ -179,7 +584,7 @@ class ScoutRunner:
 
         if path.is_file():
             try:
-                return self.load_messages(path, input_format="chat")
+                return self._load_start_chat(path)
             except Exception:
                 return []
 
@@ -193,7 +598,7 @@ class ScoutRunner:
         for candidate in candidates:
             if candidate.exists() and candidate.is_file():
                 try:
-                    return self.load_messages(candidate, input_format="chat")
+                    return self._load_start_chat(candidate)
                 except Exception:
                     continue
 
@@ -0,0 +1,236 @@
+"""Persistent vector index for retrieval, shared with Ruby's ``LLM::RAG::Index``.
+
+Documents have string ids, an optional text and a vector. They can be
+added, replaced (adding an existing id updates it) and deleted at any time;
+the index grows as needed. Two backends hold the vectors:
+
+* ``hnsw``: an approximate hnswlib graph, used when hnswlib is installed
+* ``flat``: a NumPy matrix searched exhaustively, exact and fast enough for
+  small corpora
+
+An index is saved to a directory with ``documents.json`` (dimension, space,
+backend and the id -> ``[label, text]`` map) plus ``hnsw.bin`` or
+``vectors.f32`` (float32 rows by label, memory mapped on load).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+SPACES = ("cosine", "l2", "ip")
+DOCUMENTS = "documents.json"
+HNSW = "hnsw.bin"
+VECTORS = "vectors.f32"
+
+
+def _hnswlib():
+    try:
+        import hnswlib
+    except ImportError:
+        return None
+    return hnswlib
+
+
+class VectorIndex:
+    """Add, delete and search documents by vector; see the module documentation."""
+
+    def __init__(
+        self,
+        dim: int,
+        space: str = "cosine",
+        backend: Optional[str] = None,
+        max_elements: int = 1024,
+        ef_construction: int = 200,
+        M: int = 16,
+    ):
+        if space not in SPACES:
+            raise ValueError(f"Unknown space {space!r}, use one of {', '.join(SPACES)}")
+        if backend is None:
+            backend = "hnsw" if _hnswlib() is not None else "flat"
+        if backend not in ("hnsw", "flat"):
+            raise ValueError(f"Unknown backend {backend!r}, use 'hnsw' or 'flat'")
+
+        self.dim = dim
+        self.space = space
+        self.backend = backend
+        self.documents: Dict[str, Tuple[int, Optional[str]]] = {}
+        self._ids: Dict[int, str] = {}
+        self._next_label = 0
+        self._capacity = max(int(max_elements), 1)
+        self._ef = 50
+
+        if backend == "hnsw":
+            self._hnsw = _hnswlib().Index(space=space, dim=dim)
+            self._hnsw.init_index(max_elements=self._capacity, ef_construction=ef_construction, M=M)
+        else:
+            import numpy as np
+
+            self._vectors = np.zeros((self._capacity, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.documents
+
+    def text(self, id: str) -> Optional[str]:
+        return self.documents[id][1]
+
+    def _reserve(self, count: int) -> None:
+        needed = self._next_label + count
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity * 2)
+        if self.backend == "hnsw":
+            self._hnsw.resize_index(capacity)
+        else:
+            import numpy as np
+
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            vectors[: self._next_label] = self._vectors[: self._next_label]
+            self._vectors = vectors
+        self._capacity = capacity
+
+    def add(self, ids: Sequence[str], vectors, texts: Optional[Sequence[Optional[str]]] = None) -> None:
+        """Add documents, replacing the vector of ids already present, and their text unless it is None."""
+        import numpy as np
+
+        ids = [str(id) for id in ids]
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        texts = list(texts) if texts is not None else [None] * len(ids)
+
+        new = len({id for id in ids if id not in self.documents})
+        self._reserve(new)
+
+        labels = []
+        for id, text in zip(ids, texts):
+            if id in self.documents:
+                label, current = self.documents[id]
+                # Refreshing only the vector keeps the text
+                if text is None:
+                    text = current
+            else:
+                label = self._next_label
+                self._next_label += 1
+                self._ids[label] = id
+            self.documents[id] = (label, text)
+            labels.append(label)
+
+        if self.backend == "hnsw":
+            self._hnsw.add_items(vectors, np.asarray(labels))
+        else:
+            if self.space == "cosine":
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                vectors = vectors / np.maximum(norms, 1e-12)
+            self._vectors[labels] = vectors
+
+    upsert = add
+
+    def delete(self, ids: Iterable[str]) -> None:
+        for id in ids:
+            if id not in self.documents:
+                continue
+            label, _ = self.documents.pop(id)
+            del self._ids[label]
+            if self.backend == "hnsw":
+                self._hnsw.mark_deleted(label)
+
+    def search(self, vectors, k: int = 10) -> List[List[Tuple[str, float]]]:
+        """The ``k`` nearest documents to each query vector, as ``(id, distance)`` pairs."""
+        import numpy as np
+
+        queries = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        k = min(k, len(self.documents))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        if self.backend == "hnsw":
+            # Deleted elements still occupy the graph; look further to return k live ones
+            self._hnsw.set_ef(max(self._ef, k))
+            labels, distances = self._hnsw.knn_query(queries, k=k)
+        else:
+            labels, distances = self._flat_search(queries, k)
+
+        return [
+            [(self._ids[int(label)], float(distance)) for label, distance in zip(row_labels, row_distances)]
+            for row_labels, row_distances in zip(labels, distances)
+        ]
+
+    def _flat_search(self, queries, k):
+        import numpy as np
+
+        live = np.fromiter(self._ids.keys(), dtype=np.int64, count=len(self._ids))
+        vectors = self._vectors[live]
+
+        if self.space == "l2":
+            distances = (
+                (queries ** 2).sum(axis=1, keepdims=True)
+                - 2 * queries @ vectors.T
+                + (vectors ** 2).sum(axis=1)[None, :]
+            )
+        else:
+            if self.space == "cosine":
+                queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+            distances = 1.0 - queries @ vectors.T
+
+        best = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        best_distances = np.take_along_axis(distances, best, axis=1)
+        order = np.argsort(best_distances, axis=1)
+        return live[np.take_along_axis(best, order, axis=1)], np.take_along_axis(best_distances, order, axis=1)
+
+    def query(self, vector, k: int = 10) -> List[Tuple[str, float]]:
+        return self.search([vector], k)[0]
+
+    #{{{ Persistence
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        if self.backend == "hnsw":
+            self._hnsw.save_index(os.path.join(path, HNSW))
+        else:
+            with open(os.path.join(path, VECTORS + ".tmp"), "wb") as handle:
+                handle.write(self._vectors[: self._next_label].astype("<f4").tobytes())
+            os.replace(os.path.join(path, VECTORS + ".tmp"), os.path.join(path, VECTORS))
+
+        info = {
+            "dim": self.dim,
+            "space": self.space,
+            "backend": self.backend,
+            "next_label": self._next_label,
+            "documents": {id: [label, text] for id, (label, text) in self.documents.items()},
+        }
+        with open(os.path.join(path, DOCUMENTS + ".tmp"), "w", encoding="utf-8") as handle:
+            json.dump(info, handle)
+        os.replace(os.path.join(path, DOCUMENTS + ".tmp"), os.path.join(path, DOCUMENTS))
+
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        import numpy as np
+
+        with open(os.path.join(path, DOCUMENTS), encoding="utf-8") as handle:
+            info = json.load(handle)
+
+        index = cls.__new__(cls)
+        index.dim = info["dim"]
+        index.space = info["space"]
+        index.backend = info["backend"]
+        index.documents = {id: (label, text) for id, (label, text) in info["documents"].items()}
+        index._ids = {label: id for id, (label, _) in index.documents.items()}
+        index._next_label = info["next_label"]
+        index._capacity = max(index._next_label, 1)
+        index._ef = 50
+
+        if index.backend == "hnsw":
+            hnswlib = _hnswlib()
+            if hnswlib is None:
+                raise ImportError(f"The index at {path} was built with hnswlib, which is not installed")
+            index._hnsw = hnswlib.Index(space=index.space, dim=index.dim)
+            index._hnsw.load_index(os.path.join(path, HNSW), max_elements=index._capacity)
+        else:
+            # Copy-on-write map: pages are read lazily and updates stay in memory
+            index._vectors = np.memmap(
+                os.path.join(path, VECTORS), dtype="<f4", mode="c", shape=(index._next_label, index.dim)
+            ) if index._next_label else np.zeros((1, index.dim), dtype=np.float32)
+        return index
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import json
+import struct
+import subprocess
+import sys
+import threading
+from typing import Any, Callable, List, Optional, Sequence, TextIO
+
+from .runner import CommandError
+
+_HEADER = struct.Struct(">I")
+
+# Operations that can be safely re-sent to a fresh worker if the previous one
+# died while serving them. ``ask`` is excluded: the model may already have been
+# called, so the caller gets the error instead of a silent duplicate request.
+_IDEMPOTENT_OPS = {"ping", "render", "parse", "find_agent"}
+
+
+class WorkerCrashed(CommandError):
+    pass
+
+
+class ScoutWorker:
+    """Long-lived ``scout-ai llm worker`` process.
+
+    Requests and responses are JSON documents framed with their length as a
+    4-byte big-endian integer, exchanged over the worker's stdin/stdout. The
+    process is started lazily and restarted transparently if it dies.
+    """
+
+    def __init__(
+        self,
+        command: Sequence[str],
+        show_stderr: bool = True,
+        stderr: Optional[TextIO] = None,
+    ):
+        self.command = list(command) + ["llm", "worker"]
+        self.show_stderr = show_stderr
+        self.stderr = stderr
+        self.starts = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._stream_stderr = False
+        self._on_stderr: Optional[Callable[[str], None]] = None
+
+    @property
+    def restarts(self) -> int:
+        return max(self.starts - 1, 0)
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self) -> None:
+        if self.alive:
+            return
+        self.starts += 1
+        self._proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+        )
+        threading.Thread(target=self._forward_stderr, args=(self._proc,), daemon=True).start()
+
+    def _forward_stderr(self, proc: subprocess.Popen) -> None:
+        assert proc.stderr is not None
+        for line in iter(proc.stderr.readline, b""):
+            on_stderr = self._on_stderr
+            if on_stderr is not None:
+                try:
+                    on_stderr(line.decode("utf-8", errors="replace"))
+                except Exception:
+                    # Keep draining the pipe or the worker blocks writing to it
+                    pass
+            elif self._stream_stderr and self.show_stderr:
+                target = self.stderr if self.stderr is not None else sys.stderr
+                target.write(line.decode("utf-8", errors="replace"))
+                target.flush()
+
+    def kill(self) -> None:
+        """Kill the process; a request waiting on it fails with :class:`WorkerCrashed`."""
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin is not None:
+                proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+            proc.wait()
+
+    def _read_exact(self, size: int) -> bytes:
+        assert self._proc is not None and self._proc.stdout is not None
+        chunks: List[bytes] = []
+        remaining = size
+        while remaining > 0:
+            chunk = self._proc.stdout.read(remaining)
+            if not chunk:
+                raise EOFError("worker closed its output")
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _exchange(self, request: dict) -> dict:
+        self.start()
+        assert self._proc is not None and self._proc.stdin is not None
+        payload = json.dumps(request, ensure_ascii=False).encode("utf-8")
+        self._proc.stdin.write(_HEADER.pack(len(payload)) + payload)
+        self._proc.stdin.flush()
+        (size,) = _HEADER.unpack(self._read_exact(_HEADER.size))
+        return json.loads(self._read_exact(size).decode("utf-8"))
+
+    def request(
+        self,
+        op: str,
+        stream_stderr: bool = False,
+        on_stderr: Optional[Callable[[str], None]] = None,
+        **payload: Any,
+    ) -> Any:
+        """Send one request and return its result.
+
+        ``on_stderr`` is called, from the thread reading the worker's stderr,
+        with each line written while the request is served; lines that arrive
+        after the response are not waited for.
+        """
+        request = dict(payload, op=op)
+        cmd = self.command + [op]
+        with self._lock:
+            self._stream_stderr = stream_stderr
+            self._on_stderr = on_stderr
+            try:
+                attempts = 2 if op in _IDEMPOTENT_OPS else 1
+                for attempt in range(attempts):
+                    try:
+                        response = self._exchange(request)
+                        break
+                    except (BrokenPipeError, EOFError, OSError) as error:
+                        status = self._proc.poll() if self._proc is not None else None
+                        self.close()
+                        if attempt + 1 == attempts:
+                            raise WorkerCrashed(cmd, "", f"Scout worker died: {error}", status or 1) from error
+                    except BaseException:
+                        # A half-read frame would be taken as the response to
+                        # the next request
+                        self.close()
+                        raise
+            finally:
+                self._stream_stderr = False
+                self._on_stderr = None
+
+        if not response.get("ok"):
+            raise CommandError(cmd, "", str(response.get("error") or "Scout worker request failed"), 1)
+        return response.get("result")
+
+    def __enter__(self) -> "ScoutWorker":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
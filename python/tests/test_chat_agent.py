@@ -1,3 +1,4 @@
+import asyncio
 import unittest
 
 from scout_ai import Chat, Message, load_agent
@@ -12,6 +13,24 @@ class FakeRunner:
             {"role": "previous_response_id", "content": f"resp-{label}"},
         ]
 
+    async def ask_messages_async(self, messages, agent_name=None, on_stderr=None):
+        await asyncio.sleep(0)
+        return self.ask_messages(messages, agent_name=agent_name)
+
+    def ask_many(self, conversations, agent_name=None, max_parallel=None, ordered=False):
+        for index, messages in enumerate(conversations):
+            yield index, self.ask_messages(messages, agent_name=agent_name)
+
+    def stream_messages(self, messages, agent_name=None):
+        updated = self.ask_messages(messages, agent_name=agent_name)
+        call = {"role": "function_call", "content": '{"name": "search"}'}
+        yield {"type": "message", "message": call}
+        yield {"type": "delta", "text": "reply "}
+        yield {"type": "delta", "text": f"from {agent_name or 'llm'}"}
+        yield {"type": "message", "message": updated[-2]}
+        yield {"type": "message", "message": {"role": "assistant", "content": "unstreamed"}}
+        yield {"type": "done", "messages": updated}
+
     def load_agent_start_chat(self, agent_name):
         return [{"role": "system", "content": f"Agent {agent_name}"}]
 
@@ -62,6 +81,115 @@ class ChatAgentTest(unittest.TestCase):
         self.assertEqual(message.content, "reply from Planner")
         self.assertEqual(agent.current_chat[-1].role, "previous_response_id")
 
+    def test_ask_batch_returns_deltas_in_order(self):
+        runner = FakeRunner()
+        chats = [Chat(runner=runner).user(f"Hello {i}") for i in range(3)]
+
+        deltas = Chat.ask_batch(chats)
+
+        self.assertEqual([delta[0].content for delta in deltas], ["reply from llm"] * 3)
+        self.assertTrue(all(len(chat) == 1 for chat in chats))
+
+        agent = load_agent("Planner", runner=runner)
+        deltas = agent.ask_batch(["one", "two"])
+        self.assertEqual([delta[0].content for delta in deltas], ["reply from Planner"] * 2)
+        self.assertEqual(len(agent.current_chat), 1)
+
+    def test_stream_yields_text_and_tool_events_then_delta(self):
+        chat = Chat(runner=FakeRunner()).user("Hello")
+
+        stream = chat.stream()
+        items = list(stream)
+
+        self.assertIsInstance(items[0], Message)
+        self.assertEqual(items[0].role, "function_call")
+        self.assertEqual(items[1:], ["reply ", "from llm", "unstreamed"])
+        self.assertEqual(stream.delta[0].content, "reply from llm")
+        self.assertEqual(len(chat), 1)
+
+        agent = load_agent("Planner", runner=FakeRunner())
+        self.assertEqual(agent.stream().text(), "reply from Plannerunstreamed")
+
+    def test_delta_compares_messages_in_place(self):
+        chat = Chat(runner=FakeRunner()).user("Hello").message("user", "Bye", name="x")
+
+        delta = chat._delta_from_updated_messages(
+            [{"role": "user", "content": "Hello"}, {"role": "user", "content": "Bye", "name": "y"}]
+        )
+        self.assertEqual(len(delta), 1)
+
+        delta = chat._delta_from_updated_messages(chat.to_dicts() + [{"role": "assistant"}])
+        self.assertEqual(delta.to_dicts(), [{"role": "assistant", "content": ""}])
+
+    def test_ask_uses_runner_delta_when_available(self):
+        class DeltaRunner(FakeRunner):
+            def ask_delta(self, messages, agent_name=None):
+                return len(messages), [{"role": "assistant", "content": "only new"}]
+
+        chat = Chat(runner=DeltaRunner()).user("Hello")
+
+        self.assertEqual(chat.chat().content, "only new")
+        self.assertEqual(len(chat), 2)
+
+    def test_branch_shares_prefix_and_copies_on_write(self):
+        chat = Chat(runner=FakeRunner()).system("big prompt").user("Hello")
+
+        branch = chat.branch()
+        self.assertIs(chat.branch().messages._prefix, branch.messages._prefix)
+        self.assertEqual(len(branch.messages._tail), 0)
+
+        branch.user("Only in branch")
+        chat.assistant("Only in chat")
+        self.assertEqual([m.content for m in branch], ["big prompt", "Hello", "Only in branch"])
+        self.assertEqual([m.content for m in chat], ["big prompt", "Hello", "Only in chat"])
+
+        branch.messages[0] = Message("system", "replaced")
+        del branch.messages[1]
+        self.assertEqual([m.content for m in branch], ["replaced", "Only in branch"])
+        self.assertEqual(chat[0].content, "big prompt")
+        self.assertEqual(chat[-1].content, "Only in chat")
+        self.assertEqual([m.content for m in reversed(chat.messages)], ["Only in chat", "Hello", "big prompt"])
+
+    def test_branched_messages_are_edited_in_place_independently(self):
+        chat = Chat(runner=FakeRunner()).system("big prompt").user("Hello")
+        branch = chat.branch()
+
+        branch[1].content = "mutated"
+        branch.messages[0].extra["cache"] = True
+        self.assertEqual([m.content for m in branch], ["big prompt", "mutated"])
+        self.assertEqual(chat.to_dicts(), [{"role": "system", "content": "big prompt"}, {"role": "user", "content": "Hello"}])
+
+        chat[0].content = "changed in chat"
+        self.assertEqual(branch[0].content, "big prompt")
+
+        copy = chat.copy()
+        copy[1].content = "changed in copy"
+        self.assertEqual(chat[1].content, "Hello")
+        self.assertIsNot(copy.messages[0], chat.messages[0])
+
+
+class ChatAgentAsyncTest(unittest.IsolatedAsyncioTestCase):
+    async def test_chat_async_runs_conversations_concurrently(self):
+        runner = FakeRunner()
+        chats = [Chat(runner=runner).user(f"Hello {i}") for i in range(3)]
+
+        messages = await asyncio.gather(*[chat.chat_async() for chat in chats])
+
+        self.assertEqual([str(message) for message in messages], ["reply from llm"] * 3)
+        self.assertTrue(all(len(chat) == 3 for chat in chats))
+
+    async def test_agent_ask_async_does_not_mutate_current_chat(self):
+        agent = load_agent("Planner", runner=FakeRunner())
+        agent.user("Summarize this")
+
+        delta = await agent.ask_async()
+        self.assertEqual(delta[0].content, "reply from Planner")
+        self.assertEqual(len(agent.current_chat), 2)
+
+        message = await agent.chat_async()
+        self.assertEqual(message.content, "reply from Planner")
+        self.assertEqual(len(agent.current_chat), 4)
+
 
 if __name__ == "__main__":
     unittest.main()
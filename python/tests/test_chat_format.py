@@ -0,0 +1,76 @@
+import json
+import unittest
+from pathlib import Path
+
+from scout_ai import chat_format
+
+# Golden files shared with the Ruby suite (test/scout/llm/chat/test_parse.rb):
+# parse/NAME.chat is parsed into parse/NAME.json, print/NAME.json is printed
+# into print/NAME.chat. The expected files are Ruby's output.
+CORPUS = Path(__file__).resolve().parents[2] / "test" / "fixtures" / "chat_format"
+
+
+def read(path):
+    return path.read_bytes().decode("utf-8")
+
+
+class ChatFormatCorpusTest(unittest.TestCase):
+    def test_corpus_is_present(self):
+        self.assertTrue(list((CORPUS / "parse").glob("*.chat")))
+        self.assertTrue(list((CORPUS / "print").glob("*.json")))
+
+    def test_parse_matches_ruby(self):
+        for source in sorted((CORPUS / "parse").glob("*.chat")):
+            with self.subTest(source.name):
+                expected = json.loads(read(source.with_suffix(".json")))
+                self.assertEqual(chat_format.parse(read(source)), expected)
+
+    def test_print_matches_ruby(self):
+        for source in sorted((CORPUS / "print").glob("*.json")):
+            with self.subTest(source.name):
+                messages = json.loads(read(source))
+                self.assertEqual(chat_format.render(messages), read(source.with_suffix(".chat")))
+
+    def test_print_parse_round_trip(self):
+        messages = json.loads(read(CORPUS / "print" / "conversation.json"))
+        parsed = chat_format.process(chat_format.parse(chat_format.render(messages)))
+        self.assertEqual(parsed, messages)
+
+
+class ChatFormatProcessTest(unittest.TestCase):
+    def test_clear_drops_history_and_cleans_roles(self):
+        messages = [
+            {"role": "system", "content": "old system"},
+            {"role": "user", "content": "old question"},
+            {"role": "clear", "content": "true"},
+            {"role": "system", "content": "new system"},
+            {"role": "user", "content": "New question"},
+            {"role": "skip", "content": ""},
+            {"role": "clean_role", "content": "skip"},
+        ]
+
+        processed = chat_format.process(messages)
+
+        self.assertEqual(
+            processed,
+            [{"role": "system", "content": "new system"}, {"role": "user", "content": "New question"}],
+        )
+
+    def test_clear_tools_drops_earlier_tool_calls(self):
+        messages = [
+            {"role": "function_call", "content": "{}"},
+            {"role": "function_call_output", "content": "{}"},
+            {"role": "clear_tools", "content": "true"},
+            {"role": "function_call", "content": "{}"},
+        ]
+
+        self.assertEqual([m["role"] for m in chat_format.clear(messages)], ["function_call"])
+
+    def test_needs_ruby(self):
+        self.assertFalse(chat_format.needs_ruby(chat_format.parse("user: hello")))
+        self.assertTrue(chat_format.needs_ruby(chat_format.parse("import: other.chat\nuser: hello")))
+        self.assertTrue(chat_format.needs_ruby([{"role": "file", "content": "README.md"}]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import importlib.util
+import os
+import pickle
+import tempfile
+import unittest
+
+HAS_DEPS = all(importlib.util.find_spec(name) for name in ("torch", "pandas", "scout"))
+
+
+@unittest.skipUnless(HAS_DEPS, "torch, pandas or scout not installed")
+class TSVDatasetTest(unittest.TestCase):
+    def setUp(self):
+        import pandas as pd
+
+        from scout_ai.data import TSVDataset
+
+        frame = pd.DataFrame(
+            {"a": [1.0, 2.0, 3.0], "b": [4, 5, 6], "label": [0, 1, 0]},
+            index=["x", "y", "z"],
+        )
+        self.dataset = TSVDataset(frame)
+
+    def test_typed_columns(self):
+        import torch
+
+        self.assertEqual(self.dataset.features.dtype, torch.float32)
+        self.assertEqual(self.dataset.labels.dtype, torch.int64)
+        self.assertEqual(tuple(self.dataset.features.shape), (3, 2))
+
+        import pandas as pd
+
+        from scout_ai.data import TSVDataset
+
+        dataset = TSVDataset(pd.DataFrame({"a": [1, 2], "b": [3, 4], "label": [0.5, 1.5]}, index=["x", "y"]))
+        self.assertEqual(dataset.features.dtype, torch.float32)
+        self.assertEqual(dataset.labels.dtype, torch.float32)
+
+    def test_item_by_position_and_key(self):
+        features, label = self.dataset[1]
+        self.assertEqual(features.tolist(), [2.0, 5.0])
+        self.assertEqual(int(label), 1)
+
+        features, label = self.dataset["z"]
+        self.assertEqual(features.tolist(), [3.0, 6.0])
+        self.assertEqual(int(label), 0)
+
+    def test_batches(self):
+        features, labels = self.dataset[["z", 0]]
+        self.assertEqual(features.tolist(), [[3.0, 6.0], [1.0, 4.0]])
+        self.assertEqual(labels.tolist(), [0, 0])
+
+        import torch
+
+        loader = torch.utils.data.DataLoader(self.dataset, batch_size=2)
+        features, labels = next(iter(loader))
+        self.assertEqual(features.tolist(), [[1.0, 4.0], [2.0, 5.0]])
+        self.assertEqual(labels.tolist(), [0, 1])
+
+
+@unittest.skipUnless(HAS_DEPS, "torch, pandas or scout not installed")
+class MemmapTSVDatasetTest(unittest.TestCase):
+    def test_convert_and_read(self):
+        from scout_ai.data import MemmapTSVDataset, memmap_dataset
+
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "table.tsv")
+            with open(filename, "w") as handle:
+                handle.write("#: :type=:list\n#Id\ta\tb\tclass\nx\t1\t0.5\tcat\ny\t2\t\tdog\nz\t3\t1.5\tcat\n")
+
+            dataset = memmap_dataset(filename, os.path.join(dir, "table"))
+            self.assertEqual(len(dataset), 3)
+            self.assertEqual(dataset.header["categories"], {"class": ["cat", "dog"]})
+
+            features, label = dataset["z"]
+            self.assertEqual(features.tolist(), [3.0, 1.5])
+            self.assertEqual(int(label), 0)
+
+            features, labels = dataset[[1, "x"]]
+            self.assertEqual(labels.tolist(), [1, 0])
+            self.assertEqual(features[1].tolist(), [1.0, 0.5])
+
+            # Workers get the path, not the mapped arrays
+            copy = pickle.loads(pickle.dumps(dataset))
+            self.assertIsInstance(copy, MemmapTSVDataset)
+            self.assertIsNone(copy._features)
+            self.assertEqual(int(copy[1][1]), 1)
+
+    def test_column_turning_into_text(self):
+        from scout_ai.data import memmap_dataset
+
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "table.tsv")
+            with open(filename, "w") as handle:
+                handle.write("#Id\ta\tclass\nx\t1\t1\ny\t2\tx\nz\t3\t1\n")
+
+            dataset = memmap_dataset(filename, os.path.join(dir, "table"))
+            self.assertEqual(dataset.header["kinds"], ["int", "str"])
+            self.assertEqual(dataset.header["categories"], {"class": ["1", "x"]})
+            self.assertEqual(dataset[[0, 1, 2]][1].tolist(), [0, 1, 0])
+
+
+@unittest.skipUnless(HAS_DEPS, "torch, pandas or scout not installed")
+class StreamTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.tsv = os.path.join(self.dir.name, "table.tsv")
+        with open(self.tsv, "w") as handle:
+            handle.write("#Id\ta\tb\tclass\n")
+            for i in range(25):
+                handle.write(f"r{i}\t{i}\t{i / 2}\t{i % 3}\n")
+
+    def test_tsv_stream(self):
+        from scout_ai.data import TSVStream
+
+        samples = list(TSVStream(self.tsv, chunk_size=4))
+        self.assertEqual([int(label) for _, label in samples[:4]], [0, 1, 2, 0])
+        self.assertEqual(samples[3][0].tolist(), [3.0, 1.5])
+
+        shuffled = [int(features[0]) for features, _ in TSVStream(self.tsv, shuffle_buffer=5, seed=1)]
+        self.assertNotEqual(shuffled, list(range(25)))
+        self.assertEqual(sorted(shuffled), list(range(25)))
+
+    def test_label_type_is_fixed_by_the_first_rows(self):
+        import numpy as np
+        import torch
+
+        from scout_ai.data import TSVStream
+
+        with open(self.tsv, "a") as handle:
+            handle.write("r25\t25\t12.5\t2.5\n")
+
+        with self.assertRaises(ValueError):
+            list(TSVStream(self.tsv, chunk_size=4))
+
+        labels = [label for _, label in TSVStream(self.tsv, chunk_size=4, label_dtype=np.float32)]
+        self.assertTrue(all(label.dtype == torch.float32 for label in labels))
+        self.assertEqual(float(labels[-1]), 2.5)
+
+        filename = os.path.join(self.dir.name, "floats.tsv")
+        with open(filename, "w") as handle:
+            handle.write("#Id\ta\tscore\n")
+            for i in range(8):
+                handle.write(f"r{i}\t{i}\t{i if i > 3 else i + 0.5}\n")
+
+        labels = [label for _, label in TSVStream(filename, chunk_size=4)]
+        self.assertTrue(all(label.dtype == torch.float32 for label in labels))
+
+    def test_workers_split_the_stream(self):
+        from scout_ai.data import tsv_loader
+
+        loader = tsv_loader(self.tsv, stream=True, batch_size=4, shuffle=False, num_workers=2)
+        seen = sorted(int(value) for features, _ in loader for value in features[:, 0])
+        self.assertEqual(seen, list(range(25)))
+
+    def test_jsonl_stream(self):
+        from scout_ai.data import JSONLStream
+
+        filename = os.path.join(self.dir.name, "records.jsonl")
+        with open(filename, "w") as handle:
+            handle.write('{"text": "a"}\n\n{"text": "b"}\n')
+
+        self.assertEqual(list(JSONLStream(filename)), [{"text": "a"}, {"text": "b"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
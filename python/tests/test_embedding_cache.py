@@ -0,0 +1,74 @@
+import hashlib
+import importlib.util
+import tempfile
+import unittest
+
+from scout_ai.embedding_cache import EmbeddingCache, model_key, text_key
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy not installed")
+class EmbeddingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = self.dir.name + "/model"
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_only_missing_texts_are_embedded(self):
+        cache = EmbeddingCache(self.path)
+        calls = []
+
+        def embed(texts):
+            calls.append(texts)
+            return [[float(len(text)), 1.0] for text in texts]
+
+        first = cache.embed(["a", "bb", "a"], embed)
+        second = cache.embed(["bb", "ccc"], embed)
+
+        self.assertEqual(calls, [["a", "bb"], ["ccc"]])
+        self.assertEqual(first.tolist(), [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]])
+        self.assertEqual(second.tolist(), [[2.0, 1.0], [3.0, 1.0]])
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_other_instances_see_new_rows(self):
+        writer = EmbeddingCache(self.path)
+        reader = EmbeddingCache(self.path)
+        self.assertEqual(reader.get(["a"]), [None])
+
+        writer.put(["a"], [[0.5, 0.25]])
+        self.assertEqual(reader.get(["a"])[0].tolist(), [0.5, 0.25])
+
+    def test_oldest_rows_are_evicted(self):
+        cache = EmbeddingCache(self.path, max_bytes=64)
+        for i in range(10):
+            cache.put([f"text {i}"], [[float(i), 0.0]])
+
+        # Compacted to 6 rows on the 9th put, then one more
+        self.assertEqual(len(cache), 7)
+        self.assertIsNone(cache.get(["text 0"])[0])
+        self.assertEqual(cache.get(["text 9"])[0].tolist(), [9.0, 0.0])
+        self.assertEqual(len(EmbeddingCache(self.path)), 7)
+
+    def test_dimension_is_checked(self):
+        cache = EmbeddingCache(self.path)
+        cache.put(["a"], [[1.0, 2.0]])
+        with self.assertRaises(ValueError):
+            cache.put(["b"], [[1.0, 2.0, 3.0]])
+
+
+class EmbeddingCacheKeyTest(unittest.TestCase):
+    def test_keys_match_ruby(self):
+        # Digest::SHA256.hexdigest("hello") and LLM::EmbeddingCache.model_key
+        self.assertEqual(text_key("hello"), "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824")
+        self.assertEqual(model_key("BAAI/bge-small-en", "cls", False), "BAAI_bge-small-en-cls-raw")
+        # LLM::EmbeddingCache.model_key('m', nil, true, source: 'ollama http://localhost:11434', max_length: 128)
+        self.assertEqual(
+            model_key("m", source="ollama http://localhost:11434", max_length=128),
+            "m-max128-" + hashlib.sha256(b"ollama http://localhost:11434").hexdigest()[:12],
+        )
+        self.assertNotEqual(model_key("m", source="openai"), model_key("m", source="ollama"))
+
+
+if __name__ == "__main__":
+    unittest.main()
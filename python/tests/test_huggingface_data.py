@@ -0,0 +1,65 @@
+import importlib.util
+import unittest
+
+HAS_DEPS = all(importlib.util.find_spec(name) for name in ("torch", "datasets", "pandas", "scout"))
+
+
+class FakeTokenizer:
+    pad_token_id = None
+    eos_token_id = 0
+    padding_side = "right"
+
+
+@unittest.skipUnless(HAS_DEPS, "torch, datasets, pandas or scout not installed")
+class PaddingCollatorTest(unittest.TestCase):
+    def test_pads_to_longest_in_batch(self):
+        from scout_ai.huggingface.data import PaddingCollator
+
+        collator = PaddingCollator(FakeTokenizer(), causal_lm=True)
+        batch = collator([
+            {"input_ids": [5, 6, 0], "attention_mask": [1, 1, 1], "text": "a"},
+            {"input_ids": [7], "attention_mask": [1], "text": "b"},
+        ])
+
+        self.assertEqual(batch["input_ids"].tolist(), [[5, 6, 0], [7, 0, 0]])
+        self.assertEqual(batch["attention_mask"].tolist(), [[1, 1, 1], [1, 0, 0]])
+        # The eos token used as padding is masked only where it pads
+        self.assertEqual(batch["labels"].tolist(), [[5, 6, 0], [7, -100, -100]])
+        self.assertNotIn("text", batch)
+
+    def test_multiple_left_padding_and_class_labels(self):
+        from scout_ai.huggingface.data import PaddingCollator
+
+        tokenizer = FakeTokenizer()
+        tokenizer.pad_token_id, tokenizer.padding_side = 1, "left"
+        batch = PaddingCollator(tokenizer, pad_to_multiple_of=4)([
+            {"input_ids": [5, 6], "label": 1},
+            {"input_ids": [7], "label": 0},
+        ])
+
+        self.assertEqual(batch["input_ids"].tolist(), [[1, 1, 5, 6], [1, 1, 1, 7]])
+        self.assertEqual(batch["label"].tolist(), [1, 0])
+        self.assertNotIn("labels", batch)
+
+
+@unittest.skipUnless(HAS_DEPS, "torch, datasets, pandas or scout not installed")
+class LengthGroupedSamplerTest(unittest.TestCase):
+    def test_batches_have_similar_lengths(self):
+        from scout_ai.huggingface.data import LengthGroupedSampler
+
+        lengths = [3, 50, 1, 7, 20, 4, 9, 2] * 10
+        sampler = LengthGroupedSampler(lengths, batch_size=4, mega_batch_mult=5)
+        indices = list(sampler)
+
+        self.assertEqual(sorted(indices), list(range(len(lengths))))
+        self.assertEqual(lengths[indices[0]], 50)
+        for start in range(0, len(indices), 4):
+            batch = [lengths[i] for i in indices[start : start + 4]]
+            self.assertEqual(batch, sorted(batch, reverse=True))
+
+        sampler.set_epoch(1)
+        self.assertNotEqual(list(sampler), indices)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,16 @@
+import importlib.util
 import unittest
 
-from scout_ai.huggingface.eval import parse_causal_lm_response
+from scout_ai.huggingface.eval import (
+    TIMINGS,
+    ToolCallTextFilter,
+    classify_logits,
+    configure_inference,
+    eval_causal_lm_responses,
+    eval_model,
+    parse_causal_lm_response,
+    stream_causal_lm_response,
+)
 
 
 class DummyTokenizer:
@@ -25,6 +35,147 @@ class ParserTokenizer:
         }
 
 
+class Ids:
+    """Minimal 2D tensor stand-in: rows of token ids."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.shape = (len(rows), len(rows[0]) if rows else 0)
+
+    def __getitem__(self, index):
+        rows, columns = index
+        return Ids([row[columns] for row in self.rows[rows]])
+
+    def to(self, device):
+        return self
+
+
+class BatchTokenizer:
+    """Words are token ids; 0 is padding and 1 the end of sequence."""
+
+    padding_side = "right"
+    pad_token = None
+    eos_token = "<eos>"
+    eos_token_id = 1
+
+    @property
+    def pad_token_id(self):
+        return None if self.pad_token is None else 0
+
+    def apply_chat_template(self, messages, add_generation_prompt=True, tokenize=True, return_dict=True, **kwargs):
+        return {"input_ids": [int(token) for m in messages for token in m["content"].split()]}
+
+    def pad(self, encoded, padding=True, return_tensors=None):
+        self.padded_side = self.padding_side
+        rows = encoded["input_ids"]
+        width = max(len(row) for row in rows)
+        return {"input_ids": Ids([[0] * (width - len(row)) + row for row in rows])}
+
+    def batch_decode(self, ids, skip_special_tokens=True):
+        return [" ".join(str(token) for token in row if token > 1) for row in ids.rows]
+
+
+class EchoModel:
+    device = "cpu"
+
+    def eval(self):
+        pass
+
+    def generate(self, input_ids, pad_token_id=None, **kwargs):
+        self.calls = getattr(self, "calls", 0) + 1
+        self.pad_token_id = pad_token_id
+        # Answer with the last prompt token plus one, then end the sequence
+        return Ids([row + [row[-1] + 1, 1] for row in input_ids.rows])
+
+
+class ClassifierTokenizer:
+    """Words are token ids; pads chunks on the right with 0."""
+
+    def __call__(self, texts, truncation=True):
+        return {"input_ids": [[int(word) for word in text.split()] for text in texts]}
+
+    def pad(self, encoded, return_tensors=None):
+        import numpy as np
+
+        rows = encoded["input_ids"]
+        width = max(len(row) for row in rows)
+        return {"input_ids": np.array([row + [0] * (width - len(row)) for row in rows])}
+
+
+class Logits:
+    def __init__(self, values):
+        self.values = values
+
+    def float(self):
+        return self
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class CountingClassifier:
+    """Two logits per text: its number of tokens and its first token."""
+
+    device = "cpu"
+
+    def __init__(self):
+        self.widths = []
+
+    def eval(self):
+        pass
+
+    def __call__(self, input_ids):
+        import numpy as np
+
+        self.widths.append(input_ids.shape[1])
+        lengths = (input_ids > 0).sum(axis=1)
+        return {"logits": Logits(np.stack([lengths, input_ids[:, 0]], axis=1).astype(np.float32))}
+
+
+class WordTokenizer:
+    def apply_chat_template(self, messages, **kwargs):
+        import torch
+
+        return {"input_ids": torch.tensor([[2, 3]])}
+
+    def decode(self, ids, skip_special_tokens=True, **kwargs):
+        return "".join("word " for _ in ids)
+
+
+class EndlessModel:
+    """Streams one word per step until the stopping criteria end generation."""
+
+    def __init__(self):
+        import threading
+
+        import torch
+
+        self.device = torch.device("cpu")
+        self.steps = 0
+        self.finished = threading.Event()
+
+    def eval(self):
+        pass
+
+    def generate(self, input_ids, streamer=None, stopping_criteria=None, **kwargs):
+        import time
+
+        import torch
+
+        streamer.put(input_ids)
+        for step in range(10000):
+            self.steps = step + 1
+            streamer.put(torch.tensor([4]))
+            if stopping_criteria(input_ids, None).all():
+                break
+            time.sleep(0.001)
+        streamer.end()
+        self.finished.set()
+
+
 class HuggingfaceEvalTest(unittest.TestCase):
     def test_parse_xml_tool_call_blocks(self):
         tokenizer = DummyTokenizer()
@@ -53,6 +204,102 @@ class HuggingfaceEvalTest(unittest.TestCase):
 
         self.assertEqual(parsed, {"role": "assistant", "content": text})
 
+    def test_batched_responses_are_left_padded_and_generated_together(self):
+        tokenizer = BatchTokenizer()
+        model = EchoModel()
+        conversations = [
+            [{"role": "user", "content": "5"}],
+            [{"role": "user", "content": "7 8 9"}],
+            [{"role": "user", "content": "2 3"}],
+        ]
+
+        responses = eval_causal_lm_responses(model, tokenizer, conversations)
+
+        self.assertEqual([r["content"] for r in responses], ["6", "10", "4"])
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(model.pad_token_id, 1)
+        self.assertEqual(tokenizer.padded_side, "left")
+        self.assertEqual(tokenizer.padding_side, "right")
+        self.assertIsNone(tokenizer.pad_token)
+
+        model = EchoModel()
+        responses = eval_causal_lm_responses(model, tokenizer, conversations, batch_size=2)
+        self.assertEqual([r["content"] for r in responses], ["6", "10", "4"])
+        self.assertEqual(model.calls, 2)
+
+    def test_generation_is_timed(self):
+        TIMINGS.clear()
+        eval_causal_lm_responses(EchoModel(), BatchTokenizer(), [[{"role": "user", "content": "5"}]] * 3, batch_size=2)
+
+        timings = TIMINGS.stats()["generate_batch"]
+        self.assertEqual(timings["calls"], 2)
+        self.assertGreaterEqual(timings["total"], timings["last"])
+
+    def test_configure_inference_rejects_unknown_options(self):
+        with self.assertRaises(TypeError):
+            configure_inference(threads=4)
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy not installed")
+    def test_classify_logits(self):
+        logits = [[0.0, 2.0, 1.0], [3.0, 1.0, 0.0]]
+
+        result = classify_logits(logits, top_k=2, return_probabilities=True)
+
+        self.assertEqual(result["predictions"], [1, 0])
+        self.assertEqual(result["top_k"], [[1, 2], [0, 1]])
+        self.assertAlmostEqual(result["scores"][0], result["top_k_scores"][0][0])
+        self.assertAlmostEqual(sum(result["probabilities"][1]), 1.0, places=5)
+        self.assertNotIn("top_k", classify_logits(logits))
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy not installed")
+    def test_eval_model_runs_length_sorted_chunks(self):
+        texts = ["5 5 5 5", "7", "3 3 3", "9 9", "2"]
+        model = CountingClassifier()
+
+        logits = eval_model(model, ClassifierTokenizer(), texts, batch_size=2)
+
+        # Chunks of the sorted lengths 1 1 | 2 3 | 4, each padded to its longest
+        self.assertEqual(model.widths, [1, 3, 4])
+        self.assertEqual(logits.shape, (5, 2))
+        self.assertEqual(logits.tolist(), [[4, 5], [1, 7], [3, 3], [2, 9], [1, 2]])
+
+        model = CountingClassifier()
+        self.assertEqual(eval_model(model, ClassifierTokenizer(), texts).tolist(), logits.tolist())
+        self.assertEqual(model.widths, [4])
+
+    @unittest.skipUnless(
+        importlib.util.find_spec("torch") and importlib.util.find_spec("transformers"),
+        "torch or transformers not installed",
+    )
+    def test_stream_stops_generating_when_abandoned(self):
+        model = EndlessModel()
+        events = stream_causal_lm_response(model, WordTokenizer(), [{"role": "user", "content": "Hi"}])
+
+        self.assertEqual(next(events)["type"], "delta")
+        events.close()
+
+        self.assertTrue(model.finished.wait(5))
+        self.assertLess(model.steps, 10000)
+
+    def test_tool_call_text_filter(self):
+        text = 'Let me check. <tool_call>{"name": "multiply", "arguments": {"a": 3, "b": 4}}</tool_call> Done <'
+        text_filter = ToolCallTextFilter()
+
+        visible = []
+        tool_calls_seen = []
+        for index in range(0, len(text), 3):
+            visible.append(text_filter.feed(text[index:index + 3]))
+            tool_calls_seen.append(len(text_filter.tool_calls))
+        visible.append(text_filter.flush())
+
+        self.assertEqual("".join(visible), "Let me check.  Done <")
+        self.assertTrue(all("<tool" not in chunk for chunk in visible))
+        self.assertEqual(text_filter.tool_calls[0]["function"]["arguments"], {"a": 3, "b": 4})
+        # The call is reported as soon as its block closes, before the text ends
+        self.assertEqual(tool_calls_seen[-1], 1)
+        self.assertEqual(tool_calls_seen.index(1), (text.index("</tool_call>") + len("</tool_call>") - 1) // 3)
+        self.assertEqual(text_filter.tool_calls, parse_causal_lm_response(DummyTokenizer(), text)["tool_calls"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,34 @@
+import importlib.util
+import unittest
+
+HAS_DEPS = all(importlib.util.find_spec(name) for name in ("torch", "transformers", "datasets"))
+
+
+@unittest.skipUnless(HAS_DEPS, "torch, transformers or datasets not installed")
+class PackTextsTest(unittest.TestCase):
+    def test_blocks_with_eos_separators(self):
+        from scout_ai.huggingface.train.next_token import pack_texts
+
+        packed = pack_texts({"input_ids": [[5, 6], [7, 0], [8, 9, 10]]}, 3, 0, position_ids=True)
+
+        # Texts already ending in eos do not get a second one
+        self.assertEqual(packed["input_ids"], [[5, 6, 0], [7, 0, 8], [9, 10, 0]])
+        self.assertEqual(packed["attention_mask"], [[1, 1, 1]] * 3)
+        self.assertEqual(packed["position_ids"], [[0, 1, 2], [0, 1, 0], [1, 2, 3]])
+
+    def test_short_remainder_is_kept(self):
+        from scout_ai.huggingface.train.next_token import pack_texts
+
+        packed = pack_texts({"input_ids": [[1, 2, 3, 4]]}, 4, 0)
+        self.assertEqual(packed["input_ids"], [[1, 2, 3, 4], [0]])
+        self.assertNotIn("position_ids", packed)
+
+    def test_group_texts(self):
+        from scout_ai.huggingface.train.next_token import group_texts
+
+        grouped = group_texts({"input_ids": [[1, 2], [3, 4, 5]]}, 2)
+        self.assertEqual(grouped["input_ids"], [[1, 2], [3, 4]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+from types import SimpleNamespace
+
+from scout_ai.huggingface.prefix_cache import PrefixCache, generate_with_prefix_cache, prefix_cache_for
+
+
+class Tensor:
+    def __init__(self, length):
+        self.length = length
+
+    def numel(self):
+        return self.length
+
+    def element_size(self):
+        return 4
+
+
+class Layer:
+    def __init__(self, length):
+        self.keys = Tensor(length)
+        self.values = Tensor(length)
+
+
+class FakeCache:
+    """One layer whose keys and values take 4 bytes per position."""
+
+    def __init__(self, length):
+        self.layers = [Layer(length)]
+
+    def get_seq_length(self):
+        return self.layers[0].keys.length
+
+    def crop(self, length):
+        self.layers = [Layer(length)]
+
+
+class PrefixCacheTest(unittest.TestCase):
+    def test_longest_prefix_is_reused_and_cropped(self):
+        cache = PrefixCache(min_length=2)
+        cache.store(list(range(10)), FakeCache(10))
+
+        length, past = cache.lookup(list(range(6)) + [99, 100])
+        self.assertEqual(6, length)
+        self.assertEqual(6, past.get_seq_length())
+
+        # The stored entry is untouched by the crop of the copy
+        length, past = cache.lookup(list(range(12)))
+        self.assertEqual(10, length)
+
+    def test_one_token_is_always_left_to_prefill(self):
+        cache = PrefixCache(min_length=2)
+        cache.store(list(range(10)), FakeCache(10))
+
+        length, past = cache.lookup(list(range(10)))
+        self.assertEqual(9, length)
+        self.assertEqual(9, past.get_seq_length())
+
+    def test_misses_and_stats(self):
+        cache = PrefixCache(min_length=4)
+        cache.store([1, 2, 3, 4, 5], FakeCache(5))
+
+        self.assertEqual((0, None), cache.lookup([1, 2, 9, 9, 9]))
+        cache.lookup([1, 2, 3, 4, 5, 6])
+
+        stats = cache.stats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(1, stats["misses"])
+        self.assertEqual(0.5, stats["hit_rate"])
+        self.assertEqual(5, stats["reused_tokens"])
+        self.assertEqual(40, stats["bytes"])
+
+    def test_extending_entry_replaces_its_prefix(self):
+        cache = PrefixCache(min_length=2)
+        cache.store([1, 2, 3], FakeCache(3))
+        cache.store([1, 2, 3, 4, 5], FakeCache(5))
+
+        self.assertEqual(1, len(cache))
+        self.assertEqual(40, cache.stats()["bytes"])
+
+    def test_least_recently_used_is_evicted(self):
+        cache = PrefixCache(max_bytes=100, min_length=2)
+        cache.store([1, 1, 1, 1, 1], FakeCache(5))
+        cache.store([2, 2, 2, 2, 2], FakeCache(5))
+        cache.lookup([1, 1, 1, 1, 1, 1])
+        cache.store([3, 3, 3, 3, 3], FakeCache(5))
+
+        self.assertEqual(1, cache.stats()["evictions"])
+        self.assertEqual((0, None), cache.lookup([2, 2, 2, 2, 2, 2]))
+        self.assertEqual(5, cache.lookup([1, 1, 1, 1, 1, 1])[0])
+
+    def test_shared_cache_per_model(self):
+        class Model:
+            pass
+
+        model = Model()
+        self.assertIs(prefix_cache_for(model), prefix_cache_for(model, True))
+        self.assertIsNot(prefix_cache_for(model), prefix_cache_for(Model()))
+        self.assertIsNone(prefix_cache_for(model, None))
+
+
+class Rows(list):
+    def tolist(self):
+        return list(self)
+
+
+class GenerateModel:
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, input_ids, **kwargs):
+        self.calls.append(kwargs)
+        sequence = Rows(input_ids[0] + [99])
+        return SimpleNamespace(sequences=[sequence], past_key_values=FakeCache(len(sequence)))
+
+
+class GenerateWithPrefixCacheTest(unittest.TestCase):
+    def test_caller_generation_kwargs_are_merged(self):
+        model = GenerateModel()
+        cache = PrefixCache(min_length=2)
+        prompt = {"input_ids": [Rows(range(5))]}
+
+        sequences = generate_with_prefix_cache(model, prompt, {"use_cache": True, "max_new_tokens": 1}, cache)
+        generate_with_prefix_cache(model, prompt, {"return_dict_in_generate": False}, cache)
+
+        self.assertEqual(sequences[0].tolist(), [0, 1, 2, 3, 4, 99])
+        self.assertEqual(model.calls[0], {"use_cache": True, "max_new_tokens": 1, "return_dict_in_generate": True})
+        self.assertTrue(model.calls[1]["return_dict_in_generate"])
+        self.assertEqual(model.calls[1]["past_key_values"].get_seq_length(), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,282 @@
+import importlib.util
+import json
+import threading
+import unittest
+import urllib.request
+from concurrent.futures import Future
+
+from scout_ai.huggingface.serve import (
+    ContinuousBatcher,
+    GenerationResult,
+    TextStream,
+    chat_completion_messages,
+    make_server,
+    responses_messages,
+)
+
+
+class ByteTokenizer:
+    def decode(self, ids, skip_special_tokens=True):
+        return bytes(ids).decode("utf-8", errors="replace")
+
+
+class FakeBatcher:
+    """Answers every request with a tool call when tools are offered, else echoes."""
+
+    def __init__(self):
+        self.requests = []
+
+    def submit(self, messages, tools=None, generation_kwargs=None, response_parser=None):
+        self.requests.append((messages, tools, generation_kwargs))
+        if tools:
+            message = {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [{"id": "call_1", "type": "function", "function": {"name": "multiply", "arguments": {"a": 3, "b": 4}}}],
+            }
+        else:
+            message = {"role": "assistant", "content": "Echo " + messages[-1]["content"]}
+        future = Future()
+        future.set_result(GenerationResult([1, 2, 3], message["content"], message, 5, "stop"))
+        return future
+
+    def stream(self, messages, tools=None, generation_kwargs=None, response_parser=None):
+        future = self.submit(messages, tools, generation_kwargs, response_parser)
+        stream = TextStream(ByteTokenizer())
+        for token_id in future.result().text.encode("utf-8"):
+            stream.put(token_id)
+        stream.finish(future)
+        return stream
+
+
+class SumTokenizer:
+    eos_token_id = 1
+    pad_token_id = 0
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(str(token) for token in ids)
+
+
+class SumModel:
+    """Next token: 1 + the sum of every token seen so far modulo 5, where 1 is eos.
+
+    The tokens are kept in the KV cache, so the answer is only right when the
+    batcher keeps the cache rows and attention mask of each sequence aligned.
+    """
+
+    def __init__(self):
+        import torch
+
+        self.device = torch.device("cpu")
+        self.batch_sizes = []
+
+    def __call__(self, input_ids, attention_mask, position_ids=None, past_key_values=None, use_cache=True):
+        from types import SimpleNamespace
+
+        import torch
+
+        self.batch_sizes.append(input_ids.shape[0])
+        tokens = input_ids.float().unsqueeze(-1)
+        if past_key_values is not None:
+            tokens = torch.cat([past_key_values[0][0], tokens], dim=1)
+        totals = (tokens[..., 0] * attention_mask).sum(-1).long()
+
+        logits = torch.zeros(input_ids.shape[0], input_ids.shape[1], 8)
+        logits[torch.arange(input_ids.shape[0]), -1, totals % 5 + 1] = 1.0
+        return SimpleNamespace(logits=logits, past_key_values=((tokens, tokens),))
+
+
+@unittest.skipUnless(importlib.util.find_spec("torch"), "torch not installed")
+class ContinuousBatcherTest(unittest.TestCase):
+    def batcher(self):
+        batcher = ContinuousBatcher(SumModel(), SumTokenizer(), max_batch_size=4)
+        # Driven step by step instead of by the background thread
+        batcher.start = lambda: None
+        return batcher
+
+    def run_alone(self, prompt_ids, max_new_tokens):
+        batcher = self.batcher()
+        future = batcher.submit_ids(prompt_ids, {"max_new_tokens": max_new_tokens})
+        while not future.done():
+            batcher._step(timeout=0)
+        return future.result()
+
+    def test_requests_join_and_leave_between_steps(self):
+        batcher = self.batcher()
+        long = batcher.submit_ids([2, 2], {"max_new_tokens": 6})
+        batcher._step(timeout=0)
+        batcher._step(timeout=0)
+        self.assertEqual((batcher.prefills, batcher.steps, batcher.active), (1, 1, 1))
+
+        short = batcher.submit_ids([3], {"max_new_tokens": 6})
+        batcher._step(timeout=0)
+        self.assertEqual((batcher.prefills, batcher.active), (2, 2))
+
+        while not short.done():
+            batcher._step(timeout=0)
+        self.assertEqual(batcher.active, 1)
+        self.assertFalse(long.done())
+
+        while not long.done():
+            batcher._step(timeout=0)
+        self.assertEqual(batcher.active, 0)
+        # The third step decodes the running sequence and prefills only the new one
+        self.assertEqual(batcher.model.batch_sizes, [1, 1, 1, 1, 2, 2, 1])
+
+        for future, prompt in ((long, [2, 2]), (short, [3])):
+            alone = self.run_alone(prompt, 6)
+            self.assertEqual(future.result().token_ids, alone.token_ids)
+            self.assertEqual(future.result().finish_reason, alone.finish_reason)
+
+        self.assertEqual(short.result().token_ids, [4, 3])
+        self.assertEqual(short.result().finish_reason, "stop")
+        self.assertEqual(long.result().token_ids, [5] * 6)
+        self.assertEqual(long.result().finish_reason, "length")
+
+    def test_tokens_are_reported_as_generated(self):
+        batcher = self.batcher()
+        tokens = []
+        future = batcher.submit_ids([2, 2], {"max_new_tokens": 3}, on_token=tokens.append)
+
+        batcher._step(timeout=0)
+        self.assertEqual(tokens, [5])
+        while not future.done():
+            batcher._step(timeout=0)
+        self.assertEqual(tokens, future.result().token_ids)
+
+
+class TextStreamTest(unittest.TestCase):
+    def test_text_is_yielded_by_whole_characters(self):
+        stream = TextStream(ByteTokenizer())
+        for token_id in "Où".encode("utf-8"):
+            stream.put(token_id)
+        future = Future()
+        future.set_result(GenerationResult(list("Où".encode("utf-8")), "Où", {"role": "assistant", "content": "Où"}, 1, "stop"))
+        stream.finish(future)
+
+        self.assertEqual(list(stream), ["O", "ù"])
+        self.assertEqual(stream.result.finish_reason, "stop")
+
+    def test_errors_are_raised(self):
+        stream = TextStream(ByteTokenizer())
+        future = Future()
+        future.set_exception(RuntimeError("out of memory"))
+        stream.finish(future)
+
+        with self.assertRaises(RuntimeError):
+            list(stream)
+
+
+class MessageConversionTest(unittest.TestCase):
+    def test_responses_input_to_chat_template_messages(self):
+        messages = responses_messages({
+            "instructions": "Be brief",
+            "input": [
+                {"role": "user", "content": [{"type": "input_text", "text": "Multiply 3 by 4"}]},
+                {"type": "function_call", "call_id": "call_1", "name": "multiply", "arguments": '{"a": 3, "b": 4}'},
+                {"type": "function_call_output", "call_id": "call_1", "output": "12"},
+            ],
+        })
+
+        self.assertEqual(["system", "user", "assistant", "tool"], [m["role"] for m in messages])
+        self.assertEqual("Multiply 3 by 4", messages[1]["content"])
+        self.assertEqual({"a": 3, "b": 4}, messages[2]["tool_calls"][0]["function"]["arguments"])
+        self.assertEqual("call_1", messages[3]["tool_call_id"])
+
+    def test_chat_completion_arguments_are_decoded(self):
+        messages = chat_completion_messages([
+            {"role": "assistant", "content": None, "tool_calls": [{"id": "c", "type": "function", "function": {"name": "f", "arguments": '{"x": 1}'}}]},
+        ])
+        self.assertEqual("", messages[0]["content"])
+        self.assertEqual({"x": 1}, messages[0]["tool_calls"][0]["function"]["arguments"])
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.batcher = FakeBatcher()
+        self.server = make_server(self.batcher, port=0, model_name="test-model")
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = "http://127.0.0.1:%d/v1" % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def post(self, path, payload):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request) as response:
+            return response.read().decode("utf-8")
+
+    def test_chat_completions(self):
+        completion = json.loads(self.post("/chat/completions", {"messages": [{"role": "user", "content": "Hi"}], "max_tokens": 7}))
+
+        self.assertEqual("Echo Hi", completion["choices"][0]["message"]["content"])
+        self.assertEqual("stop", completion["choices"][0]["finish_reason"])
+        self.assertEqual(8, completion["usage"]["total_tokens"])
+        self.assertEqual(7, self.batcher.requests[0][2]["max_new_tokens"])
+
+    def test_chat_completions_tool_calls(self):
+        completion = json.loads(self.post("/chat/completions", {
+            "messages": [{"role": "user", "content": "Multiply"}],
+            "tools": [{"type": "function", "function": {"name": "multiply"}}],
+        }))
+
+        choice = completion["choices"][0]
+        self.assertEqual("tool_calls", choice["finish_reason"])
+        self.assertEqual('{"a": 3, "b": 4}', choice["message"]["tool_calls"][0]["function"]["arguments"])
+
+    def test_chat_completions_stream(self):
+        body = self.post("/chat/completions", {"messages": [{"role": "user", "content": "Hi"}], "stream": True})
+        data = [line[len("data: "):] for line in body.splitlines() if line.startswith("data: ")]
+        chunks = [json.loads(item) for item in data[:-1]]
+
+        self.assertEqual("[DONE]", data[-1])
+        deltas = [chunk["choices"][0]["delta"].get("content", "") for chunk in chunks if chunk["choices"]]
+        self.assertEqual("Echo Hi", "".join(deltas))
+        self.assertGreater(len(deltas), 2)
+        self.assertEqual("stop", chunks[-2]["choices"][0]["finish_reason"])
+        self.assertEqual(8, chunks[-1]["usage"]["total_tokens"])
+
+    def test_chat_completions_stream_with_tools(self):
+        body = self.post("/chat/completions", {
+            "messages": [{"role": "user", "content": "Multiply"}],
+            "tools": [{"type": "function", "function": {"name": "multiply"}}],
+            "stream": True,
+        })
+        data = [line[len("data: "):] for line in body.splitlines() if line.startswith("data: ")]
+
+        self.assertEqual("multiply", json.loads(data[0])["choices"][0]["delta"]["tool_calls"][0]["function"]["name"])
+
+    def test_responses_stream(self):
+        body = self.post("/responses", {"input": "Hi", "stream": True})
+        events = [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+        self.assertEqual("response.created", events[0]["type"])
+        deltas = [event["delta"] for event in events if event["type"] == "response.output_text.delta"]
+        self.assertEqual("Echo Hi", "".join(deltas))
+        self.assertEqual("response.completed", events[-1]["type"])
+        self.assertEqual(events[0]["response"]["id"], events[-1]["response"]["id"])
+
+    def test_responses(self):
+        response = json.loads(self.post("/responses", {
+            "input": [{"role": "user", "content": "Multiply"}],
+            "tools": [{"type": "function", "name": "multiply"}],
+        }))
+
+        self.assertEqual("completed", response["status"])
+        call = response["output"][0]
+        self.assertEqual("function_call", call["type"])
+        self.assertEqual("call_1", call["call_id"])
+        self.assertEqual({"a": 3, "b": 4}, json.loads(call["arguments"]))
+
+    def test_models(self):
+        with urllib.request.urlopen(self.url + "/models") as response:
+            models = json.loads(response.read())
+        self.assertEqual("test-model", models["data"][0]["id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import copy
+import pickle
+import unittest
+from dataclasses import FrozenInstanceError
+
+from scout_ai import FrozenMessage, Message
+
+
+class MessageTest(unittest.TestCase):
+    def test_extra_is_only_allocated_when_needed(self):
+        message = Message.from_data({"role": "user", "content": "Hello"})
+        self.assertIsNone(message._extra)
+        self.assertEqual(message.to_dict(), {"role": "user", "content": "Hello"})
+        self.assertIsNone(message.get("name"))
+        self.assertIsNone(message._extra)
+
+        message = Message.from_data({"role": "function_call", "content": "{}", "id": "call_1"})
+        self.assertEqual(message["id"], "call_1")
+        self.assertEqual(message.to_dict(), {"role": "function_call", "content": "{}", "id": "call_1"})
+
+    def test_roles_are_interned_and_slotted(self):
+        first = Message.from_data({"role": "".join(["assis", "tant"])})
+        second = Message("assistant")
+        self.assertIs(first.role, second.role)
+        self.assertFalse(hasattr(first, "__dict__"))
+        self.assertEqual(first, second)
+
+    def test_matches_data(self):
+        message = Message("user", "Hello", {"name": "x"})
+        self.assertTrue(message.matches({"role": "user", "content": "Hello", "name": "x"}))
+        self.assertFalse(message.matches({"role": "user", "content": "Hello"}))
+        self.assertFalse(message.matches({"role": "user", "content": "Hello", "name": "y"}))
+        self.assertTrue(Message("user").matches({"role": "user"}))
+
+    def test_frozen_message(self):
+        message = Message("user", "Hello", {"name": "x"}).freeze()
+        self.assertIsInstance(message, FrozenMessage)
+        self.assertEqual(message, Message("user", "Hello", {"name": "x"}))
+
+        with self.assertRaises(FrozenInstanceError):
+            message.content = "changed"
+        with self.assertRaises(TypeError):
+            message.extra["name"] = "y"
+
+    def test_frozen_message_copy_and_pickle(self):
+        message = Message("user", "Hello", {"name": "x"}).freeze()
+
+        for copied in (copy.copy(message), copy.deepcopy(message), pickle.loads(pickle.dumps(message))):
+            self.assertIsInstance(copied, FrozenMessage)
+            self.assertEqual(copied, message)
+            self.assertEqual(copied.extra["name"], "x")
+            with self.assertRaises(FrozenInstanceError):
+                copied.role = "assistant"
+
+        self.assertEqual(pickle.loads(pickle.dumps(FrozenMessage("user"))).extra, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
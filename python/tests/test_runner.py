@@ -1,9 +1,14 @@
+import asyncio
 import io
+import os
 import sys
+import tempfile
+import time
 import unittest
+from pathlib import Path
 from contextlib import redirect_stderr
 
-from scout_ai.runner import ScoutRunner
+from scout_ai.runner import AGENT_CACHE, CommandError, ScoutRunner, clear_cache
 
 
 class RunnerStreamingTest(unittest.TestCase):
@@ -22,6 +27,170 @@ class RunnerStreamingTest(unittest.TestCase):
         self.assertEqual(output.strip(), "done")
         self.assertIn("waiting...", stderr.getvalue())
 
+    def test_ask_messages_round_trips_json_through_stdin(self):
+        code = (
+            "import json, sys; "
+            "assert sys.argv[1:] == ['agent', 'ask', 'Planner', '--json'], sys.argv; "
+            "messages = json.load(sys.stdin); "
+            "messages.append({'role': 'assistant', 'content': 'got ' + messages[-1]['content']}); "
+            "print(json.dumps(messages))"
+        )
+        runner = ScoutRunner(command=[sys.executable, "-c", code])
+
+        updated = runner.ask_messages([{"role": "user", "content": "Hello"}], agent_name="Planner")
+
+        self.assertEqual(len(updated), 2)
+        self.assertEqual(updated[-1], {"role": "assistant", "content": "got Hello"})
+
+    def test_native_format_only_calls_ruby_when_needed(self):
+        code = (
+            "import json, sys; "
+            "assert sys.argv[1:3] == ['llm', 'json'], sys.argv; "
+            "open(sys.argv[-1], 'w').write(json.dumps([{'role': 'user', 'content': 'from ruby'}]))"
+        )
+        runner = ScoutRunner(command=[sys.executable, "-c", code])
+
+        self.assertEqual(runner.render_chat([{"role": "user", "content": "Hello"}]), "\nuser:\n\nHello")
+        self.assertEqual(runner.parse_chat_text("user: Hello"), [{"role": "user", "content": "Hello"}])
+        self.assertEqual(runner.parse_chat_text("import: other.chat"), [{"role": "user", "content": "from ruby"}])
+
+    def test_ask_many_streams_json_lines(self):
+        code = (
+            "import json, sys; "
+            "assert sys.argv[1:] == ['llm', 'ask', '--json_batch', '--max_parallel', '2'], sys.argv; "
+            "conversations = json.load(sys.stdin); "
+            "print(json.dumps({'index': 1, 'error': 'boom'}), flush=True); "
+            "print(json.dumps({'index': 2, 'messages': conversations[2]}), flush=True); "
+            "print(json.dumps({'index': 0, 'messages': conversations[0]}), flush=True)"
+        )
+        runner = ScoutRunner(command=[sys.executable, "-c", code])
+        conversations = [[{"role": "user", "content": str(i)}] for i in range(3)]
+
+        unordered = list(runner.ask_many(conversations, max_parallel=2))
+        self.assertEqual([index for index, _ in unordered], [1, 2, 0])
+
+        ordered = list(runner.ask_many(conversations, max_parallel=2, ordered=True))
+        self.assertEqual([index for index, _ in ordered], [0, 1, 2])
+        self.assertEqual(ordered[0][1], conversations[0])
+        self.assertIsInstance(ordered[1][1], CommandError)
+        self.assertEqual(str(ordered[1][1]), "boom")
+
+    def test_stream_messages_yields_events_as_they_are_printed(self):
+        code = (
+            "import json, sys; "
+            "assert sys.argv[1:] == ['llm', 'ask', '--json', '--stream', '--delta'], sys.argv; "
+            "messages = json.load(sys.stdin); "
+            "print(json.dumps({'type': 'delta', 'text': 'Hi'}), flush=True); "
+            "answer = {'role': 'assistant', 'content': 'Hi'}; "
+            "print(json.dumps({'type': 'message', 'message': answer}), flush=True); "
+            "print(json.dumps({'type': 'done', 'start': len(messages), 'messages': [answer]}))"
+        )
+        runner = ScoutRunner(command=[sys.executable, "-c", code])
+
+        events = list(runner.stream_messages([{"role": "user", "content": "Hello"}]))
+
+        self.assertEqual([event["type"] for event in events], ["delta", "message", "done"])
+        self.assertEqual(events[-1]["start"], 1)
+        self.assertEqual(events[-1]["messages"], [{"role": "assistant", "content": "Hi"}])
+
+
+class RunnerDeltaTest(unittest.TestCase):
+    def test_ask_delta_returns_only_new_messages(self):
+        code = (
+            "import json, sys; "
+            "assert sys.argv[1:] == ['agent', 'ask', 'Planner', '--json', '--delta'], sys.argv; "
+            "messages = json.load(sys.stdin); "
+            "print(json.dumps({'start': len(messages), 'messages': [{'role': 'assistant', 'content': 'Hi'}]}))"
+        )
+        runner = ScoutRunner(command=[sys.executable, "-c", code])
+
+        start, new_messages = runner.ask_delta([{"role": "user", "content": "Hello"}], agent_name="Planner")
+
+        self.assertEqual(start, 1)
+        self.assertEqual(new_messages, [{"role": "assistant", "content": "Hi"}])
+
+
+class AgentCacheTest(unittest.TestCase):
+    def test_agent_start_chat_is_cached_until_the_file_changes(self):
+        clear_cache()
+        with tempfile.TemporaryDirectory() as directory:
+            calls = Path(directory) / "calls"
+            start_chat = Path(directory) / "start_chat"
+            start_chat.write_text("system: You are Planner\n", encoding="utf-8")
+            code = (
+                "import sys; "
+                f"open({str(calls)!r}, 'a').write('x'); "
+                f"print({directory!r})"
+            )
+            runner = ScoutRunner(command=[sys.executable, "-c", code])
+
+            first = runner.load_agent_start_chat("Planner")
+            first[0]["content"] = "modified by caller"
+            second = ScoutRunner(command=[sys.executable, "-c", code]).load_agent_start_chat("Planner")
+
+            self.assertEqual(second, [{"role": "system", "content": "You are Planner"}])
+            self.assertEqual(calls.read_text(), "x")
+            self.assertEqual(AGENT_CACHE.stats()["hits"], 2)
+
+            start_chat.write_text("system: You are a better Planner\n", encoding="utf-8")
+            self.assertEqual(runner.load_agent_start_chat("Planner")[0]["content"], "You are a better Planner")
+
+            clear_cache()
+            self.assertEqual(AGENT_CACHE.stats(), {"hits": 0, "misses": 0, "paths": 0, "chats": 0})
+            runner.load_agent_start_chat("Planner")
+            self.assertEqual(calls.read_text(), "xx")
+
+
+class RunnerAsyncTest(unittest.IsolatedAsyncioTestCase):
+    async def test_ask_messages_async_reports_stderr_lines(self):
+        code = (
+            "import json, sys; "
+            "messages = json.load(sys.stdin); "
+            "sys.stderr.write('thinking\\n'); sys.stderr.flush(); "
+            "messages.append({'role': 'assistant', 'content': 'got ' + messages[-1]['content']}); "
+            "print(json.dumps(messages))"
+        )
+        runner = ScoutRunner(command=[sys.executable, "-c", code])
+        lines = []
+
+        async def on_stderr(line):
+            lines.append(line)
+
+        results = await asyncio.gather(
+            *[runner.ask_messages_async([{"role": "user", "content": str(i)}], on_stderr=on_stderr) for i in range(4)]
+        )
+
+        self.assertEqual([updated[-1]["content"] for updated in results], ["got 0", "got 1", "got 2", "got 3"])
+        self.assertEqual(lines, ["thinking\n"] * 4)
+
+    async def test_max_concurrency_bounds_running_processes(self):
+        code = "import time; time.sleep(0.2); print('[]')"
+        runner = ScoutRunner(command=[sys.executable, "-c", code], max_concurrency=2)
+
+        start = time.monotonic()
+        await asyncio.gather(*[runner.ask_messages_async([]) for _ in range(4)])
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
+
+    async def test_cancel_kills_child_process(self):
+        code = "import os, sys, time; print(os.getpid(), file=sys.stderr, flush=True); time.sleep(30)"
+        runner = ScoutRunner(command=[sys.executable, "-c", code])
+        started = asyncio.Event()
+        pids = []
+
+        def on_stderr(line):
+            pids.append(int(line))
+            started.set()
+
+        task = asyncio.ensure_future(runner.ask_messages_async([], on_stderr=on_stderr))
+        await asyncio.wait_for(started.wait(), 10)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pids[0], 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,79 @@
+import importlib.util
+import tempfile
+import unittest
+
+from scout_ai.vector_index import VectorIndex
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+BACKENDS = ["flat"] + (["hnsw"] if importlib.util.find_spec("hnswlib") else [])
+
+VECTORS = {
+    "crime": [1.0, 0.1, 0.0],
+    "murder": [0.9, 0.2, 0.0],
+    "puppies": [0.0, 0.1, 1.0],
+}
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class VectorIndexTest(unittest.TestCase):
+    def build(self, backend, **kwargs):
+        index = VectorIndex(3, backend=backend, **kwargs)
+        index.add(list(VECTORS), list(VECTORS.values()), texts=[f"about {id}" for id in VECTORS])
+        return index
+
+    def test_search(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                index = self.build(backend)
+                results = index.search([[0.0, 0.0, 1.0], [1.0, 0.15, 0.0]], k=2)
+
+                self.assertEqual(results[0][0][0], "puppies")
+                self.assertEqual({id for id, _ in results[1]}, {"crime", "murder"})
+                self.assertLessEqual(results[1][0][1], results[1][1][1])
+                self.assertEqual(index.text("puppies"), "about puppies")
+
+    def test_upsert_delete_and_growth(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                index = self.build(backend, max_elements=2)
+
+                index.upsert(["puppies"], [[1.0, 0.0, 0.0]], texts=["moved"])
+                index.delete(["crime"])
+                index.add([f"doc {i}" for i in range(10)], [[0.0, 1.0, float(i)] for i in range(10)])
+
+                self.assertEqual(len(index), 12)
+                self.assertNotIn("crime", index)
+                self.assertEqual(index.query([1.0, 0.0, 0.0], k=1)[0][0], "puppies")
+                self.assertEqual(index.text("puppies"), "moved")
+
+                index.upsert(["murder"], [[0.0, 1.0, 0.0]])
+                self.assertEqual(index.text("murder"), "about murder")
+                self.assertNotIn("crime", [id for id, _ in index.query([1.0, 0.1, 0.0], k=12)])
+
+    def test_save_and_load(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend), tempfile.TemporaryDirectory() as dir:
+                index = self.build(backend)
+                index.delete(["murder"])
+                index.save(dir)
+
+                loaded = VectorIndex.load(dir)
+                self.assertEqual(loaded.backend, backend)
+                self.assertEqual(len(loaded), 2)
+                self.assertEqual(loaded.query([1.0, 0.1, 0.0], k=1)[0][0], "crime")
+
+                loaded.add(["kittens"], [[0.0, 0.2, 1.0]], texts=["about kittens"])
+                self.assertEqual(loaded.query([0.0, 0.2, 1.0], k=1)[0][0], "kittens")
+
+    def test_l2_space(self):
+        index = VectorIndex(2, space="l2", backend="flat")
+        index.add(["a", "b"], [[0.0, 0.0], [3.0, 4.0]])
+
+        (id, distance), = index.query([3.0, 4.0], k=1)
+        self.assertEqual(id, "b")
+        self.assertAlmostEqual(distance, 0.0, places=5)
+        self.assertAlmostEqual(index.query([0.0, 0.0], k=2)[1][1], 25.0, places=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+
+from scout_ai.runner import CommandError, ScoutRunner
+
+FAKE_WORKER = textwrap.dedent(
+    """
+    import json, os, struct, sys, time
+
+    assert sys.argv[1:] == ["llm", "worker"], sys.argv
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+
+    while True:
+        header = stdin.read(4)
+        if len(header) < 4:
+            break
+        (size,) = struct.unpack(">I", header)
+        request = json.loads(stdin.read(size))
+        op = request["op"]
+        if op == "crash":
+            sys.exit(3)
+        if op == "render":
+            response = {"ok": True, "result": "\\n".join(m["role"] + ": " + m["content"] for m in request["messages"])}
+        elif op == "ask":
+            sys.stderr.write("thinking\\n")
+            sys.stderr.flush()
+            if request["messages"] and request["messages"][-1]["content"] == "sleep":
+                time.sleep(30)
+            response = {"ok": True, "result": request["messages"] + [{"role": "assistant", "content": "pid %d" % os.getpid()}]}
+        elif op == "find_agent":
+            response = {"ok": False, "error": "No agent found with name " + request["agent"]}
+        else:
+            response = {"ok": False, "error": "Unknown bridge operation: " + op}
+        payload = json.dumps(response).encode("utf-8")
+        stdout.write(struct.pack(">I", len(payload)) + payload)
+        stdout.flush()
+    """
+)
+
+
+class WorkerTest(unittest.TestCase):
+    def setUp(self):
+        handle = tempfile.NamedTemporaryFile("w", suffix=".py", delete=False)
+        handle.write(FAKE_WORKER)
+        handle.close()
+        self.script = handle.name
+        self.runner = ScoutRunner(command=[sys.executable, self.script], persistent=True, native=False, show_stderr=False)
+
+    def tearDown(self):
+        self.runner.close()
+        os.unlink(self.script)
+
+    def test_requests_share_one_process(self):
+        messages = [{"role": "user", "content": "Hello"}]
+
+        first = self.runner.ask_messages(messages)
+        second = self.runner.ask_messages(messages)
+
+        self.assertEqual(first[-1]["role"], "assistant")
+        self.assertEqual(first[-1]["content"], second[-1]["content"])
+        self.assertEqual(self.runner.render_chat(messages), "user: Hello")
+
+    def test_errors_are_command_errors(self):
+        with self.assertRaises(CommandError):
+            self.runner.worker.request("unknown")
+        self.assertIsNone(self.runner.find_agent_path("Missing"))
+
+    def test_restarts_after_crash(self):
+        pid = self.runner.ask_messages([])[-1]["content"]
+
+        with self.assertRaises(CommandError):
+            self.runner.worker.request("crash")
+
+        self.assertNotEqual(self.runner.ask_messages([])[-1]["content"], pid)
+        self.assertEqual(self.runner.worker.restarts, 1)
+
+    def test_async_ask_reports_stderr_lines(self):
+        async def ask():
+            lines = []
+            received = asyncio.Event()
+
+            async def on_stderr(line):
+                lines.append(line)
+                received.set()
+
+            updated = await self.runner.ask_messages_async([], on_stderr=on_stderr)
+            await asyncio.wait_for(received.wait(), 10)
+            return updated, lines
+
+        updated, lines = asyncio.run(ask())
+        self.assertEqual(updated[-1]["role"], "assistant")
+        self.assertEqual(lines, ["thinking\n"])
+
+    def test_cancel_kills_the_worker(self):
+        async def ask():
+            started = asyncio.Event()
+            task = asyncio.ensure_future(
+                self.runner.ask_messages_async([{"role": "user", "content": "sleep"}], on_stderr=lambda line: started.set())
+            )
+            await asyncio.wait_for(started.wait(), 10)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        pid = self.runner.ask_messages([])[-1]["content"]
+        start = time.monotonic()
+        asyncio.run(ask())
+
+        self.assertNotEqual(self.runner.ask_messages([])[-1]["content"], pid)
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_interrupted_exchange_does_not_leave_a_stale_response(self):
+        worker = self.runner.worker
+        pid = self.runner.ask_messages([])[-1]["content"]
+        read_exact = worker._read_exact
+
+        def interrupted(size):
+            data = read_exact(size)
+            # The header is read, the payload is left in the pipe
+            raise KeyboardInterrupt
+
+        worker._read_exact = interrupted
+        with self.assertRaises(KeyboardInterrupt):
+            self.runner.render_chat([{"role": "user", "content": "Hello"}])
+        del worker._read_exact
+
+        self.assertNotEqual(self.runner.ask_messages([])[-1]["content"], pid)
+        self.assertEqual(self.runner.render_chat([{"role": "user", "content": "Hi"}]), "user: Hi")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -92,6 +92,35 @@ user: write a script that sorts files in a directory
     assert_equal 1, client.calls
   end
 
+  def test_embed_list_in_one_call
+    model = Object.new
+    def model.eval_list(texts)
+      @lists = (@lists || 0) + 1
+      texts.collect { |text| [text.length.to_f, @lists.to_f] }
+    end
+
+    embeddings = LLM::Huggingface.embed(%w(one three), client: model)
+
+    assert_equal [[3.0, 1.0], [5.0, 1.0]], embeddings
+  end
+
+  def test_ask_streams_with_fake_client
+    client = FakeHFClient.new({ role: 'assistant', content: 'Hello from Huggingface' })
+    def client.chat_stream(messages, tools, parameters = {})
+      response = chat(messages, tools, parameters)
+      response[:content].scan(/\S+\s*/).each { |chunk| yield chunk }
+      response
+    end
+
+    deltas = []
+    response = LLM.with_stream(proc { |type, data| deltas << data if type == :delta }) do
+      LLM::Huggingface.ask("user: say hi", client: client, log_response: false)
+    end
+
+    assert_equal 'Hello from Huggingface', response
+    assert_equal ['Hello ', 'from ', 'Huggingface'], deltas
+  end
+
   def test_ask_tool_loop_with_fake_client
     client = FakeHFClient.new(
       {
@@ -161,4 +161,19 @@ That was inside a content block
     m = Chat.parse txt
     assert_equal messages, m.reject{|msg| msg[:content].empty?}
   end
+
+  # Golden files shared with the Python implementation (scout_ai.chat_format)
+  def test_chat_format_corpus
+    dir = File.join(TestFixtures::FIXTURES_DIR, 'chat_format')
+
+    Dir.glob(File.join(dir, 'parse', '*.chat')).sort.each do |chat_file|
+      expected = JSON.parse(File.read(chat_file.sub(/\.chat$/, '.json'), encoding: 'UTF-8'))
+      assert_equal expected, JSON.parse(Chat.parse(File.read(chat_file, encoding: 'UTF-8')).to_json), chat_file
+    end
+
+    Dir.glob(File.join(dir, 'print', '*.json')).sort.each do |json_file|
+      expected = File.read(json_file.sub(/\.json$/, '.chat'), encoding: 'UTF-8')
+      assert_equal expected, Chat.print(JSON.parse(File.read(json_file, encoding: 'UTF-8'))), json_file
+    end
+  end
 end
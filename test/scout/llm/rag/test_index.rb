@@ -0,0 +1,69 @@
+require File.expand_path(__FILE__).sub(%r(/test/.*), '/test/test_helper.rb')
+require File.expand_path(__FILE__).sub(%r(.*/test/), '').sub(/test_(.*)\.rb/,'\1')
+
+class TestRAGIndex < Test::Unit::TestCase
+  VECTORS = {
+    'crime' => [1.0, 0.1, 0.0],
+    'murder' => [0.9, 0.2, 0.0],
+    'puppies' => [0.0, 0.1, 1.0],
+  }
+
+  def build(backend = 'flat', **options)
+    index = LLM::RAG::Index.new(3, backend: backend, **options)
+    index.add VECTORS.keys, VECTORS.values, VECTORS.keys.collect { |id| "about #{id}" }
+  end
+
+  def test_search
+    index = build
+
+    puppies, crime = index.search([[0.0, 0.0, 1.0], [1.0, 0.15, 0.0]], 2)
+    assert_equal 'puppies', puppies.first.first
+    assert_equal %w(crime murder), crime.collect(&:first).sort
+    assert_equal 'about puppies', index.text('puppies')
+  end
+
+  def test_upsert_delete_and_growth
+    index = build('flat', max_elements: 2)
+
+    index.upsert ['puppies'], [[1.0, 0.0, 0.0]], ['moved']
+    index.delete ['crime']
+    index.add 10.times.collect { |i| "doc #{i}" }, 10.times.collect { |i| [0.0, 1.0, i.to_f] }
+
+    assert_equal 12, index.size
+    assert ! index.include?('crime')
+    assert_equal 'puppies', index.query([1.0, 0.0, 0.0], 1).first.first
+    assert_equal 'moved', index.text('puppies')
+
+    index.upsert ['murder'], [[0.0, 1.0, 0.0]]
+    assert_equal 'about murder', index.text('murder')
+  end
+
+  def test_save_and_load
+    TmpFile.with_dir do |dir|
+      index = build
+      index.delete ['murder']
+      index.save dir
+
+      loaded = LLM::RAG::Index.load(dir)
+      assert_equal 2, loaded.size
+      assert_equal 'crime', loaded.query([1.0, 0.1, 0.0], 1).first.first
+
+      loaded.add ['kittens'], [[0.0, 0.2, 1.0]], ['about kittens']
+      assert_equal 'kittens', loaded.query([0.0, 0.2, 1.0], 1).first.first
+    end
+  end
+
+  def test_hnsw
+    omit "hnswlib not installed" unless LLM::RAG::Index.hnswlib?
+
+    TmpFile.with_dir do |dir|
+      index = build('hnsw', max_elements: 2)
+      index.delete ['crime']
+      index.save dir
+
+      loaded = LLM::RAG::Index.load(dir)
+      assert_equal 'hnsw', loaded.backend
+      assert_equal %w(murder puppies), loaded.query([1.0, 0.1, 0.0], 5).collect(&:first)
+    end
+  end
+end
@@ -0,0 +1,106 @@
+require File.expand_path(__FILE__).sub(%r(/test/.*), '/test/test_helper.rb')
+require File.expand_path(__FILE__).sub(%r(.*/test/), '').sub(/test_(.*)\.rb/,'\1')
+
+require 'stringio'
+
+class TestLLMBridge < Test::Unit::TestCase
+  def frames(*requests)
+    io = StringIO.new(''.b)
+    requests.each { |request| LLM::Bridge.write_frame(io, request) }
+    io.rewind
+    io
+  end
+
+  def read_frames(io)
+    io.rewind
+    responses = []
+    while response = LLM::Bridge.read_frame(io)
+      responses << response
+    end
+    responses
+  end
+
+  def test_render_and_parse_round_trip
+    messages = [{'role' => 'system', 'content' => 'You are concise'}, {'role' => 'user', 'content' => 'Hello'}]
+
+    text = LLM::Bridge.render(messages)
+    assert_equal LLM.print(messages), text
+
+    parsed = LLM::Bridge.parse(text)
+    assert_equal %w(system user), parsed.collect { |m| m[:role].to_s }
+    assert_equal 'Hello', parsed.last[:content]
+  end
+
+  def test_ask_appends_answer
+    LLM::Mock.script 'Hi there'
+
+    messages = [{'role' => 'user', 'content' => 'Hello'}]
+    updated = LLM::Bridge.ask(messages, nil, persist: false)
+
+    assert_equal 'Hello', updated.first[:content]
+    assert_equal 'assistant', updated.last[:role].to_s
+    assert_equal 'Hi there', updated.last[:content]
+  end
+
+  def test_ask_delta_returns_new_messages
+    LLM::Mock.script 'Hi there'
+
+    messages = [{'role' => 'system', 'content' => 'You are concise'}, {'role' => 'user', 'content' => 'Hello'}]
+    delta = LLM::Bridge.ask_delta(messages, nil, persist: false)
+
+    assert_equal 2, delta[:start]
+    assert_equal 'Hi there', delta[:messages].last[:content]
+    assert ! delta[:messages].any? { |message| message[:content] == 'Hello' }
+  end
+
+  def test_dry_run_does_not_ask
+    LLM::Mock.script 'Hi there'
+
+    messages = [{'role' => 'user', 'content' => 'Hello'}]
+    updated = LLM::Bridge.ask(messages, nil, persist: false, dry_run: true)
+
+    assert_equal %w(user), updated.collect { |m| m[:role].to_s }
+    assert_equal 'Hello', updated.last[:content]
+    assert_equal 0, LLM::Mock.index
+  end
+
+  def test_ask_yields_messages_when_nothing_streamed
+    LLM::Mock.script 'Hi there'
+
+    events = []
+    updated = LLM::Bridge.ask([{'role' => 'user', 'content' => 'Hello'}], nil, persist: false) do |type, data|
+      events << [type, data]
+    end
+
+    assert_equal 'Hi there', updated.last[:content]
+    assert events.any? { |type, message| type == :message && message[:content] == 'Hi there' }
+  end
+
+  def test_ask_many_yields_every_conversation
+    LLM::Mock.script proc { |messages, options| "Echo " + messages.last[:content] }
+
+    conversations = %w(one two three).collect { |text| [{'role' => 'user', 'content' => text}] }
+    results = []
+    LLM::Bridge.ask_many(conversations, nil, {persist: false}, max_parallel: 2) { |result| results << result }
+
+    assert_equal [0, 1, 2], results.collect { |result| result[:index] }.sort
+    results.each do |result|
+      assert_equal "Echo " + conversations[result[:index]].first['content'], result[:messages].last[:content]
+    end
+  end
+
+  def test_serve_frames
+    input = frames({op: 'ping'},
+                   {op: 'render', messages: [{role: 'user', content: 'Hello'}]},
+                   {op: 'unknown'})
+    output = StringIO.new(''.b)
+
+    LLM::Bridge.serve(input, output)
+
+    ping, render, unknown = read_frames(output)
+    assert_equal({'ok' => true, 'result' => 'pong'}, ping)
+    assert_include render['result'], "user:\n\nHello"
+    assert_equal false, unknown['ok']
+    assert_include unknown['error'], 'unknown'
+  end
+end
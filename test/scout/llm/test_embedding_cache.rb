@@ -0,0 +1,68 @@
+require File.expand_path(__FILE__).sub(%r(/test/.*), '/test/test_helper.rb')
+require File.expand_path(__FILE__).sub(%r(.*/test/), '').sub(/test_(.*)\.rb/,'\1')
+
+require 'scout/llm/embed'
+
+class TestLLMEmbeddingCache < Test::Unit::TestCase
+  def test_only_missing_texts_are_embedded
+    TmpFile.with_dir do |dir|
+      cache = LLM::EmbeddingCache.new(dir)
+      calls = []
+
+      first = cache.embed(%w(a bb a)) { |missing| calls << missing; missing.collect { |t| [t.length.to_f, 1.0] } }
+      second = cache.embed(%w(bb ccc)) { |missing| calls << missing; missing.collect { |t| [t.length.to_f, 1.0] } }
+
+      assert_equal [%w(a bb), %w(ccc)], calls
+      assert_equal [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]], first
+      assert_equal [[2.0, 1.0], [3.0, 1.0]], second
+      assert_equal [[3.0, 1.0]], LLM::EmbeddingCache.new(dir).get(%w(ccc))
+    end
+  end
+
+  def test_oldest_rows_are_evicted
+    TmpFile.with_dir do |dir|
+      cache = LLM::EmbeddingCache.new(dir, max_bytes: 64)
+      9.times { |i| cache.put(["text #{i}"], [[i.to_f, 0.0]]) }
+
+      assert_equal 6, cache.size
+      assert_equal [nil, [8.0, 0.0]], cache.get(['text 0', 'text 8'])
+    end
+  end
+
+  def test_embed_option
+    TmpFile.with_dir do |dir|
+      vectors = LLM.embed(['one two', 'two three'], endpoint: :mock, cache: dir)
+
+      assert_equal LLM.embed(['one two', 'two three'], endpoint: :mock), vectors
+      # Served from the cache, as float32
+      LLM.embed('one two', endpoint: :mock).zip(LLM.embed('one two', endpoint: :mock, cache: dir)).each do |expected,cached|
+        assert_in_delta expected, cached, 1e-6
+      end
+      assert_equal 2, LLM::EmbeddingCache.new(dir).size
+    end
+  end
+
+  def test_model_key
+    assert_equal 'BAAI_bge-small-en-cls-raw', LLM::EmbeddingCache.model_key('BAAI/bge-small-en', 'cls', false)
+    assert_equal 'm-max128-' + Digest::SHA256.hexdigest('ollama http://localhost:11434')[0, 12],
+      LLM::EmbeddingCache.model_key('m', nil, true, source: 'ollama http://localhost:11434', max_length: 128)
+    assert_not_equal LLM::EmbeddingCache.model_key('m', source: 'openai'), LLM::EmbeddingCache.model_key('m', source: 'ollama')
+  end
+
+  def test_auto_cache_needs_a_model
+    TmpFile.with_dir do |dir|
+      begin
+        root, ENV['SCOUT_AI_EMBEDDING_CACHE'] = ENV['SCOUT_AI_EMBEDDING_CACHE'], dir
+
+        LLM.embed('one two', backend: :mock, cache: :auto)
+        assert_empty Dir.glob(File.join(dir, '*'))
+
+        LLM.embed('one two', backend: :mock, model: 'mock-model', cache: :auto)
+        LLM.embed('one two', backend: :mock, model: 'mock-model', url: 'http://other', cache: :auto)
+        assert_equal 2, Dir.glob(File.join(dir, 'mock-model-*')).length
+      ensure
+        ENV['SCOUT_AI_EMBEDDING_CACHE'] = root
+      end
+    end
+  end
+end
@@ -58,5 +58,26 @@ Puppies, cats and flowers
     assert_include nodes.sort, 1
     assert_false nodes.sort.first == 2
   end
+
+  def test_top
+    texts = ["Crime, Killing and Theft.", "Murder, felony and violence", "Puppies, cats and flowers"]
+
+    assert_equal ["Puppies, cats and flowers"], LLM::RAG.top(texts, 'Puppies, cats and flowers', 1, endpoint: :mock)
+  end
+
+  def test_top_persistent_index
+    texts = ["Crime, Killing and Theft.", "Murder, felony and violence", "Puppies, cats and flowers"]
+
+    TmpFile.with_dir do |dir|
+      assert_equal ["Puppies, cats and flowers"], LLM::RAG.top(texts, 'Puppies, cats and flowers', 1, endpoint: :mock, index: dir)
+      assert_equal 3, LLM::RAG::Index.load(dir).size
+
+      # Documents of the index that were not asked for are not returned
+      found = LLM::RAG.top(texts[0..1], 'Puppies, cats and flowers', 1, endpoint: :mock, index: dir)
+      assert_equal 1, found.length
+      assert_include texts[0..1], found.first
+      assert_equal 3, LLM::RAG::Index.load(dir).size
+    end
+  end
 end
 
@@ -0,0 +1,41 @@
+require File.expand_path(__FILE__).sub(%r(/test/.*), '/test/test_helper.rb')
+require File.expand_path(__FILE__).sub(%r(.*/test/), '').sub(/test_(.*)\.rb/,'\1')
+
+require 'scout/llm/backends/openai'
+
+class TestLLMStream < Test::Unit::TestCase
+  def test_with_stream_is_thread_local_and_restored
+    events = []
+    LLM.with_stream(proc { |type, data| events << [type, data] }) do
+      LLM.stream_text 'Hi'
+      Thread.new { LLM.stream_text 'ignored' }.join
+      LLM.with_stream(nil) { LLM.stream_text 'muted' }
+      LLM.stream_text ''
+    end
+    LLM.stream_text 'outside'
+
+    assert_equal [[:delta, 'Hi']], events
+    assert ! LLM.streaming?
+  end
+
+  def test_openai_streams_chunks
+    client = Object.new
+    client.define_singleton_method(:chat) do |parameters:|
+      %w(Hel lo).each do |text|
+        parameters[:stream].call({'id' => 'chatcmpl-1', 'choices' => [{'delta' => {'content' => text}}]}, 0)
+      end
+      parameters[:stream].call({'id' => 'chatcmpl-1', 'choices' => [],
+                                'usage' => {'prompt_tokens' => 3, 'completion_tokens' => 2, 'total_tokens' => 5}}, 0)
+      nil
+    end
+
+    events = []
+    messages = LLM.with_stream(proc { |type, data| events << [type, data] }) do
+      LLM::OpenAI.ask 'user: Say hello', client: client, model: 'gpt-test', return_messages: true
+    end
+
+    assert_equal [[:delta, 'Hel'], [:delta, 'lo']], events.select { |type, _| type == :delta }
+    assert_equal 'Hello', events.last.last[:content]
+    assert_equal 'Hello', messages.select { |m| m[:role].to_s == 'assistant' }.last[:content]
+  end
+end
@@ -36,4 +36,18 @@ class TestClass < Test::Unit::TestCase
       {role: :user, content: " 1 + 2 ="}
     ])
   end
+
+  def test_chat_batch
+    omit "huggingface model #{MODEL}: #{Availability.hf_model_reason(MODEL)}" unless Availability.hf_model_cached?(MODEL)
+    model = CausalModel.new MODEL, nil, generation_kwargs: {max_new_tokens: 10}
+
+    responses = model.chat_batch([
+      [{role: :user, content: "Reply with the answer only. 1 + 2 ="}],
+      [{role: :user, content: "Reply with the answer only. What is the capital of France?"}]
+    ])
+
+    assert_equal 2, responses.length
+    assert_include responses[0]['content'], '3'
+    assert_include responses[1]['content'], 'Paris'
+  end
 end